@@ -1,8 +1,8 @@
 
-from os import walk
 import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 import numpy as np
+from runs_store import load_store, lookup
 
 
 def read_final_data():
@@ -23,64 +23,25 @@ def read_final_data():
     return in_data
 
 
-def search_cluster(out_path, cl):
-    """
-    Extract NOT rounded metallicity values from the 'pantalla_analysis.out'
-    files.
-    """
-    cl_found, mets = False, []
-    # Store subdir names and file names.
-    for root, dirs, files in walk(out_path):
-        for f in files:
-            # Store paths to output images.
-            if f.startswith('pantalla'):
-                # Go through 'pantalla_analysis' file.
-                with open(root + f) as f1:
-                    f_store, n_store = [], []
-                    for i, line in enumerate(f1):
-                        f_store.append(line)
-                        if line.startswith('Analyzing') or\
-                                line.startswith('Analizing'):
-                                n_store.append(line.split()[2])
-                        if line.startswith('Best fit param'):
-                            met = f_store[i - 1].split()[2][1:-1]
-                            if cl[1] == n_store[0]:
-                                print cl[0], cl[1], cl[2], f, n_store[0],\
-                                    met
-                                cl_found = True
-                                mets = [cl[2], met]
-                                break
-                            else:
-                                n_store = []
-
-    return cl_found, mets
-
-
 def get_met_data(in_data):
     '''
     For each cluster in 'asteca_output_final.dat', store its rounded and
-    its NOT rounded metallicity value.
+    its NOT rounded metallicity value. The NOT rounded values are read from
+    the store of all the runs, which holds those in the 'pantalla' logs.
 
     Clusters from the 18th_ru/2nd_run can't be matched since I did not store
     their 'pantalla_analysis.out' files.
     '''
+    runs, names, z_round = zip(*in_data)
+    z_real = lookup(load_store(), runs, names, ['met_real'])[:, 0]
+
+    found = ~np.isnan(z_real)
+    for cl, f in zip(in_data, found):
+        if not f:
+            print cl, 'not found'
 
-    mets = [[], []]
-    for cl in in_data:
-        # Path to data file.
-        out_path = '../runs/' + str(cl[0]) + '_run/output/err_out/'
-        # Search cluster in 'err_out'
-        cl_found, mets0 = search_cluster(out_path, cl)
-        if mets0:
-            mets[0].append(float(mets0[0]))
-            mets[1].append(float(mets0[1]))
-        # I cluster was not found, try in second folder.
-        if not cl_found:
-            # print cl, 'not found'
-            out_path = '../runs/' + str(cl[0]) + '_run/output/err_out_2/'
-            cl_found, dummy = search_cluster(out_path, cl)
-            if not cl_found:
-                print cl, 'not found a second time'
+    mets = [np.array(z_round, dtype=float)[found].tolist(),
+            z_real[found].tolist()]
 
     return mets
 
@@ -0,0 +1,92 @@
+
+import sys
+from os import walk
+from os.path import join
+import time
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from scipy import stats
+sys.path.append('../functions/')
+import CMD_obs_vs_asteca as cmd
+from read_photom_files import get_data as gd, cache_ext
+
+
+def kde_limits_contour(phot_x, phot_y):
+    '''
+    Photometric diagram limits obtained with the original method: exact
+    Gaussian KDE plus the outer curve of a 30 levels matplotlib contour.
+    '''
+    xmin, xmax = min(phot_x), max(phot_x)
+    ymin, ymax = min(phot_y), max(phot_y)
+    # Stack photometric data.
+    values = np.vstack([phot_x, phot_y])
+    # Obtain Gaussian KDE.
+    kernel = stats.gaussian_kde(values)
+    # Grid density (number of points).
+    gd_c = complex(0, 25)
+    # Define x,y grid.
+    x, y = np.mgrid[xmin:xmax:gd_c, ymin:ymax:gd_c]
+    positions = np.vstack([x.ravel(), y.ravel()])
+    # Evaluate kernel in grid positions.
+    k_pos = kernel(positions)
+
+    # Generate 30 contour lines.
+    cs = plt.contour(x, y, np.reshape(k_pos, x.shape), 30)
+    # Only use the outer curve.
+    x_v, y_v = np.asarray([]), np.asarray([])
+    for lin in cs.collections[0].get_paths():
+        x_v = np.append(x_v, lin.vertices[:, 0])
+        y_v = np.append(y_v, lin.vertices[:, 1])
+    plt.clf()
+
+    return x_v, y_v
+
+
+def limits(x_v, y_v, phot_y):
+    '''
+    Same limits defined in 'CMD_obs_vs_asteca.diag_limits'.
+    '''
+    return min(x_v) - 1.25, max(x_v) + 1.25, max(y_v) + 1.25, \
+        min(phot_y) - 1.
+
+
+def main():
+    '''
+    Compare the CMD limits given by the binned KDE used in
+    'CMD_obs_vs_asteca.kde_limits', against those given by the exact KDE plus
+    matplotlib contour method, for every cluster data file.
+    '''
+    path = '../OCs_data/MC_all/'
+
+    diffs, t_old, t_new = [], 0., 0.
+    for root, dirs, files in walk(path):
+        for f in sorted(files):
+            if f.endswith(cache_ext):
+                continue
+            phot_data = gd(join(root, f))
+            phot_x, phot_y = phot_data[5], phot_data[3]
+
+            s = time.time()
+            lim_old = limits(*(kde_limits_contour(phot_x, phot_y) +
+                               (phot_y,)))
+            t_old += time.time() - s
+            s = time.time()
+            lim_new = limits(*(cmd.kde_limits(phot_x, phot_y) + (phot_y,)))
+            t_new += time.time() - s
+
+            d = np.array(lim_new) - np.array(lim_old)
+            diffs.append(d)
+            print '{:<12} {:>6} {:>7.3f} {:>7.3f} {:>7.3f} {:>7.3f}'.format(
+                f, len(phot_x), *d)
+
+    diffs = np.abs(np.array(diffs))
+    print '\nFields: {}'.format(len(diffs))
+    print 'Max abs diff (x_min, x_max, y_min, y_max):', diffs.max(axis=0)
+    print 'Mean abs diff (x_min, x_max, y_min, y_max):', diffs.mean(axis=0)
+    print 'Time contour: {:.2f} s ; binned: {:.2f} s'.format(t_old, t_new)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,178 @@
 
 import os
+import sys
+import heapq
 import numpy as np
-from os.path import exists, join, isfile, getsize
+from os.path import exists, join, isfile, basename, splitext, getsize
 from os import makedirs, listdir
 import shutil
 from itertools import cycle, chain
+from scipy.optimize import nnls
+sys.path.append('../functions/')
+from read_photom_files import get_data, cache_ext
 
 
-def done_move(dst_dir, data_files, folds_num):
+# Past ASteCA run times: one line per cluster with its name and the time (in
+# seconds) its processing took. Used to calibrate the cost model.
+times_file = 'asteca_run_times.dat'
+# Name of the manifest written in the folder of the photometry files.
+manifest_name = 'input_manifest.dat'
+# Copy the files into their folders. If False only the manifest is written.
+copy_files = True
+
+
+def skip_comments(f):
+    '''
+    Read lines that DO NOT start with a # symbol.
+    '''
+    for line in f:
+        if not line.strip().startswith('#'):
+            yield line
+
+
+def field_stats(data_file):
+    '''
+    Number of stars in the photometry file, and area of its field (in the
+    units of the x, y coordinates squared). No binary cache is written in
+    the source folder. Return None if the file can not be read.
+    '''
+    try:
+        x_data, y_data = get_data(data_file, use_cache=False)[1:3]
+    except (ValueError, IndexError):
+        return None
+    area = np.ptp(x_data) * np.ptp(y_data)
+
+    return len(x_data), area
+
+
+def size_stats(data_files, stats):
+    '''
+    Replace the stats of the files that could not be read: their number of
+    stars is estimated from their size (with the median size per star of the
+    rest) and their area is the median area.
+    '''
+    good = [[getsize(f), st] for f, st in zip(data_files, stats) if st]
+    if good:
+        sz_star = np.median([sz / float(max(st[0], 1)) for sz, st in good])
+        area = np.median([st[1] for sz, st in good])
+    else:
+        sz_star, area = 1., 0.
+    for i, f in enumerate(data_files):
+        if stats[i] is None:
+            print '{} could not be read, its cost is estimated from its ' \
+                'size.'.format(basename(f))
+            stats[i] = (int(getsize(f) / sz_star), area)
+
+    return stats
+
+
+def cost_features(n_stars, area):
     '''
-    Move 'data_file' to 'dst_dir' directory.
+    Terms of the cost model: a constant, the number of stars, its square
+    (the decontamination compares cluster and field stars) and the area.
+    Stars are counted in thousands and the area in millions, so the
+    coefficients have similar scales.
     '''
+    n_k = np.asarray(n_stars, dtype=float) / 1000.
+    return np.column_stack([np.ones(len(n_k)), n_k, n_k ** 2,
+                            np.asarray(area, dtype=float) / 1.e6])
 
-    # Cycle through sub-folders reversing when end of list is reached.
-    folds_num_rev = reversed(folds_num)
-    c = cycle(chain(folds_num, folds_num_rev))
 
-    # For each cluster file.
-    for i, cl_f in enumerate(data_files):
+def read_times(names):
+    '''
+    Past run times of the clusters in 'names', from 'times_file'. Clusters
+    that were not processed before are NaN.
+    '''
+    times = dict()
+    if exists(times_file):
+        with open(times_file) as f:
+            for line in skip_comments(f):
+                if line.split():
+                    name, t = line.split()[:2]
+                    times[name] = float(t)
+
+    return np.array([times.get(_, np.nan) for _ in names])
+
+
+def fit_costs(feats, times):
+    '''
+    Coefficients of the cost model fitted (non-negative least squares) to
+    the clusters with a past run time. With fewer of these than model
+    terms, the cost is just the number of stars.
+    '''
+    msk = ~np.isnan(times)
+    if msk.sum() < feats.shape[1]:
+        coef = np.zeros(feats.shape[1])
+        coef[1] = 1.
+        return coef, 0
+
+    coef = nnls(feats[msk], times[msk])[0]
+    return coef, msk.sum()
+
+
+def lpt_schedule(costs, n_folds):
+    '''
+    Longest processing time first: clusters are assigned, from the most to
+    the least costly, to the folder with the smallest total cost so far.
+    Returns the folder index of each cluster and the cost of each folder.
+    '''
+    folds = np.zeros(len(costs), dtype=int)
+    heap = [(0., _) for _ in range(n_folds)]
+    for i in np.argsort(costs, kind='mergesort')[::-1]:
+        load, j = heapq.heappop(heap)
+        folds[i] = j
+        heapq.heappush(heap, (load + costs[i], j))
+
+    return folds, np.bincount(folds, weights=costs, minlength=n_folds)
+
+
+def cycle_schedule(costs, n_folds):
+    '''
+    Folder of each cluster and cost of each folder when the clusters, from
+    the most to the least costly, cycle forward and backward through the
+    folders (previous distribution, kept for comparison).
+    '''
+    c = cycle(chain(range(n_folds), reversed(range(n_folds))))
+    folds = np.zeros(len(costs), dtype=int)
+    for i in np.argsort(costs, kind='mergesort')[::-1]:
+        folds[i] = c.next()
+
+    return folds, np.bincount(folds, weights=costs, minlength=n_folds)
+
+
+def balance(loads):
+    '''
+    Makespan (cost of the most loaded folder), ideal makespan (all folders
+    equally loaded), and imbalance (relative excess over the ideal).
+    '''
+    makespan, ideal = loads.max(), loads.mean()
+    return makespan, ideal, makespan / ideal - 1.
+
+
+def write_manifest(out_file, names, stats, costs, folds, folds_num, report):
+    '''
+    Write the folder assigned to each cluster along with its number of
+    stars, field area and estimated cost, sorted by folder.
+    '''
+    with open(out_file, 'w') as f:
+        for line in report:
+            f.write('# {}\n'.format(line))
+        f.write('#\n# {:<8} {:<20} {:>8} {:>12} {:>10}\n'.format(
+            'FOLDER', 'NAME', 'N', 'AREA', 'COST'))
+        for i in np.lexsort((names, folds)):
+            f.write('  {:<8} {:<20} {:>8d} {:>12.1f} {:>10.2f}\n'.format(
+                'input_' + folds_num[folds[i]], names[i], stats[i][0],
+                stats[i][1], costs[i]))
+
+
+def done_move(dst_dir, data_files, folds, folds_num):
+    '''
+    Copy each file in 'data_files' to its assigned 'dst_dir' sub-folder.
+    '''
+    for cl_f, j in zip(data_files, folds):
 
         # Name of sub-folder where file is moved.
-        sub_dir = dst_dir + c.next()
+        sub_dir = dst_dir + folds_num[j]
 
         # If the sub-dir doesn't exist, create it before moving the file.
         if not exists(sub_dir):
@@ -32,35 +184,6 @@ def done_move(dst_dir, data_files, folds_num):
             print "Data file already exists in destination folder."
 
 
-def get_files_by_file_size(mypath, reverse=False):
-    """
-    Return list of file paths in directory sorted by file size
-    Use reverse=True to return larger files first in list.
-    """
-
-    # Get list of files
-    filepaths = []
-    for basename in listdir(mypath):
-        filename = join(mypath, basename)
-        if isfile(filename):
-            filepaths.append(filename)
-
-    # Re-populate list with filename, size tuples
-    for i in xrange(len(filepaths)):
-        filepaths[i] = (filepaths[i], getsize(filepaths[i]))
-
-    # Sort list by file size
-    # If reverse=True sort from largest to smallest
-    # If reverse=False sort from smallest to largest
-    filepaths.sort(key=lambda filename: filename[1], reverse=reverse)
-
-    # Re-populate list with just filenames
-    for i in xrange(len(filepaths)):
-        filepaths[i] = filepaths[i][0]
-
-    return filepaths
-
-
 def main():
     '''
     '''
@@ -70,16 +193,43 @@ def main():
         r_path = '/home/gabriel/'
     mypath = r_path + 'github/asteca-project/asteca/input/dont_read/MC_all/'
 
-    # Read clusters file names and get their sizes. Larger files are located
-    # first in the list.
-    clusts_names_sz = get_files_by_file_size(mypath, reverse=True)
+    # Photometry files, skipping the binary caches of 'read_photom_files'.
+    data_files = sorted(join(mypath, _) for _ in listdir(mypath) if
+                        isfile(join(mypath, _)) and not
+                        _.endswith(cache_ext) and _ != manifest_name)
+    names = [splitext(basename(_))[0] for _ in data_files]
 
     # Number of folders to create.
     folds_num = [str(_ + 1).zfill(2) for _ in np.arange(30)]
     dst_dir = mypath + 'input_'
 
+    # Estimate the cost of each cluster.
+    stats = size_stats(data_files, [field_stats(_) for _ in data_files])
+    feats = cost_features(*zip(*stats))
+    coef, n_cal = fit_costs(feats, read_times(names))
+    costs = np.dot(feats, coef)
+
+    # Assign clusters to folders.
+    folds, loads = lpt_schedule(costs, len(folds_num))
+    makespan, ideal, imbal = balance(loads)
+    imbal_cycle = balance(cycle_schedule(costs, len(folds_num))[1])[2]
+
+    report = [
+        'Clusters: {}, folders: {}'.format(len(names), len(folds_num)),
+        'Cost model (1, N/1e3, (N/1e3)^2, area/1e6): {}, calibrated '
+        'with {} past runs'.format(np.round(coef, 4).tolist(), n_cal),
+        'Predicted makespan: {:.2f}, ideal: {:.2f}, imbalance: {:.1f}% '
+        '(cycling folders: {:.1f}%)'.format(makespan, ideal, 100. * imbal,
+                                            100. * imbal_cycle)]
+    for line in report:
+        print line
+
+    write_manifest(join(mypath, manifest_name), names, stats, costs, folds,
+                   folds_num, report)
+
     # Move files into folders.
-    done_move(dst_dir, clusts_names_sz, folds_num)
+    if copy_files:
+        done_move(dst_dir, data_files, folds, folds_num)
 
     print 'End.'
 
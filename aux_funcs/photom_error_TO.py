@@ -1,55 +1,157 @@
 
+import sys
 from os import walk
+from os.path import join
+from multiprocessing import Pool, cpu_count
 import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 import matplotlib.offsetbox as offsetbox
+from matplotlib.colors import LogNorm
 import numpy as np
+sys.path.append('../functions/')
+from read_photom_files import read_text, cache_ext
 
 
-def get_data(to_min, to_max, c_min, c_max):
+# Path to data files.
+path = '../OCs_data/MC_all/'
+
+# Bins of the errors in the 2D histograms, and errors counted as large.
+e_bins = np.linspace(0., 0.5, 101)
+e_large = 0.1
+# Number of bins of the magnitude (color) axis in the 2D histograms.
+n_hist = 80
+
+
+def new_acc(minv, maxv, step):
+    '''
+    Accumulator of the errors of the stars with values in [minv, maxv]: the
+    total number, sum and number of large errors, and the number, sum and
+    sum of squares of the errors in each 'step' interval, and their 2D
+    histogram.
+    '''
+    n_bins = len(np.arange(minv, maxv + step, step)) - 1
+    return {'lims': [minv, maxv, step], 'n': 0., 'sum': 0., 'n_large': 0.,
+            'n_bin': np.zeros(n_bins), 's_bin': np.zeros(n_bins),
+            's2_bin': np.zeros(n_bins),
+            'hist': np.zeros((n_hist, len(e_bins) - 1))}
+
+
+def add_stars(acc, vals, errs):
+    '''
+    Add the stars of a file to the accumulator.
     '''
+    minv, maxv, step = acc['lims']
+    msk = (minv <= vals) & (vals <= maxv)
+    vals, errs = vals[msk], errs[msk]
+    acc['n'] += len(vals)
+    acc['sum'] += errs.sum()
+    acc['n_large'] += (errs > e_large).sum()
+
+    # Intervals are closed on the left, so a value equal to 'maxv' is not
+    # part of any of them.
+    edges = np.arange(minv, maxv + step, step)
+    idx = np.searchsorted(edges, vals, side='right') - 1
+    n_bins = len(acc['n_bin'])
+    b_msk = idx < n_bins
+    idx, b_errs = idx[b_msk], errs[b_msk]
+    acc['n_bin'] += np.bincount(idx, minlength=n_bins)
+    acc['s_bin'] += np.bincount(idx, weights=b_errs, minlength=n_bins)
+    acc['s2_bin'] += np.bincount(idx, weights=b_errs ** 2, minlength=n_bins)
+
+    acc['hist'] += np.histogram2d(vals, errs, bins=[
+        np.linspace(minv, maxv, n_hist + 1), e_bins])[0]
+
+
+def merge_acc(acc, other):
     '''
+    Add the values of the 'other' accumulator to 'acc'.
+    '''
+    for k in ['n', 'sum', 'n_large', 'n_bin', 's_bin', 's2_bin', 'hist']:
+        acc[k] = acc[k] + other[k]
+
+
+def file_errors(args):
+    '''
+    Accumulators of the T1 and (C-T1) errors of the stars in a file. The raw
+    columns are used, so a star is counted for the magnitude (color) if its
+    magnitude (color) is in range, whatever its other values are. If the
+    file can not be read, the error is returned instead.
+    '''
+    data_file, t_lims, c_lims = args
+    t1_acc, c_acc = new_acc(*t_lims), new_acc(*c_lims)
+    try:
+        mag, e_mag, col, e_col = read_text(data_file)[3:]
+    except (ValueError, IndexError) as e:
+        return data_file, t1_acc, c_acc, str(e)
+    add_stars(t1_acc, mag, e_mag)
+    add_stars(c_acc, col, e_col)
+
+    return data_file, t1_acc, c_acc, ''
 
-    # Path to data file.
-    path = '../OCs_data/MC_all/'
-
-    # Go through each cluster data file.
-    t1_e, c_e, jt, kt, jc, kc = [], [], 0., 0., 0., 0.
-    for root, dirs, files in walk(path):
-        for f in files:
-            with open(root + f) as f1:
-                # if f == 'SL551.OUT':
-                #     break
-                print f
-                for line in f1:
-                    if not line.strip().startswith('#'):
-                        l = line.split()
-                        if l:
-                            if to_min <= float(l[3]) <= to_max:
-                                t1_e.append([float(l[3]), float(l[4])])
-                                jt += 1
-                                if float(l[4]) > 0.1:
-                                    kt += 1
-                                    # print l
-                            if c_min <= float(l[5]) <= c_max:
-                                c_e.append([float(l[5]), float(l[6])])
-                                jc += 1
-                                if float(l[6]) > 0.1:
-                                    kc += 1
-
-    print jt, kt, jc, kc
-    perc = [jt, kt, jc, kc]
-    return t1_e, c_e, perc
-
-
-def make_plot(minv, maxv, data, perc, avrg, e_avrg, id_tc):
+
+def get_data(t_lims, c_lims, n_jobs=None):
+    '''
+    Accumulate the photometric errors of every cluster data file. Each file
+    is read (in 'n_jobs' processes; 'None' uses all the available cores, 1
+    runs sequentially) and added to the totals, so the memory used does not
+    depend on the total number of stars. Files that can not be read are
+    reported and skipped.
+    '''
+    files = []
+    for root, dirs, f_names in walk(path):
+        for f in sorted(f_names):
+            # Skip binary cache files written by 'read_photom_files'.
+            if not f.endswith(cache_ext):
+                files.append([join(root, f), t_lims, c_lims])
+
+    t1_acc, c_acc = new_acc(*t_lims), new_acc(*c_lims)
+    n_jobs = cpu_count() if n_jobs is None else n_jobs
+    pool = Pool(n_jobs) if n_jobs > 1 else None
+    try:
+        results = pool.imap_unordered(file_errors, files) if pool else \
+            (file_errors(_) for _ in files)
+        for f, t1_f, c_f, err in results:
+            if err:
+                print '{}  could not be read ({})'.format(f, err)
+                continue
+            print f
+            merge_acc(t1_acc, t1_f)
+            merge_acc(c_acc, c_f)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    print t1_acc['n'], t1_acc['n_large'], c_acc['n'], c_acc['n_large']
+    return t1_acc, c_acc
+
+
+def average_errors(acc):
+    """
+    Center of each interval, and mean and standard deviation of the errors
+    in it.
+    """
+    minv, maxv, step = acc['lims']
+    avrg = minv + step * (np.arange(len(acc['n_bin'])) + 0.5)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        e_avrg = acc['s_bin'] / acc['n_bin']
+        e_std = np.sqrt(np.clip(acc['s2_bin'] / acc['n_bin'] - e_avrg ** 2,
+                                0., None))
+
+    return avrg, e_avrg, e_std
+
+
+def make_plot(acc, id_tc):
     """
     """
+    minv, maxv = acc['lims'][:2]
+    avrg, e_avrg, e_std = average_errors(acc)
+    e_mean = acc['sum'] / acc['n']
+
     fig = plt.figure(figsize=(6, 6))
     gs = gridspec.GridSpec(1, 1)
 
-    print('Mean {} error in [{}, {}]: {}'.format(id_tc, minv, maxv,
-          np.mean(zip(*data)[1])))
+    print('Mean {} error in [{}, {}]: {}'.format(id_tc, minv, maxv, e_mean))
 
     ax = plt.subplot(gs[0])
     plt.xlabel(r'${}\, (mag)$'.format(id_tc))
@@ -57,17 +159,20 @@ def make_plot(minv, maxv, data, perc, avrg, e_avrg, id_tc):
     plt.xlim(minv, maxv)
     plt.ylim(-0.005, 0.5)
     plt.minorticks_on()
-    plt.axhline(y=np.mean(zip(*data)[1]), lw=3, ls='--', color='r')
-    plt.scatter(zip(*data)[0], zip(*data)[1], lw=0.5)
-    # Average per 0.5 magnitude interval.
-    plt.scatter(avrg, e_avrg, c='g', s=50)
-    # for _ in np.arange(minv, maxv, 0.5):
+    plt.axhline(y=e_mean, lw=3, ls='--', color='r')
+    # Number of stars per bin.
+    hist = np.ma.masked_equal(acc['hist'].T, 0.)
+    plt.imshow(hist, origin='lower', extent=[minv, maxv, e_bins[0],
+               e_bins[-1]], aspect='auto', cmap='Blues', norm=LogNorm(),
+               interpolation='nearest')
+    # Average per magnitude (color) interval.
+    plt.errorbar(avrg, e_avrg, yerr=e_std, fmt='o', c='g', ms=7)
     # Text box.
-    text1 = r'$N={}$'.format(int(perc[0]))
+    text1 = r'$N={}$'.format(int(acc['n']))
     text2 = r'$\sigma_{{{}}}>0.1\;mag:\;{:.2f}\%$'.format(
-        id_tc, perc[1] / perc[0] * 100.)
+        id_tc, acc['n_large'] / acc['n'] * 100.)
     text3 = r'$\overline{{\sigma_{{{}}}}}={:.4f}\;mag$'.format(
-        id_tc, np.mean(zip(*data)[1]))
+        id_tc, e_mean)
     text = text1 + '\n' + text2 + '\n' + text3
     ob = offsetbox.AnchoredText(text, loc=9, prop=dict(size=12))
     ob.patch.set(alpha=0.95)
@@ -79,46 +184,22 @@ def make_plot(minv, maxv, data, perc, avrg, e_avrg, id_tc):
                 bbox_inches='tight')
 
 
-def average_errors(data, minv, maxv, step):
-    """
-    """
-
-    lims = np.arange(minv, maxv + step, step)
-    avrg, e_avrg = [], []
-    for _ in np.arange(minv + step / 2., maxv, step):
-        avrg.append(_)
-
-    for i, mi in enumerate(lims[:-1]):
-        e_int = []
-        for st in data:
-            if mi <= st[0] < lims[i + 1]:
-                e_int.append(st[1])
-        print mi
-        e_avrg.append(np.mean(e_int))
-
-    return avrg, e_avrg
-
-
 def main():
     '''
     Obtain photometric error for the T1 magnitude, and (C-T1) color.
     '''
 
-    to_min, to_max = 17., 21.
-    c_min, c_max = -0.5, 0.5
+    # Range and interval of the averages of each magnitude and color.
+    t_lims = [17., 21., 0.5]
+    c_lims = [-0.5, 0.5, 0.1]
 
-    # Read data from ASteCA output file.
-    t1_e, c_e, perc = get_data(to_min, to_max, c_min, c_max)
+    # Read data from all the cluster files.
+    t1_acc, c_acc = get_data(t_lims, c_lims)
 
-    t1_avrg, e_t1_avrg = average_errors(t1_e, to_min, to_max, 0.5)
     # Plot for T1
-    make_plot(to_min, to_max, t1_e, [perc[0], perc[1]], t1_avrg, e_t1_avrg,
-              'T_1')
-
-    c_avrg, e_c_avrg = average_errors(c_e, c_min, c_max, 0.1)
+    make_plot(t1_acc, 'T_1')
     # Plot for (C-T1)
-    make_plot(c_min, c_max, c_e, [perc[2], perc[3]], c_avrg, e_c_avrg,
-              '(C-T_1)')
+    make_plot(c_acc, '(C-T_1)')
 
 
 if __name__ == "__main__":
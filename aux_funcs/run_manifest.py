@@ -0,0 +1,394 @@
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+from os.path import join, isfile, isdir, basename, dirname, splitext, \
+    getmtime
+from os import walk, makedirs
+
+
+# File where the state of every cluster in every run is stored.
+manifest_file = '../runs/run_manifest.json'
+# Folder of the runs. Run 'XX' is stored in '<runs_path>XX_run/'.
+runs_path = '../runs/'
+# Past run times, as read by 'move_files_sizes.py'.
+times_file = 'asteca_run_times.dat'
+
+# Columns of the 'asteca_output_XX.dat' files.
+as_cols = ['NAME', 'c_x', 'e_x', 'c_y', 'e_y', 'r_cl', 'e_rcl', 'r_c', 'e_rc',
+           'r_t', 'e_rt', 'kcp', 'CI', 'n_memb_k', 'n_memb', 'n_memb_da',
+           'memb_par', 'a_f', 'prob_cl', 'int_col', 'met', 'e_m', 'age',
+           'e_a', 'E(B-V)', 'e_E', 'dist', 'e_d', 'M_i', 'e_M', 'bin_fr',
+           'e_bf', 'M1', 'M2'] + ['f' + str(_) for _ in range(1, 11)] + \
+    ['FC']
+
+# Files in the input folders that are not photometry files.
+skip_ext = ('.npz', '.png')
+skip_names = ('input_manifest.dat',)
+
+
+def load_manifest():
+    '''
+    Read the manifest. Return an empty one if it does not exist or can not
+    be read.
+    '''
+    try:
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+    except (IOError, ValueError):
+        manifest = {}
+    for k in ['files', 'runs', 'index']:
+        manifest.setdefault(k, {})
+
+    return manifest
+
+
+def save_manifest(manifest):
+    '''
+    Store the manifest, replacing the old one only once it is fully written.
+    '''
+    if not isdir(dirname(manifest_file)):
+        makedirs(dirname(manifest_file))
+    tmp_file = manifest_file + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.rename(tmp_file, manifest_file)
+
+
+def file_hash(path, file_cache):
+    '''
+    SHA1 of the contents of a file. The hash is only computed again if the
+    size or the modification time of the file changed since it was stored in
+    'file_cache'.
+    '''
+    st = os.stat(path)
+    cached = file_cache.get(path)
+    if cached is not None and cached[:2] == [st.st_size, st.st_mtime]:
+        return cached[2]
+
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    file_cache[path] = [st.st_size, st.st_mtime, sha.hexdigest()]
+
+    return sha.hexdigest()
+
+
+def run_order(run):
+    '''
+    Sort runs by their number (ie: '2nd' before '10th').
+    '''
+    num = re.match(r'\d+', run)
+    return (int(num.group()), run) if num else (sys.maxint, run)
+
+
+def input_files(in_path):
+    '''
+    Name, path and folder ('input_XX') of every photometry file found in
+    'in_path' and its sub-folders.
+    '''
+    files = []
+    for root, dirs, names in walk(in_path):
+        for f in sorted(names):
+            if not f.endswith(skip_ext) and f not in skip_names:
+                files.append([splitext(f)[0], join(root, f),
+                              basename(root.rstrip('/'))])
+
+    return files
+
+
+def plan(manifest, run, in_path):
+    '''
+    Register the clusters of a run from its input folder. Clusters already
+    done with the same input file are kept, the rest (new or changed) are
+    set as pending.
+    '''
+    jobs = manifest['runs'].setdefault(run, {})
+    n_new = 0
+    for name, path, folder in input_files(in_path):
+        f_hash = file_hash(path, manifest['files'])
+        job = jobs.get(name)
+        if job is not None and job['state'] == 'done' and \
+                job['hash'] == f_hash:
+            job['input'], job['folder'] = path, folder
+            continue
+        jobs[name] = {'state': 'pending', 'input': path, 'hash': f_hash,
+                      'folder': folder, 'outputs': [], 'start': None,
+                      'end': None, 'time': None}
+        n_new += 1
+
+    print '{} clusters in run {}, {} pending.'.format(len(jobs), run, n_new)
+
+
+def start(manifest, run, folders):
+    '''
+    Set the pending (or failed) clusters of the given folders (all if none
+    is given) as running, storing their start time.
+    '''
+    now, n = time.time(), 0
+    for name, job in manifest['runs'][run].items():
+        if job['state'] in ('pending', 'failed') and \
+                (not folders or job['folder'] in folders):
+            job['state'], job['start'] = 'running', now
+            n += 1
+
+    print '{} clusters running in run {}.'.format(n, run)
+
+
+def out_table(run):
+    '''
+    Path to the ASteCA output file of a run.
+    '''
+    return join(runs_path, run + '_run', 'asteca_output_' + run + '.dat')
+
+
+def table_offsets(out_file):
+    '''
+    Position (in bytes) of the line of each cluster in the output file.
+    '''
+    offsets = {}
+    with open(out_file) as f:
+        pos = f.tell()
+        for line in iter(f.readline, ''):
+            if line.strip() and not line.strip().startswith('#'):
+                offsets[line.split()[0]] = pos
+            pos = f.tell()
+
+    return offsets
+
+
+def output_files(run):
+    '''
+    Files of each cluster in the output folder of a run, by the cluster
+    name their file name starts with (ie: 'NGC294.png', 'NGC294_memb.dat').
+    '''
+    outs = {}
+    for root, dirs, names in walk(join(runs_path, run + '_run', 'output')):
+        for f in names:
+            outs.setdefault(splitext(f)[0].split('_')[0], []).append(
+                join(root, f))
+
+    return outs
+
+
+def run_times(jobs):
+    '''
+    Run time of the clusters done. ASteCA processes the clusters of a folder
+    one after the other, so each one starts when the previous one (started
+    at the same time) ended.
+    '''
+    folds = {}
+    for job in jobs.values():
+        if job['state'] == 'done' and job['start'] is not None:
+            folds.setdefault((job['folder'], job['start']), []).append(job)
+    for (folder, t_start), f_jobs in folds.items():
+        for job in sorted(f_jobs, key=lambda _: _['end']):
+            job['time'] = max(job['end'] - t_start, 0.)
+            t_start = max(job['end'], t_start)
+
+
+def sync(manifest, run, final):
+    '''
+    Set as done the clusters of the run present in its output file, storing
+    their output files, end time (last output written) and run time, and
+    the position of their line in the output file in the index. With
+    'final' the clusters still running are set as failed.
+    '''
+    out_file = out_table(run)
+    offsets = table_offsets(out_file) if isfile(out_file) else {}
+    outs = output_files(run)
+    jobs = manifest['runs'][run]
+
+    n_done, n_fail = 0, 0
+    for name, job in jobs.items():
+        if name in offsets:
+            manifest['index'].setdefault(name, {})[run] = [out_file,
+                                                           offsets[name]]
+        if job['state'] == 'done':
+            continue
+        if name in offsets:
+            job['state'] = 'done'
+            job['outputs'] = sorted(outs.get(name, []))
+            job['end'] = max(getmtime(_) for _ in job['outputs']) if \
+                job['outputs'] else time.time()
+            n_done += 1
+        elif final and job['state'] == 'running':
+            job['state'], job['end'] = 'failed', time.time()
+            n_fail += 1
+    run_times(jobs)
+
+    print '{} clusters done, {} failed in run {}.'.format(n_done, n_fail,
+                                                          run)
+
+
+def resume(manifest, run, out):
+    '''
+    Clusters of the run that must be processed (again): those not done, and
+    those whose input file changed since they were. Their input files are
+    listed in the 'out' file, if given.
+    '''
+    todo = []
+    for name, job in sorted(manifest['runs'][run].items()):
+        changed = not isfile(job['input']) or \
+            file_hash(job['input'], manifest['files']) != job['hash']
+        if job['state'] != 'done' or changed:
+            todo.append(job['input'])
+            print '{:<15} {:<8} {}'.format(
+                name, job['state'], 'changed' if changed else '')
+
+    print '{} clusters to process in run {}.'.format(len(todo), run)
+    if out:
+        with open(out, 'w') as f:
+            f.write('\n'.join(todo) + '\n')
+
+
+def status(manifest, runs):
+    '''
+    Number of clusters in each state, and total and mean run time, for each
+    run.
+    '''
+    for run in sorted(runs or manifest['runs'], key=run_order):
+        if run not in manifest['runs']:
+            print 'Run {} is not in the manifest.'.format(run)
+            continue
+        jobs = manifest['runs'][run].values()
+        states = dict((s, sum(_['state'] == s for _ in jobs)) for s in
+                      ['pending', 'running', 'done', 'failed'])
+        times = [_['time'] for _ in jobs if _['time'] is not None]
+        t_mean = sum(times) / len(times) if times else 0.
+        print '{:<6} {}  time: {:.0f} s (mean {:.1f} s)'.format(
+            run, ' '.join('{}: {}'.format(s, states[s]) for s in
+                          ['pending', 'running', 'done', 'failed']),
+            sum(times), t_mean)
+
+
+def read_line(manifest, name, run):
+    '''
+    Values in the line of the cluster in the output file of the run, found
+    at the position stored in the index. If the file was written again and
+    that line now belongs to another cluster, the file is indexed again.
+    Return None if the cluster is no longer in it.
+    '''
+    out_file, pos = manifest['index'][name][run]
+    try:
+        with open(out_file) as f:
+            f.seek(pos)
+            vals = f.readline().split()
+    except IOError:
+        vals = []
+    if vals and vals[0] == name:
+        return vals
+
+    # Index the file again, for every cluster of this run.
+    offsets = table_offsets(out_file) if isfile(out_file) else {}
+    for cl in manifest['index'].keys():
+        if run in manifest['index'][cl]:
+            if cl in offsets:
+                manifest['index'][cl][run] = [out_file, offsets[cl]]
+            else:
+                del manifest['index'][cl][run]
+    if name not in offsets:
+        return None
+    with open(out_file) as f:
+        f.seek(offsets[name])
+        return f.readline().split()
+
+
+def query(manifest, name, cols):
+    '''
+    Print the values of the 'cols' columns of a cluster in every run, read
+    from the line of each output file stored in the index.
+    '''
+    idx = [as_cols.index(_) for _ in cols]
+    print '{:<6} {:<8} {:>8} '.format('run', 'state', 'time') + \
+        ' '.join('{:>8}'.format(_) for _ in cols)
+    entries = manifest['index'].get(name, {})
+    for run in sorted(entries, key=run_order):
+        vals = read_line(manifest, name, run)
+        if vals is None:
+            print '{:<6} not in {} anymore'.format(run, out_table(run))
+            continue
+        job = manifest['runs'].get(run, {}).get(name, {})
+        t = job.get('time')
+        print '{:<6} {:<8} {:>8} '.format(
+            run, job.get('state', '-'), '-' if t is None else
+            '{:.0f}'.format(t)) + ' '.join('{:>8}'.format(vals[_]) for _ in
+                                           idx)
+
+
+def write_times(manifest):
+    '''
+    Write the run time of every cluster (from its latest run with one) to
+    'times_file', to calibrate the cost model of 'move_files_sizes.py'.
+    '''
+    times = {}
+    for run in sorted(manifest['runs'], key=run_order):
+        for name, job in manifest['runs'][run].items():
+            if job['time'] is not None:
+                times[name] = job['time']
+
+    with open(times_file, 'w') as f:
+        f.write('# NAME  time (s)\n')
+        for name in sorted(times):
+            f.write('{:<15} {:.1f}\n'.format(name, times[name]))
+    print '{} run times written to {}.'.format(len(times), times_file)
+
+
+def main():
+    '''
+    Track the state of the clusters processed by ASteCA in each run.
+    '''
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    sub = parser.add_subparsers(dest='cmd')
+    p = sub.add_parser('plan', help='register the input files of a run')
+    p.add_argument('run')
+    p.add_argument('in_path', help='folder with the input_XX folders')
+    p = sub.add_parser('start', help='set clusters as running')
+    p.add_argument('run')
+    p.add_argument('folders', nargs='*', help='only these input_XX folders')
+    p = sub.add_parser('sync', help='read the output of a run')
+    p.add_argument('run')
+    p.add_argument('--final', action='store_true',
+                   help='set clusters with no output as failed')
+    p = sub.add_parser('resume', help='list clusters to process again')
+    p.add_argument('run')
+    p.add_argument('-o', '--out', help='file to list their input files')
+    p = sub.add_parser('status', help='clusters in each state per run')
+    p.add_argument('runs', nargs='*')
+    p = sub.add_parser('query', help='values of a cluster in every run')
+    p.add_argument('name')
+    p.add_argument('cols', nargs='*', default=['E(B-V)', 'dist', 'age',
+                                                'e_a'])
+    sub.add_parser('times', help='write the run times of the clusters')
+    args = parser.parse_args()
+
+    manifest = load_manifest()
+    if args.cmd not in ('plan', 'status', 'query', 'times') and \
+            args.run not in manifest['runs']:
+        sys.exit('Run {} is not in the manifest.'.format(args.run))
+
+    if args.cmd == 'plan':
+        plan(manifest, args.run, args.in_path)
+    elif args.cmd == 'start':
+        start(manifest, args.run, args.folders)
+    elif args.cmd == 'sync':
+        sync(manifest, args.run, args.final)
+    elif args.cmd == 'resume':
+        resume(manifest, args.run, args.out)
+    elif args.cmd == 'status':
+        status(manifest, args.runs)
+    elif args.cmd == 'query':
+        query(manifest, args.name, args.cols)
+    elif args.cmd == 'times':
+        write_times(manifest)
+
+    save_manifest(manifest)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+
+import numpy as np
+from os.path import join, isfile, getmtime
+from os import walk, listdir
+from run_manifest import as_cols, run_order, runs_path, out_table
+
+
+# File where the values of every run are stored.
+store_file = join(runs_path, 'runs_store.npz')
+# Folders of each run (inside 'output/') with the 'pantalla' logs, in the
+# order they are searched.
+log_folds = ['err_out', 'err_out_2']
+
+
+def skip_comments(f):
+    '''
+    Read lines that DO NOT start with a # symbol.
+    '''
+    for line in f:
+        if not line.strip().startswith('#'):
+            yield line
+
+
+def find_runs():
+    '''
+    Runs with an output file in 'runs_path', sorted by their number.
+    '''
+    runs = [_[:-4] for _ in listdir(runs_path) if _.endswith('_run') and
+            isfile(out_table(_[:-4]))]
+    return sorted(runs, key=run_order)
+
+
+def fold_logs(run, fold):
+    '''
+    'pantalla' log files of a run in one of the 'log_folds' folders.
+    '''
+    files = []
+    for root, dirs, names in walk(join(runs_path, run + '_run', 'output',
+                                       fold)):
+        files += [join(root, _) for _ in sorted(names) if
+                  _.startswith('pantalla')]
+
+    return files
+
+
+def log_files(run):
+    '''
+    'pantalla' log files of a run.
+    '''
+    return sum([fold_logs(run, _) for _ in log_folds], [])
+
+
+def read_table(out_file):
+    '''
+    Names, values and lines of the clusters in an ASteCA output file. Values
+    that can not be converted are NaN.
+    '''
+    names, rows, lines = [], [], []
+    with open(out_file) as f:
+        for line in skip_comments(f):
+            vals = line.split()
+            if not vals:
+                continue
+            row = np.full(len(as_cols) - 1, np.nan)
+            for i, v in enumerate(vals[1:len(as_cols)]):
+                try:
+                    row[i] = float(v)
+                except ValueError:
+                    pass
+            names.append(vals[0])
+            rows.append(row)
+            lines.append(line.strip())
+
+    return names, rows, lines
+
+
+def read_log(log_file):
+    '''
+    NOT rounded metallicity of each cluster in a 'pantalla' log. It is found
+    in the line above 'Best fit param', and belongs to the first cluster
+    analyzed after the previous one.
+    '''
+    mets, n_store, prev = {}, [], ''
+    with open(log_file) as f:
+        for line in f:
+            if line.startswith('Analyzing') or line.startswith('Analizing'):
+                n_store.append(line.split()[2])
+            if line.startswith('Best fit param') and n_store:
+                mets.setdefault(n_store[0], float(prev.split()[2][1:-1]))
+                n_store = []
+            prev = line
+
+    return mets
+
+
+def build_store(runs):
+    '''
+    Read the output file and the logs of every run. Values are stored in a
+    (run, cluster, column) array, the lines of the output files in a (run,
+    cluster) one (empty where a cluster is missing), and the NOT rounded
+    metallicities in another (NaN where a cluster is missing).
+    '''
+    tables, logs, sources = [], [], []
+    for run in runs:
+        tables.append(read_table(out_table(run)))
+        mets = {}
+        for fold in log_folds:
+            # Inside a folder the last log a cluster is found in is used. A
+            # folder is only used for the clusters not found in the previous
+            # ones.
+            f_mets = {}
+            for log_file in fold_logs(run, fold):
+                f_mets.update(read_log(log_file))
+                sources.append(log_file)
+            for name, met in f_mets.items():
+                mets.setdefault(name, met)
+        logs.append(mets)
+        sources.append(out_table(run))
+
+    names = sorted(set(n for t in tables for n in t[0]))
+    c_idx = dict((n, i) for i, n in enumerate(names))
+    data = np.full((len(runs), len(names), len(as_cols) - 1), np.nan)
+    met_real = np.full((len(runs), len(names)), np.nan)
+    raw = [[''] * len(names) for _ in runs]
+    for r, ((t_names, rows, lines), mets) in enumerate(zip(tables, logs)):
+        if t_names:
+            data[r, [c_idx[_] for _ in t_names]] = rows
+        for n, line in zip(t_names, lines):
+            raw[r][c_idx[n]] = line
+        idx = [[c_idx[n], m] for n, m in mets.items() if n in c_idx]
+        if idx:
+            i, m = zip(*idx)
+            met_real[r, list(i)] = m
+
+    return {'runs': np.array(runs), 'names': np.array(names),
+            'cols': np.array(as_cols[1:]), 'data': data, 'raw': np.array(raw),
+            'met_real': met_real, 'sources': np.array(sources)}
+
+
+def load_store(force=False):
+    '''
+    Values of every run. The store is built again if any run was added, or
+    any output file or log was modified, since it was written.
+    '''
+    runs = find_runs()
+    sources = sorted(sum([log_files(_) + [out_table(_)] for _ in runs], []))
+    if not force and isfile(store_file):
+        t_store = getmtime(store_file)
+        with np.load(store_file) as npz:
+            store = dict((k, npz[k]) for k in npz.files)
+        if 'raw' in store and \
+                sorted(store['sources'].tolist()) == sources and \
+                all(getmtime(_) <= t_store for _ in sources):
+            return store
+
+    store = build_store(runs)
+    with open(store_file, 'wb') as f:
+        np.savez(f, **store)
+    print 'Store of {} runs and {} clusters written.'.format(
+        len(store['runs']), len(store['names']))
+
+    return store
+
+
+def indexes(keys, values):
+    '''
+    Position of each value in 'keys', -1 for those not present.
+    '''
+    keys = np.asarray(keys)
+    order = np.argsort(keys)
+    pos = np.searchsorted(keys, values, sorter=order)
+    pos = order[np.clip(pos, 0, len(keys) - 1)]
+    return np.where(keys[pos] == np.asarray(values), pos, -1)
+
+
+def lookup(store, runs, names, cols):
+    '''
+    Values of the 'cols' columns (or the NOT rounded metallicity 'met_real')
+    for each (run, cluster) pair. Shape (pairs, cols), NaN for pairs not in
+    the store.
+    '''
+    r_i, c_i = indexes(store['runs'], runs), indexes(store['names'], names)
+    found = (r_i >= 0) & (c_i >= 0)
+    vals = np.full((len(r_i), len(cols)), np.nan)
+    for j, col in enumerate(cols):
+        arr = store['met_real'] if col == 'met_real' else \
+            store['data'][:, :, list(store['cols']).index(col)]
+        vals[found, j] = arr[r_i[found], c_i[found]]
+
+    return vals
+
+
+def raw_lookup(store, runs, names, cols):
+    '''
+    Values of the 'cols' columns for each (run, cluster) pair, as written in
+    the output files. None for pairs not in the store.
+    '''
+    r_i, c_i = indexes(store['runs'], runs), indexes(store['names'], names)
+    idx = [as_cols.index(_) for _ in cols]
+    vals = []
+    for r, c in zip(r_i, c_i):
+        line = store['raw'][r, c].split() if r >= 0 and c >= 0 else []
+        vals.append([line[_] for _ in idx] if line else None)
+
+    return vals
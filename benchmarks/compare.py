@@ -0,0 +1,125 @@
+
+import sys
+import json
+import argparse
+import numpy as np
+
+
+def load_samples(files):
+    '''
+    Times of each benchmark or stage found in the JSON 'files', as written by
+    'benchmarks/run_bench.py' ('bench size' keys, one sample per timed call)
+    or in the run report of the main script ('stage' keys, one sample per
+    report with the total time of the stage).
+    '''
+    samples, commits = {}, []
+    for f_name in files:
+        with open(f_name) as f:
+            report = json.load(f)
+        commits.append(report.get('commit'))
+        if 'results' in report:
+            for res in report['results']:
+                if not res.get('skipped'):
+                    key = '{} {}'.format(res['bench'], res['size'])
+                    samples.setdefault(key, []).extend(res['times'])
+        else:
+            for st in report['stages']:
+                samples.setdefault(st['name'], []).append(st['wall'])
+
+    return samples, commits
+
+
+def stats(times):
+    '''
+    Median and inter-quartile range of the times.
+    '''
+    q25, q50, q75 = np.percentile(times, [25, 50, 75])
+    return q50, q75 - q25
+
+
+def sort_key(key):
+    '''
+    Order benchmarks by name and then by size.
+    '''
+    name, _, size = key.rpartition(' ')
+    return (name, int(size)) if name and size.isdigit() else (key, 0)
+
+
+def compare(base, new, threshold, noise, min_time):
+    '''
+    Compare the median time of each key present in both runs. A change is
+    only significant if it is larger than 'threshold' percent of the base
+    median, and larger than 'noise' times the largest IQR of both runs.
+    Times below 'min_time' seconds are too noisy to be compared.
+    '''
+    rows = []
+    for key in sorted(set(base) & set(new), key=sort_key):
+        b_med, b_iqr = stats(base[key])
+        n_med, n_iqr = stats(new[key])
+        change = 100. * (n_med - b_med) / b_med if b_med > 0. else 0.
+        signif = abs(n_med - b_med) > noise * max(b_iqr, n_iqr) and \
+            abs(change) > threshold and max(b_med, n_med) >= min_time
+        if not signif:
+            status = ''
+        elif change > 0.:
+            status = 'REGRESSION'
+        else:
+            status = 'faster'
+        rows.append([key, b_med, b_iqr, n_med, n_iqr, change, status])
+
+    return rows
+
+
+def main():
+    '''
+    Compare two sets of benchmark results (or run reports) and exit with an
+    error if any time regressed beyond the threshold.
+    '''
+    parser = argparse.ArgumentParser(
+        description="Compare benchmark results or run reports.")
+    parser.add_argument(
+        '-b', '--base', nargs='+', required=True,
+        help="JSON files of the base run (ie: the previous commit). Pass "
+        "several run reports to use the repeated runs as samples.")
+    parser.add_argument(
+        '-n', '--new', nargs='+', required=True,
+        help="JSON files of the new run.")
+    parser.add_argument(
+        '-t', '--threshold', type=float, default=10.,
+        help="Slowdown (percent) above which a change is a regression. "
+        "Default: 10.")
+    parser.add_argument(
+        '-k', '--noise', type=float, default=1.,
+        help="A change must also be larger than this many times the IQR of "
+        "the runs. Default: 1.")
+    parser.add_argument(
+        '-m', '--min-time', type=float, default=0.001,
+        help="Times below this (seconds) are not compared. Default: 0.001.")
+    args = parser.parse_args()
+
+    base, b_commits = load_samples(args.base)
+    new, n_commits = load_samples(args.new)
+    # Older run reports do not store their commit.
+    print 'Base: {}'.format(', '.join(_[:7] for _ in b_commits if _))
+    print 'New:  {}\n'.format(', '.join(_[:7] for _ in n_commits if _))
+
+    rows = compare(base, new, args.threshold, args.noise, args.min_time)
+    print '{:<28} {:>19} {:>19} {:>8}'.format(
+        'Benchmark', 'Base (s) +- IQR', 'New (s) +- IQR', 'Change')
+    for key, b_med, b_iqr, n_med, n_iqr, change, status in rows:
+        print '{:<28} {:>10.4f} {:>8.4f} {:>10.4f} {:>8.4f} {:>+7.1f}% ' \
+            '{}'.format(key, b_med, b_iqr, n_med, n_iqr, change, status)
+    for key in sorted(set(base) ^ set(new), key=sort_key):
+        print '{:<28} only in the {} run'.format(
+            key, 'base' if key in base else 'new')
+
+    regress = [_[0] for _ in rows if _[-1] == 'REGRESSION']
+    if regress:
+        print '\n{} regressions above {:.0f}%: {}'.format(
+            len(regress), args.threshold, ', '.join(regress))
+        sys.exit(1)
+    print '\nNo regressions above {:.0f}%.'.format(args.threshold)
+
+
+if __name__ == "__main__":
+    main()
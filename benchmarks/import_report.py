@@ -0,0 +1,151 @@
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import __builtin__
+
+
+# Root folder of the repository.
+r_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+# Modules imported by each startup path. 'text' is what a run that only
+# prints the ASteCA vs literature differences ('diffs' stage) needs.
+paths = {
+    'text': ['mc_cat_analysis'],
+    'plots': ['mc_cat_analysis', 'functions.make_all_plots',
+              'functions.ra_dec_map']
+}
+
+# Libraries that should not be loaded by the text-only path.
+heavy = ['matplotlib', 'mpl_toolkits', 'astroML', 'astropy']
+
+
+def timed_imports(modules):
+    '''
+    Import 'modules' timing every module loaded for the first time, in the
+    same way as Python 3's '-X importtime'. Return a list with the name,
+    self time and cumulative time (in seconds) of each one.
+    '''
+    orig_import = __builtin__.__import__
+    stack, times = [], []
+
+    def timed_import(name, *args, **kwargs):
+        before = set(sys.modules)
+        stack.append(0.)
+        s = time.time()
+        try:
+            return orig_import(name, *args, **kwargs)
+        finally:
+            cumul = time.time() - s
+            child = stack.pop()
+            if stack:
+                stack[-1] += cumul
+            new = set(sys.modules) - before
+            if new:
+                # Name the import by the module requested, as resolved by
+                # implicit relative imports (ie: 'functions.kde_map').
+                full = [_ for _ in new if _ == name or
+                        _.endswith('.' + name)]
+                times.append([min(full or new, key=len), cumul - child,
+                              cumul])
+
+    __builtin__.__import__ = timed_import
+    try:
+        for mod in modules:
+            __import__(mod)
+    finally:
+        __builtin__.__import__ = orig_import
+
+    return times
+
+
+def run_child(path):
+    '''
+    Time the imports of a startup path in a fresh interpreter.
+    '''
+    out = subprocess.check_output(
+        [sys.executable, os.path.realpath(__file__), '--child', path],
+        cwd=r_path)
+    return json.loads(out.splitlines()[-1])
+
+
+def summary(path, runs, top):
+    '''
+    Print the total import time of a startup path (best of all the runs),
+    the slowest modules and the time of each top level package.
+    '''
+    times = min(runs, key=lambda r: sum(_[1] for _ in r))
+    total = sum(_[1] for _ in times)
+
+    print "\nStartup path '{}': {:.3f} s, {} modules".format(
+        path, total, len(times))
+    print '\n  {:<45} {:>9} {:>11}'.format('Module', 'Self (s)', 'Cumul (s)')
+    for name, self_t, cumul in sorted(times, key=lambda x: -x[2])[:top]:
+        print '  {:<45} {:>9.3f} {:>11.3f}'.format(name, self_t, cumul)
+
+    pkgs = {}
+    for name, self_t, cumul in times:
+        pkg = name.split('.')[0]
+        pkgs[pkg] = pkgs.get(pkg, 0.) + self_t
+    print '\n  {:<45} {:>9}'.format('Package', 'Time (s)')
+    for pkg, t in sorted(pkgs.items(), key=lambda x: -x[1])[:top]:
+        print '  {:<45} {:>9.3f}'.format(pkg, t)
+
+    return total, set(pkgs)
+
+
+def main():
+    '''
+    Report the import time of the main script, for the text-only path and
+    for the plotting path. Exit with an error if the text-only path exceeds
+    the startup budget, or if it loads any plotting/astronomy library.
+    '''
+    parser = argparse.ArgumentParser(
+        description="Import time report of the main script.")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument(
+        '-b', '--budget', type=float, default=1.,
+        help="Startup budget for the text-only path, in seconds. "
+        "Default: 1.")
+    parser.add_argument(
+        '-n', '--runs', type=int, default=3,
+        help="Number of runs for each path, the best one is reported. "
+        "Default: 3.")
+    parser.add_argument(
+        '-t', '--top', type=int, default=15,
+        help="Number of modules and packages listed. Default: 15.")
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, r_path)
+        print json.dumps(timed_imports(paths[args.child]))
+        return
+
+    results = {}
+    for path in ['text', 'plots']:
+        runs = [run_child(path) for _ in range(args.runs)]
+        results[path] = summary(path, runs, args.top)
+
+    total, pkgs = results['text']
+    loaded = [_ for _ in heavy if _ in pkgs]
+    failed = False
+    print ''
+    if total > args.budget:
+        print "Text-only startup ({:.3f} s) is over the budget ({:.3f} s).".\
+            format(total, args.budget)
+        failed = True
+    if loaded:
+        print "Text-only startup loads: {}".format(', '.join(loaded))
+        failed = True
+    if not failed:
+        print "Text-only startup ({:.3f} s) within budget ({:.3f} s).".format(
+            total, args.budget)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+
+
+# Root folder of the repository.
+r_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+# 'databases/' and 'extinction_MCEV/' are not packages, their modules are
+# imported as scripts.
+for path in [r_path, os.path.join(r_path, 'databases'),
+             os.path.join(r_path, 'extinction_MCEV'),
+             os.path.join(r_path, 'benchmarks')]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import synth_data as sd
+
+# Sizes of each kind of input: number of clusters, stars per field and
+# isochrones per metallicity file. The larger sizes are only used with
+# '--full'.
+sizes = {
+    'clusters': [100, 1000, 10000],
+    'stars': [1000, 10000, 100000],
+    'isochrones': [10, 100, 1000]
+}
+full_sizes = {
+    'clusters': [100, 1000, 10000, 100000],
+    'stars': [1000, 10000, 100000, 1000000],
+    'isochrones': [10, 100, 1000]
+}
+
+# Number of grid points per axis used by the KDE benchmarks.
+grid_dens = 50
+
+# Default folder for the results.
+results_path = os.path.join(r_path, 'benchmarks', 'results')
+
+
+def kde_arrays(n, rng):
+    '''
+    Age (Gyr) and [Fe/H] values, with errors, of 'n' clusters.
+    '''
+    age = 10 ** (rng.uniform(6.6, 10.1, n) - 9)
+    e_age = np.log(10) * age * rng.uniform(0.05, 0.5, n)
+    feh = rng.uniform(-2., 0., n)
+    e_feh = rng.uniform(0.05, 0.5, n)
+
+    return age, e_age, feh, e_feh
+
+
+def setup_kde_2d(n, tmp_path, rng):
+    '''
+    2D KDE of the age-metallicity values of 'n' clusters.
+    '''
+    from functions.kde_map import kde_2d
+    age, e_age, feh, e_feh = kde_arrays(n, rng)
+    ext = [min(age - e_age), max(age + e_age), min(feh - e_feh),
+           max(feh + e_feh)]
+    return lambda: kde_2d(age, e_age, feh, e_feh, ext, grid_dens)
+
+
+def setup_age_met_rel(n, tmp_path, rng):
+    '''
+    Weighted [Fe/H] of the age-metallicity grid of 'n' clusters.
+    '''
+    from functions.amr_kde import age_met_rel
+    age, e_age, feh, e_feh = kde_arrays(n, rng)
+    # Grid step that gives 'grid_dens' points per axis.
+    grid_step = (max(feh + e_feh) - min(feh - e_feh)) / grid_dens
+    return lambda: age_met_rel(age, e_age, feh, e_feh, grid_step)
+
+
+def setup_feh_avrg(n, tmp_path, rng):
+    '''
+    Average [Fe/H] per age bin, for 'n' clusters in both Clouds.
+    '''
+    from functions.amr_kde import feh_avrg
+    age_gyr, age_vals, met_weighted = [], [], []
+    for k in [0, 1]:
+        age, e_age, feh, e_feh = kde_arrays(n // 2, rng)
+        age_gyr.append([age, e_age])
+        age_vals.append(np.linspace(min(age), max(age), 200))
+        met_weighted.append([rng.uniform(-2., 0., 200),
+                             rng.uniform(0.05, 0.5, 200)])
+    return lambda: feh_avrg(age_gyr, 'knuth', age_vals, met_weighted)
+
+
+def setup_match_clusters(n, tmp_path, rng):
+    '''
+    Index of 'n' ASteCA clusters in a literature table of 'n' rows.
+    '''
+    from functions.match_clusters import match_clusters
+    names = sd.cl_names(n)
+    cl_dict = sd.lit_table(names, rng)
+    # The literature table is not ordered as the ASteCA output.
+    as_names = [names[_] for _ in rng.permutation(n)]
+    return lambda: match_clusters(as_names, cl_dict)
+
+
+def setup_match_clusts(n, tmp_path, rng):
+    '''
+    Cross-match of 'n' clusters with the seven databases.
+    '''
+    from cross_match import match_clusts
+    names = sd.cl_names(n)
+    as_pars = sd.asteca_pars(n, rng)
+    lit = sd.lit_lists(sd.lit_table(names, rng))
+    dbs = sd.db_entries(names, rng)
+    return lambda: match_clusts(*([names, as_pars] + lit + dbs))
+
+
+def setup_get_isoch(n, tmp_path, rng):
+    '''
+    Read an isochrone from a metallicity file with 'n' isochrones.
+    '''
+    from functions.CMD_obs_vs_asteca import get_isoch
+    iso_path = os.path.join(tmp_path, 'mc-catalog', 'functions')
+    if not os.path.isdir(iso_path):
+        os.makedirs(iso_path)
+    with open(os.path.join(iso_path, '0.004_marigo.dat'), 'w') as f:
+        f.writelines(sd.isoch_lines(0.004, n, 150, rng))
+    # The isochrone in the middle of the file.
+    age = sd.isoch_ages(n)[n // 2]
+    return lambda: get_isoch(tmp_path + os.sep, 'outliers', 'M08', 0.004,
+                             age, 0.1, 18.5)
+
+
+def phot_file(n, tmp_path, rng):
+    '''
+    Write a photometry file with 'n' stars.
+    '''
+    data_file = os.path.join(tmp_path, 'SYN_{}.OUT'.format(n))
+    sd.write_rows(data_file, sd.photometry(n, rng))
+    return data_file
+
+
+def setup_get_data(n, tmp_path, rng):
+    '''
+    Read a photometry file with 'n' stars, parsing the text file.
+    '''
+    from functions.read_photom_files import get_data
+    data_file = phot_file(n, tmp_path, rng)
+    return lambda: get_data(data_file, use_cache=False)
+
+
+def setup_get_data_cached(n, tmp_path, rng):
+    '''
+    Read a photometry file with 'n' stars from its binary cache.
+    '''
+    from functions.read_photom_files import get_data
+    data_file = phot_file(n, tmp_path, rng)
+    # Write the cache.
+    get_data(data_file)
+    return lambda: get_data(data_file)
+
+
+def setup_get_ext_values(n, tmp_path, rng):
+    '''
+    Extinction values of 'n' clusters, with ~10 MCEV regions each.
+    '''
+    from extin_analysis import get_ext_values
+    ext_pars, clust_idx = sd.mcev_table(n, 10, rng)
+    return lambda: get_ext_values(ext_pars, clust_idx)
+
+
+# Function that prepares each benchmark (returning the function to time),
+# and the kind of size it is run for.
+benchmarks = [
+    ['kde_2d', setup_kde_2d, 'clusters'],
+    ['age_met_rel', setup_age_met_rel, 'clusters'],
+    ['feh_avrg', setup_feh_avrg, 'clusters'],
+    ['match_clusters', setup_match_clusters, 'clusters'],
+    ['match_clusts', setup_match_clusts, 'clusters'],
+    ['get_isoch', setup_get_isoch, 'isochrones'],
+    ['get_data', setup_get_data, 'stars'],
+    ['get_data_cached', setup_get_data_cached, 'stars'],
+    ['get_ext_values', setup_get_ext_values, 'clusters']
+]
+
+
+def git_info():
+    '''
+    Commit checked out, and whether the tree has uncommitted changes.
+    '''
+    with open(os.devnull, 'w') as null:
+        try:
+            commit = subprocess.check_output(
+                ['git', 'rev-parse', 'HEAD'], cwd=r_path,
+                stderr=null).strip()
+            dirty = bool(subprocess.check_output(
+                ['git', 'status', '--porcelain', '--untracked-files=no'],
+                cwd=r_path, stderr=null).strip())
+        except (OSError, subprocess.CalledProcessError):
+            commit, dirty = None, None
+
+    return commit, dirty
+
+
+def time_call(func, repeat, max_time):
+    '''
+    Call 'func' 'repeat' times and return the time of each call. Stop
+    repeating once the total time exceeds 'max_time'. The output printed by
+    'func' is discarded.
+    '''
+    times = []
+    stdout = sys.stdout
+    with open(os.devnull, 'w') as null:
+        try:
+            for _ in range(repeat):
+                sys.stdout = null
+                s = time.time()
+                func()
+                times.append(time.time() - s)
+                if sum(times) > max_time:
+                    break
+        finally:
+            sys.stdout = stdout
+
+    return times
+
+
+def stats(times):
+    '''
+    Median, inter-quartile range and minimum of the times.
+    '''
+    q25, q50, q75 = np.percentile(times, [25, 50, 75])
+    return {'median': q50, 'iqr': q75 - q25, 'min': min(times),
+            'times': times, 'repeat': len(times)}
+
+
+def main():
+    '''
+    Time the hot paths of the code on synthetic data of increasing sizes,
+    and store the results as JSON.
+    '''
+    parser = argparse.ArgumentParser(
+        description="Benchmark the hot paths of the code on synthetic data.")
+    parser.add_argument(
+        'bench', nargs='*', default=[_[0] for _ in benchmarks],
+        help="Benchmarks to run. Default: all of them ({}).".format(
+            ', '.join(_[0] for _ in benchmarks)))
+    parser.add_argument(
+        '--full', action='store_true',
+        help="Also run the largest sizes (10^5 clusters, 10^6 stars).")
+    parser.add_argument(
+        '-r', '--repeat', type=int, default=5,
+        help="Number of timed calls for each size. Default: 5.")
+    parser.add_argument(
+        '-m', '--max-time', type=float, default=30.,
+        help="Larger sizes of a benchmark are skipped once a size takes "
+        "longer than this (seconds). Default: 30.")
+    parser.add_argument(
+        '-o', '--output',
+        help="Output JSON file. Default: "
+        "'benchmarks/results/bench_<commit>.json'.")
+    parser.add_argument('--seed', type=int, default=12345,
+                        help="Random seed. Default: 12345.")
+    args = parser.parse_args()
+
+    unknown = set(args.bench) - set(_[0] for _ in benchmarks)
+    if unknown:
+        parser.error("unknown benchmarks: {}".format(', '.join(unknown)))
+
+    commit, dirty = git_info()
+    tmp_path = tempfile.mkdtemp(prefix='mc_bench_')
+    results = []
+    try:
+        for name, setup, kind in benchmarks:
+            if name not in args.bench:
+                continue
+            slow = False
+            for n in (full_sizes if args.full else sizes)[kind]:
+                res = {'bench': name, 'size': n, 'unit': kind}
+                if slow:
+                    res['skipped'] = True
+                    results.append(res)
+                    print '{:<16} {:>8} {:<10}  skipped'.format(name, n, kind)
+                    continue
+
+                func = setup(n, tmp_path, np.random.RandomState(args.seed))
+                res.update(stats(time_call(func, args.repeat, args.max_time)))
+                results.append(res)
+                print '{:<16} {:>8} {:<10} {:>10.4f} s  (IQR {:.4f} s, ' \
+                    '{} runs)'.format(name, n, kind, res['median'],
+                                      res['iqr'], res['repeat'])
+                slow = res['median'] > args.max_time
+    finally:
+        shutil.rmtree(tmp_path)
+
+    report = {
+        'commit': commit, 'dirty': dirty,
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': sys.version.split()[0], 'numpy': np.__version__,
+        'host': socket.gethostname(), 'argv': sys.argv,
+        'grid_dens': grid_dens, 'results': results}
+
+    out_file = args.output or os.path.join(
+        results_path, 'bench_{}.json'.format((commit or 'unknown')[:7]))
+    if os.path.dirname(out_file) and not os.path.isdir(
+            os.path.dirname(out_file)):
+        os.makedirs(os.path.dirname(out_file))
+    with open(out_file, 'w') as f:
+        json.dump(report, f, indent=1, sort_keys=True)
+    print '\nResults written to: {}'.format(out_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+
+import os
+import argparse
+import numpy as np
+
+
+# Columns of the literature .ods file read by the code.
+lit_cols = [
+    u'Name', u'ra_deg', u'dec_deg', u'Galaxia', u'[Fe/H] (dex)', u'e_Fe/H',
+    u'log(age)', u'e_log(age)', u'E(B-V) (lit)', u'e_E(B-V)',
+    u'(m-M)o (mag)', u'e_(m-M)o', u'rad (eye)', u'arcsec/pixel',
+    u'E_B_V_SandF', u'stdev_E_B_V_SandF', u'E_BV_closer_MCEV', u'E_BV_max',
+    u'E_BV_std_dev', u'Dist (deg)', u'Mass', u'e_mass']
+
+# Center and size (deg) of each Cloud, used to place the clusters.
+gal_coords = {'SMC': [13.19, -72.83, 2.], 'LMC': [80.89, -69.76, 5.]}
+
+# Databases stored in 'matched_clusters.dat'.
+db_names = ['P99', 'P00', 'H03', 'R05', 'C06', 'G10', 'P12']
+
+
+def cl_names(n_cls):
+    '''
+    Names of the synthetic clusters. The first half are SMC clusters, the
+    rest LMC clusters.
+    '''
+    return ['SYN{:06d}'.format(i) for i in range(n_cls)]
+
+
+def galaxy(i, n_cls):
+    '''
+    Galaxy of the i-th synthetic cluster.
+    '''
+    return 'SMC' if i < n_cls // 2 else 'LMC'
+
+
+def asteca_pars(n_cls, rng):
+    '''
+    ASteCA parameters of 'n_cls' clusters, as the strings read from the
+    'asteca_output_final.dat' file (name not included).
+    '''
+    as_pars = []
+    for i in range(n_cls):
+        age, e_age = rng.uniform(6.6, 10.1), rng.uniform(0.05, 0.5)
+        z = 10 ** rng.uniform(-3.3, -1.8)
+        dm = 18.96 if galaxy(i, n_cls) == 'SMC' else 18.49
+        pars = [
+            rng.uniform(100., 4000.), 0., rng.uniform(100., 4000.), 0.,
+            rng.uniform(20., 200.), rng.uniform(2., 20.),
+            rng.uniform(5., 50.), rng.uniform(1., 10.), -1., -1., -1.,
+            rng.uniform(0., 1.), -1., rng.randint(10, 500), 0., 'inf', 1.,
+            rng.uniform(0., 1.), rng.uniform(-1., 2.),
+            z, z * rng.uniform(0.1, 1.), age, e_age,
+            rng.uniform(0., 0.3), rng.uniform(0.01, 0.1),
+            dm + rng.uniform(-0.2, 0.2), rng.uniform(0.05, 0.2),
+            10 ** rng.uniform(2., 4.5), rng.uniform(50., 500.),
+            rng.uniform(0., 1.), -1.] + [rng.randint(0, 2) for _ in range(12)]
+        as_pars.append(['{:.4f}'.format(_) if isinstance(_, float) else
+                        str(_) for _ in pars])
+
+    return as_pars
+
+
+def lit_table(names, rng):
+    '''
+    Literature table as returned by 'pyexcel_ods.get_data' for the
+    "S-LMC" sheet: the columns names followed by a row per cluster.
+    '''
+    rows = [list(lit_cols)]
+    for i, name in enumerate(names):
+        gal = galaxy(i, len(names))
+        ra_c, dec_c, size = gal_coords[gal]
+        rows.append([
+            name, ra_c + rng.uniform(-size, size) * 2.,
+            dec_c + rng.uniform(-size, size), gal,
+            rng.uniform(-2., 0.), rng.uniform(0.05, 0.3),
+            rng.uniform(6.6, 10.1), rng.uniform(0.05, 0.3),
+            rng.uniform(0., 0.3), rng.uniform(0.01, 0.1),
+            18.96 if gal == 'SMC' else 18.49, 0.05, rng.uniform(20., 200.),
+            rng.uniform(0.2, 0.5), rng.uniform(0., 0.3), rng.uniform(0., 0.05),
+            rng.uniform(0., 0.3), rng.uniform(0., 0.4), rng.uniform(0., 0.1),
+            rng.uniform(0., 0.2), 10 ** rng.uniform(2., 4.5),
+            rng.uniform(50., 500.)])
+
+    return rows
+
+
+def lit_lists(lit):
+    '''
+    Names, ages, extinctions, masses (with their errors) and pixel scales of
+    the literature table, as returned by 'databases/cross_match.py'.
+    '''
+    idx = [lit[0].index(_) for _ in [
+        u'Name', u'log(age)', u'e_log(age)', u'E(B-V) (lit)', u'e_E(B-V)',
+        u'Mass', u'e_mass', u'arcsec/pixel']]
+    cols = [[row[_] for row in lit[1:]] for _ in idx]
+    cols[0] = [str(_) for _ in cols[0]]
+
+    return cols
+
+
+def db_entries(names, rng, frac=0.25):
+    '''
+    Entries of the seven databases, in the format produced by the
+    'read_*' functions of 'databases/cross_match.py':
+    [gal, [names], log_age, e_age, ext or mass, e_mass]
+
+    Each database contains a random fraction 'frac' of the clusters, plus
+    an alternative name for some of them.
+    '''
+    dbs = []
+    for db in db_names:
+        entries = []
+        sel = rng.choice(len(names), int(len(names) * frac), replace=False)
+        for i in sorted(sel):
+            cl_ns = [names[i]] + (['ALT' + names[i][3:]] if rng.uniform() <
+                                  0.2 else [])
+            if db in ['H03', 'P12']:
+                entries.append([galaxy(i, len(names)), cl_ns,
+                                rng.uniform(6.6, 10.1), rng.uniform(0.05, 0.3),
+                                10 ** rng.uniform(2., 4.5),
+                                rng.uniform(50., 500.)])
+            else:
+                entries.append([galaxy(i, len(names)), cl_ns,
+                                rng.uniform(6.6, 10.1), rng.uniform(0.05, 0.3),
+                                rng.uniform(0., 0.3)])
+        dbs.append(entries)
+
+    return dbs
+
+
+def photometry(n_stars, rng, bad=0.01):
+    '''
+    Rows of a photometry file with 'n_stars' stars: id, x, y, T1, e_T1,
+    C-T1, e_(C-T1). A fraction 'bad' of the stars have 'INDEF' or 99.999
+    values, as found in the real files.
+    '''
+    mag = rng.uniform(14., 24., n_stars)
+    e_mag = 0.005 + 0.01 * np.exp(mag - 20.)
+    col = rng.normal(1., 0.5, n_stars)
+    phot = np.array([rng.uniform(0., 4000., n_stars),
+                     rng.uniform(0., 4000., n_stars), mag, e_mag, col,
+                     1.4 * e_mag]).T
+    rows = [[str(i + 1)] + ['{:.3f}'.format(_) for _ in st] for i, st in
+            enumerate(phot)]
+    # Replace a mag, color or error value of the bad stars.
+    for i in np.flatnonzero(rng.uniform(size=n_stars) < bad):
+        rows[i][rng.randint(3, 7)] = 'INDEF' if rng.uniform() < 0.5 else \
+            '99.999'
+
+    return rows
+
+
+def memb_rows(n_stars, rng):
+    '''
+    Rows of an ASteCA '_memb.dat' file: id, x, y, T1, e_T1, C-T1, e_(C-T1),
+    membership probability and the flag marking the stars used in the
+    best fit.
+    '''
+    return [[str(i + 1)] + ['{:.3f}'.format(_) for _ in [
+        rng.uniform(0., 4000.), rng.uniform(0., 4000.),
+        rng.uniform(14., 24.), rng.uniform(0.01, 0.2), rng.normal(1., 0.5),
+        rng.uniform(0.01, 0.2), rng.uniform()]] + [str(rng.randint(0, 2))]
+        for i in range(n_stars)]
+
+
+def synth_rows(n_stars, rng):
+    '''
+    Rows of an ASteCA '_synth.dat' file: C-T1, e_(C-T1), T1, e_T1.
+    '''
+    return [['{:.3f}'.format(_) for _ in [
+        rng.normal(1., 0.5), rng.uniform(0.01, 0.2), rng.uniform(14., 24.),
+        rng.uniform(0.01, 0.2)]] for _ in range(n_stars)]
+
+
+def isoch_ages(n_ages):
+    '''
+    log(age) of each isochrone in a synthetic metallicity file.
+    '''
+    return np.around(np.linspace(6.6, 10.1, n_ages), 2)
+
+
+def isoch_lines(z, n_ages, n_pts, rng):
+    '''
+    Lines of a Marigo et al. (2008) metallicity file with 'n_ages'
+    isochrones of 'n_pts' points each.
+    '''
+    lines = ['# File generated by benchmarks/synth_data.py\n']
+    for age in isoch_ages(n_ages):
+        lines.append('#\tIsochrone\tZ = {:.5f}\t\tAge = \t{:.3e} yr\n'.format(
+            z, 10 ** age))
+        lines.append('# log(age/yr)\tM_ini\tM_act\tlogL/Lo\tlogTe\tlogG\t'
+                     'mbol\tC\tM\tT1\tT2\n')
+        m_ini = np.sort(rng.uniform(0.1, 10., n_pts))
+        for m in m_ini:
+            t1 = 10. - 2.5 * np.log10(m) + rng.normal(0., 0.1)
+            vals = [age, m, m, 0., 3.7, 4.5, t1, t1 + rng.uniform(0., 3.),
+                    t1 + 0.5, t1, t1 - 0.3]
+            lines.append('\t' + '\t'.join('{:.4f}'.format(_) for _ in vals) +
+                         '\n')
+
+    return lines
+
+
+def mcev_table(n_cls, n_match, rng):
+    '''
+    Extinction values matched to each cluster, as returned by
+    'extinction_MCEV/extin_analysis.get_data': RA, DEC, E(B-V), e_E(B-V) of
+    each MCEV region, and RA, DEC of its cluster. Return also the index of
+    the cluster of each region, as given by 'match_coords'.
+    '''
+    ext_pars, clust_idx = [], []
+    for i in range(n_cls):
+        ra_c, dec_c, size = gal_coords[galaxy(i, n_cls)]
+        ra, dec = ra_c + rng.uniform(-size, size) * 2., \
+            dec_c + rng.uniform(-size, size)
+        n = rng.randint(1, 2 * n_match)
+        clust_idx += [i] * n
+        for _ in range(n):
+            ext_pars.append([ra + rng.normal(0., 0.1), dec +
+                             rng.normal(0., 0.1), rng.uniform(0., 0.3),
+                             rng.uniform(0.01, 0.05), ra, dec])
+
+    return zip(*ext_pars), clust_idx
+
+
+def write_rows(path, rows, header=None):
+    '''
+    Write 'rows' as whitespace separated columns.
+    '''
+    if os.path.dirname(path) and not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as f:
+        if header:
+            f.write(header + '\n')
+        for row in rows:
+            f.write(' '.join(str(_) for _ in row) + '\n')
+
+
+def write_tree(out_path, n_cls, n_stars, n_fields, seed=12345):
+    '''
+    Write a synthetic copy of the input files the code reads, inside an
+    'mc-catalog' folder in 'out_path':
+
+    - asteca_output_final.dat, lit_OCs_data.ods
+    - databases/matched_clusters.dat, databases/matched_H03_P12.dat
+    - runs/1st_run/output/input_01/*_memb.dat, *_synth.dat
+    - OCs_data/MC_all/*.OUT photometry files
+    - functions/0.004_marigo.dat, functions/0.008_marigo.dat
+    - extinction_MCEV/ra_dec_exts_mult_matches.dat
+
+    Only 'n_fields' clusters get membership and photometry files, with
+    'n_stars' stars each.
+    '''
+    from pyexcel_ods import save_data
+    rng = np.random.RandomState(seed)
+    root = os.path.join(out_path, 'mc-catalog')
+    names = cl_names(n_cls)
+
+    as_pars = asteca_pars(n_cls, rng)
+    write_rows(os.path.join(root, 'asteca_output_final.dat'),
+               [[names[i]] + as_pars[i] for i in range(n_cls)],
+               '#>>> 1st run')
+
+    lit = lit_table(names, rng)
+    save_data(os.path.join(root, 'lit_OCs_data.ods'), {"S-LMC": lit})
+
+    # Database files, in the format of 'write_out_data'.
+    names_idx = dict((_, i) for i, _ in enumerate(names))
+    rows = []
+    for k, db in enumerate(db_entries(names, rng)):
+        for e in db:
+            i = names_idx[e[1][0]]
+            as_p, lit_p = as_pars[i], lit[i + 1]
+            mass, e_mass = [e[4], e[5]] if db_names[k] in ['H03', 'P12'] \
+                else [-1., -1.]
+            ext = e[4] if db_names[k] not in ['H03', 'P12'] else -1.
+            rows.append(
+                [db_names[k], e[0], e[1][0]] +
+                ['{:.2f}'.format(_) for _ in [e[2], e[3]]] + as_p[21:23] +
+                ['{:.2f}'.format(_) for _ in lit_p[6:8]] +
+                ['{:.2f}'.format(mass), '{:.0f}'.format(e_mass)] +
+                as_p[27:29] + ['{:.2f}'.format(_) for _ in lit_p[20:22]] +
+                ['{:.2f}'.format(ext)] + as_p[23:25] +
+                ['{:.2f}'.format(_) for _ in lit_p[8:10]] +
+                ['{:.2f}'.format(rng.uniform(1., 20.)), as_p[11]])
+    write_rows(os.path.join(root, 'databases', 'matched_clusters.dat'), rows,
+               '#DB   GAL      NAME   Age1  e_age  Age2  e_age   Age3  e_age  '
+               '    Mass1   e_mass    Mass2   e_mass    Mass3   e_mass    '
+               'E_BV1    E_BV2   e_E_BV    E_BV3   e_E_BV     r (pc)   CI')
+    rows = []
+    for i in rng.choice(n_cls, n_cls // 4, replace=False):
+        gal = galaxy(i, n_cls)
+        rows.append([gal, '{:.5f}'.format(lit[i + 1][1]),
+                     '{:.5f}'.format(lit[i + 1][2])] + [
+            '{:.2f}'.format(_) for _ in [
+                rng.uniform(6.6, 10.1), rng.uniform(0.05, 0.3),
+                rng.uniform(6.6, 10.1), rng.uniform(0.05, 0.3)]] + [
+            '{:.0f}'.format(10 ** rng.uniform(2., 4.5)), -1,
+            '{:.0f}'.format(10 ** rng.uniform(2., 4.5)),
+            '{:.0f}'.format(10 ** rng.uniform(2., 4.5)), names[i]])
+    write_rows(os.path.join(root, 'databases', 'matched_H03_P12.dat'), rows,
+               '#GAL  RA  DEC  log(age)_H03  e_age  log(age)_P12  e_age  '
+               'Mass_H03  e_mass  Mass_P12  e_mass  NAME')
+
+    # Membership, synthetic cluster and photometry files.
+    run_out = os.path.join(root, 'runs', '1st_run', 'output', 'input_01')
+    for name in names[:n_fields]:
+        write_rows(os.path.join(run_out, name + '_memb.dat'),
+                   memb_rows(n_stars // 10, rng),
+                   '#ID  x  y  T1  e_T1  CT1  e_CT1  memb_prob  sel')
+        write_rows(os.path.join(run_out, name + '_synth.dat'),
+                   synth_rows(n_stars // 10, rng),
+                   '#CT1  e_CT1  T1  e_T1')
+        write_rows(os.path.join(root, 'OCs_data', 'MC_all', name + '.OUT'),
+                   photometry(n_stars, rng))
+
+    if not os.path.isdir(os.path.join(root, 'functions')):
+        os.makedirs(os.path.join(root, 'functions'))
+    for z in [0.004, 0.008]:
+        with open(os.path.join(root, 'functions', '{}_marigo.dat'.format(z)),
+                  'w') as f:
+            f.writelines(isoch_lines(z, 50, 150, rng))
+
+    ext_zip, coords_match = mcev_table(n_cls, 10, rng)
+    write_rows(os.path.join(root, 'extinction_MCEV',
+                            'ra_dec_exts_mult_matches.dat'),
+               [['{:.5f}'.format(ext_zip[0][i]), '{:.5f}'.format(
+                   ext_zip[1][i]), '{:.3f}'.format(ext_zip[2][i] * 1.38),
+                 '{:.3f}'.format(ext_zip[3][i] * 1.38), '{:.5f}'.format(
+                     ext_zip[4][i]), '{:.5f}'.format(ext_zip[5][i])]
+                for i in range(len(ext_zip[0]))],
+               '# centeralpha   centerdelta   ev_i   sig_ev_i   ra_deg   '
+               'dec_deg')
+
+    return root
+
+
+def main():
+    '''
+    Write a synthetic set of input files of the given size.
+    '''
+    parser = argparse.ArgumentParser(
+        description="Write synthetic input files to benchmark the code.")
+    parser.add_argument('out_path', help="Folder where the 'mc-catalog' "
+                        "folder with the synthetic files is created.")
+    parser.add_argument('-c', '--clusters', type=int, default=1000,
+                        help="Number of clusters. Default: 1000.")
+    parser.add_argument('-s', '--stars', type=int, default=10000,
+                        help="Number of stars per field. Default: 10000.")
+    parser.add_argument('-f', '--fields', type=int, default=10,
+                        help="Number of clusters with photometry and "
+                        "membership files. Default: 10.")
+    parser.add_argument('--seed', type=int, default=12345,
+                        help="Random seed. Default: 12345.")
+    args = parser.parse_args()
+
+    root = write_tree(args.out_path, args.clusters, args.stars,
+                      min(args.fields, args.clusters), args.seed)
+    print 'Synthetic files written to: {}'.format(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,7 @@
 
-import matplotlib.pyplot as plt
 import numpy as np
-from astropy.coordinates import SkyCoord
-from astropy.coordinates import Angle
-from astropy import units as u
+# astropy is imported by the functions that use it, so the rest of this
+# module can be imported without loading it.
 
 
 def skip_comments(f):
@@ -167,6 +165,7 @@ def read_hunter():
     -1. <-- Since there's no mass error assigned.
     quality <-- quality flag: 0=good, 1=probable, 2=questionable
     '''
+    from astropy.coordinates import SkyCoord, Angle
 
     # Path to data file.
     h03_file = 'hunter_03.dat'
@@ -220,6 +219,8 @@ def read_popescu():
 
     p12 = [gal, names, log_age, e_age, mass, e_mass]
     '''
+    from astropy.coordinates import SkyCoord
+    from astropy import units as u
 
     # Path to data file.
     p12_h03_file = 'popescu_12_LMC.dat'
@@ -335,6 +336,8 @@ def main():
     """
     Cross match Hunter et al. (2003) and Popescu et al. (2012) databases.
     """
+    from astropy.coordinates import SkyCoord
+    from astropy import units as u
 
     # Read Hunter et al. (2003) data.
     h03 = read_hunter()
@@ -382,6 +385,7 @@ def main():
     print '\nOCs in H03, P12:', len(h03), len(p12)
     print 'OCs matched:', n
 
+    # import matplotlib.pyplot as plt
     # f, (ax1, ax2) = plt.subplots(1, 2)
 
     # ax1.set_xlabel('0.5*(P12+H03)>5000')
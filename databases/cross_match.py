@@ -1,8 +1,8 @@
 
 from pyexcel_ods import get_data
 import numpy as np
-from astropy.coordinates import SkyCoord, match_coordinates_sky
-from astropy import units as u
+# astropy is imported by the functions that use it, so the rest of this
+# module can be imported without loading it.
 
 
 def skip_comments(f):
@@ -139,6 +139,8 @@ def get_liter_data():
     Read the data file with the literature values for each cluster as a
     dictionary.
     '''
+    from astropy.coordinates import SkyCoord
+    from astropy import units as u
     # Read .ods file with literature data.
     cl_dict = get_data('../lista_unica_cumulos.ods')["S-LMC"]
 
@@ -182,6 +184,8 @@ def match_ra_dec_asteca(names_ra_dec, cat_ra_dec, ra, dec):
     them to match with the closest cluster in the ASteCA database, within
     some predefined tolerance.
     '''
+    from astropy.coordinates import SkyCoord, match_coordinates_sky
+    from astropy import units as u
 
     # Store (ra, dec) as valid coordinate object.
     cl_coord = SkyCoord(ra*u.degree, dec*u.degree, frame='icrs')
@@ -215,6 +219,8 @@ def read_pietr99(names_ra_dec, cat_ra_dec):
 
     p99 = []
     '''
+    from astropy.coordinates import SkyCoord
+    from astropy import units as u
 
     # Path to data file.
     p99_file = 'pietrz_99_SMC.dat'
@@ -256,6 +262,8 @@ def read_pietr00(names_ra_dec, cat_ra_dec):
 
     p00 = []
     '''
+    from astropy.coordinates import SkyCoord
+    from astropy import units as u
 
     # Path to data file.
     p00_file = 'pietrz_00_LMC.dat'
@@ -294,6 +302,8 @@ def read_rafel(names_ra_dec, cat_ra_dec):
 
     r05 = []
     '''
+    from astropy.coordinates import SkyCoord
+    from astropy import units as u
 
     # Path to data file.
     r05_file = 'rafelski_05_SMC.dat'
@@ -579,6 +589,8 @@ def get_G10_asteca_data():
 
     g10 = []
     '''
+    from astropy.coordinates import SkyCoord
+    from astropy import units as u
 
     # Path to data file.
     g10_file = 'glatt_10.dat'
@@ -0,0 +1,168 @@
+
+import os
+import argparse
+import numpy as np
+from scipy.spatial import cKDTree
+from extin_analysis import get_data, ang_dist
+
+
+# Folder of the extinction tables.
+ext_path = os.path.dirname(os.path.realpath(__file__))
+
+# Tables each map is ingested from.
+#
+# 'MCEV': regions of the Haschke et al. (2011) reddening maps, as downloaded
+# via TOPCAT (see 'TOPCAT_instruct.dat'). Every region matched to a cluster is
+# kept once.
+# 'SandF': Schlafly & Finkbeiner (2011) E(B-V) values from IRSA, at the
+# position of the clusters in the catalog and in Bica et al. (2008).
+map_tables = {
+    'MCEV': ['ra_dec_exts_mult_matches.dat'],
+    'SandF': ['IRSA_MC_ext.tbl', 'IRSA_BB_ext.tbl']
+}
+
+# Extension of the file where each map is stored once ingested.
+# Ie: 'MCEV' --> 'MCEV_map.npz'
+map_ext = '_map.npz'
+
+
+def read_mcev(tab_name):
+    '''
+    RA, DEC, E(B-V) and its error of every MCEV region in the table.
+    '''
+    ra_c, dec_c, ext, e_ext = [np.asarray(_) for _ in get_data(tab_name)[:4]]
+    # The same region is matched to several clusters.
+    first = np.sort(np.unique(ra_c + 1j * dec_c, return_index=True)[1])
+
+    return ra_c[first], dec_c[first], ext[first], e_ext[first]
+
+
+def read_irsa(tab_name):
+    '''
+    RA, DEC, E(B-V) and its standard deviation (S&F values) in the table
+    downloaded from IRSA.
+    '''
+    data = np.loadtxt(tab_name, comments='#', usecols=(0, 1, 3, 5))
+    return data[:, 0], data[:, 1], data[:, 2], data[:, 3]
+
+
+def unit_vectors(ra, dec):
+    '''
+    Cartesian coordinates on the unit sphere of the (RA, DEC) positions.
+    '''
+    ra, dec = np.deg2rad(ra), np.deg2rad(dec)
+    return np.column_stack([np.cos(dec) * np.cos(ra),
+                            np.cos(dec) * np.sin(ra), np.sin(dec)])
+
+
+def ingest(name):
+    '''
+    Read the tables of the map, and store its values in a binary file.
+    '''
+    read = read_mcev if name == 'MCEV' else read_irsa
+    cols = [np.concatenate(_) for _ in zip(*[
+        read(os.path.join(ext_path, tab)) for tab in map_tables[name]])]
+    ext_map = dict(zip(['ra', 'dec', 'ext', 'e_ext'], cols))
+    np.savez(os.path.join(ext_path, name + map_ext), **ext_map)
+
+    return ext_map
+
+
+def load_map(name='MCEV'):
+    '''
+    Load the map, ingesting its tables first if it was not stored yet or if
+    any of them changed since. The KD-tree of the positions of its values
+    is built on their unit vectors.
+    '''
+    map_file = os.path.join(ext_path, name + map_ext)
+    tabs = [os.path.join(ext_path, _) for _ in map_tables[name]]
+    if not os.path.isfile(map_file) or os.path.getmtime(map_file) < max(
+            os.path.getmtime(_) for _ in tabs):
+        ext_map = ingest(name)
+    else:
+        with np.load(map_file) as npz:
+            ext_map = dict((k, npz[k]) for k in npz.files)
+    ext_map['tree'] = cKDTree(unit_vectors(ext_map['ra'], ext_map['dec']))
+
+    return ext_map
+
+
+def ext_values(ext_map, ra, dec, radius=0.5):
+    '''
+    Extinction of the map at the (RA, DEC) positions: closest value and its
+    distance (in degrees), and the average, standard deviation and maximum
+    of the N values within 'radius' degrees. Positions with no values
+    within the radius have N=0 and NaN statistics.
+    '''
+    ra, dec = np.atleast_1d(ra).astype(float), np.atleast_1d(dec)
+    xyz = unit_vectors(ra, dec)
+    ext = ext_map['ext']
+
+    # Closest value, at any distance.
+    closest = ext_map['tree'].query(xyz)[1]
+    dist = ang_dist(ra, dec, ext_map['ra'][closest],
+                    ext_map['dec'][closest])
+
+    # Values within the radius (the chord length subtended by the angle).
+    chord = 2. * np.sin(np.deg2rad(radius) / 2.)
+    matches = ext_map['tree'].query_ball_point(xyz, chord)
+    n_match = np.array([len(_) for _ in matches], dtype=int)
+    rows = np.array([i for _ in matches for i in _], dtype=int)
+    pos_idx = np.repeat(np.arange(len(ra)), n_match)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        avr_ext = np.bincount(pos_idx, weights=ext[rows],
+                              minlength=len(ra)) / n_match
+        std_dev = np.sqrt(np.bincount(
+            pos_idx, weights=(ext[rows] - avr_ext[pos_idx]) ** 2,
+            minlength=len(ra)) / n_match)
+    max_ext = np.full(len(ra), np.nan)
+    if len(rows):
+        starts = np.concatenate([[0], np.cumsum(n_match)[:-1]])
+        has = n_match > 0
+        max_ext[has] = np.maximum.reduceat(ext[rows], starts[has])
+
+    return {'ext_close': ext[closest], 'dist': dist, 'avrg': avr_ext,
+            'std_dev': std_dev, 'max': max_ext, 'N': n_match}
+
+
+def main():
+    '''
+    Annotate a list of clusters with the extinction values of the map, with
+    no need for the MCEV service or TOPCAT.
+    '''
+    parser = argparse.ArgumentParser(
+        description="Extinction of the map at the position of each cluster.")
+    parser.add_argument(
+        'clusters', help="File with the RA, DEC (deg) of the clusters in its "
+        "first two columns (comma or whitespace separated, one header line).")
+    parser.add_argument(
+        '-m', '--map', default='MCEV', choices=sorted(map_tables),
+        help="Extinction map. Default: MCEV.")
+    parser.add_argument(
+        '-r', '--radius', type=float, default=0.5,
+        help="Radius (deg) of the average, std and max values. Default: 0.5.")
+    parser.add_argument(
+        '-o', '--output', default='cls_exts_map.dat', help="Output file.")
+    args = parser.parse_args()
+
+    with open(args.clusters) as f:
+        lines = f.read().replace(',', ' ').splitlines()[1:]
+    ra, dec = np.array([map(float, _.split()[:2]) for _ in lines
+                        if _.strip()]).T
+
+    vals = ext_values(load_map(args.map), ra, dec, args.radius)
+
+    with open(args.output, 'w') as f:
+        f.write("#RA_(deg)       DEC_(deg)    E_BV_close  dist(deg)  E_BV_avrg"
+                "  E_BV_std_dev  E_BV_max   N\n")
+        for line in zip(ra, dec, *[vals[_] for _ in [
+                'ext_close', 'dist', 'avrg', 'std_dev', 'max', 'N']]):
+            f.write("{:<15} {:<15} {:>8.3f} {:>8.3f} {:>8.3f} {:>8.3f} "
+                    "{:>8.3f} {:>4}\n".format(*line))
+
+    print '\nEnd.'
+
+
+if __name__ == "__main__":
+    main()
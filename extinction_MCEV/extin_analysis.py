@@ -11,13 +11,11 @@ def skip_comments(f):
             yield line
 
 
-def get_data():
+def get_data(tab_name='ra_dec_exts_mult_matches.dat'):
     '''
     Read RA, DEC, extinction values from table.
     '''
 
-    tab_name = 'ra_dec_exts_mult_matches.dat'
-
     with open(tab_name, 'r') as f:
         ext_pars = []
 
@@ -39,75 +37,72 @@ def get_data():
     return ext_zip
 
 
-def match_coords(ext_pars, N):
+def match_coords(ext_pars):
     '''
-    Store all the indexes pointing to each cluster in separate lists.
+    Index of the cluster each row belongs to. Rows are grouped by the
+    cluster's coordinates, and clusters are numbered in the order they
+    first appear in the table.
     '''
+    # Each cluster's coordinates as a single (complex) value.
+    coords = np.asarray(ext_pars[4]) + 1j * np.asarray(ext_pars[5])
+    first, inverse = np.unique(coords, return_index=True,
+                               return_inverse=True)[1:]
+    # Position of each unique coordinate in order of appearance.
+    rank = np.empty(len(first), dtype=int)
+    rank[np.argsort(first)] = np.arange(len(first))
 
-    coords_match = [[] for _ in range(N)]
-
-    ra_old, dec_old, st_indx = 0., 0., -1
-    for i, ra in enumerate(ext_pars[4]):
-        dec = ext_pars[5][i]
+    return rank[inverse]
 
-        if ra_old == ra and dec_old == dec:
-            coords_match[st_indx].append(i)
-        else:
-            ra_old, dec_old, st_indx = ra, dec, st_indx + 1
-            coords_match[st_indx].append(i)
 
-    return coords_match
+def ang_dist(ra1, dec1, ra2, dec2):
+    '''
+    Angular distance in degrees (haversine formula, accurate also for the
+    small distances where the cosine formula loses precision).
+    '''
+    ra1, dec1, ra2, dec2 = [np.deg2rad(_) for _ in [ra1, dec1, ra2, dec2]]
+    hav = np.sin((dec2 - dec1) / 2.) ** 2 + np.cos(dec1) * np.cos(dec2) * \
+        np.sin((ra2 - ra1) / 2.) ** 2
+    return np.rad2deg(2. * np.arcsin(np.sqrt(np.clip(hav, 0., 1.))))
 
 
-def get_ext_values(ext_pars, coords_match):
+def get_ext_values(ext_pars, clust_idx):
     '''
     Obtain the closest extinction value and its distance (in degrees),
     the average extinction and its standard deviation, and the maximum
-    extinction value.
+    extinction value. 'clust_idx' is the index of the cluster each row
+    belongs to, as returned by 'match_coords'.
     Convert from E(V-I) to E(B-V):
 
     E(V-I) = 1.38 *  E(B-V)
 
     according to Tammann et al. 2003, A&A, 404, 423.
     '''
+    ra_c, dec_c, ext, e_ext, ra, dec = [np.asarray(_, dtype=float) for _ in
+                                        ext_pars]
+    clust_idx = np.asarray(clust_idx)
+    N_cls = clust_idx.max() + 1
+
+    # Angular distance of every extinction value to its cluster.
+    dist = ang_dist(ra, dec, ra_c, dec_c)
+
+    # Sort rows by cluster, and by distance within each cluster (stable, so
+    # ties keep the first row). The first row of each group is the closest.
+    order = np.lexsort((dist, clust_idx))
+    n_rows = np.bincount(clust_idx, minlength=N_cls)
+    starts = np.concatenate([[0], np.cumsum(n_rows)[:-1]])
+    closest = order[starts]
+
+    # Average extinction value and standard deviation.
+    avr_ext = np.bincount(clust_idx, weights=ext) / n_rows
+    std_dev = np.sqrt(np.bincount(
+        clust_idx, weights=(ext - avr_ext[clust_idx]) ** 2) / n_rows)
+
+    # Maximum extinction value.
+    max_ext = np.maximum.reduceat(ext[order], starts)
 
-    clusts_exts = []
-    # Iterate for every cluster.
-    for clust in coords_match:
-
-        # Get original ra, dec for this cluster.
-        ra, dec = ext_pars[4][clust[0]], ext_pars[5][clust[0]]
-
-        # Get closest extinction value and its distance.
-        closest_idx, dist_min = 0, 1000.
-        for ext_idx in clust:
-            ra_c, dec_c = ext_pars[0][ext_idx], ext_pars[1][ext_idx]
-            # Get angular distance.
-            cos_d = np.sin(np.deg2rad(dec)) * np.sin(np.deg2rad(dec_c)) + \
-                np.cos(np.deg2rad(dec)) * np.cos(np.deg2rad(dec_c)) * \
-                np.cos(np.deg2rad(ra - ra_c))
-            # Arccos, radians to decimal degrees.
-            dist = np.rad2deg(np.arccos(cos_d))
-            if dist < dist_min:
-                dist_min = dist
-                closest_idx = ext_idx
-
-        # Get average extinction value and standard deviation.
-        avr_ext_lst = []
-        for ext_idx in clust:
-            avr_ext_lst.append(ext_pars[2][ext_idx])
-        avr_ext, std_dev = np.mean(avr_ext_lst), np.std(avr_ext_lst)
-
-        # Get maximum extinction value.
-        max_ext, ext_old = 0., -1000.
-        for ext_idx in clust:
-            if ext_pars[2][ext_idx] > ext_old:
-                ext_old = ext_pars[2][ext_idx]
-                max_ext = ext_pars[2][ext_idx]
-
-        # Store all values.
-        clusts_exts.append([ra, dec, ext_pars[2][closest_idx], dist_min,
-                           avr_ext, std_dev, max_ext])
+    clusts_exts = np.column_stack([
+        ra[closest], dec[closest], ext[closest], dist[closest], avr_ext,
+        std_dev, max_ext]).tolist()
 
     return clusts_exts
 
@@ -136,11 +131,10 @@ def main():
     ext_pars = get_data()
 
     # Match values for a single coordinate.
-    N_cls = 239  # Total number of clusters
-    coords_match = match_coords(ext_pars, N_cls)
+    clust_idx = match_coords(ext_pars)
 
     # Get several ext values for each star.
-    clusts_exts = get_ext_values(ext_pars, coords_match)
+    clusts_exts = get_ext_values(ext_pars, clust_idx)
 
     # Print to file.
     print_file(clusts_exts)
@@ -1,10 +1,8 @@
 
-import matplotlib.pyplot as plt
 import numpy as np
 import re
 import os
-from scipy import stats
-from read_photom_files import get_data as gd
+from read_photom_files import get_data as gd, cache_ext
 import glob
 
 
@@ -13,8 +11,10 @@ def find_phot_file(r_path, cl):
     Find photometric file corresponding to this cluster.
     """
     path_no_ext = r_path + 'mc-catalog/OCs_data/MC_all/' + cl + '.*'
+    # Skip the binary cache files stored next to the photometry files.
     try:
-        data_file = glob.glob(path_no_ext)[0]
+        data_file = [_ for _ in glob.glob(path_no_ext) if not
+                     _.endswith(cache_ext)][0]
     except IndexError:
         print ("The file: {}\nwas not found".format(path_no_ext))
         raise SystemExit(0)
@@ -23,37 +23,84 @@ def find_phot_file(r_path, cl):
     return phot_data
 
 
+def nice_step(span, n_bins):
+    '''
+    Smallest "nice" step (1, 2, 2.5 or 5 times a power of ten) that divides
+    'span' into at most 'n_bins' intervals. Mimics the levels that
+    matplotlib selects for a contour plot.
+    '''
+    raw = span / float(n_bins)
+    scale = 10. ** np.floor(np.log10(raw))
+    for m in [1., 2., 2.5, 5., 10.]:
+        if m * scale >= raw:
+            return m * scale
+
+
+def binned_kde(phot_x, phot_y, x_grid, y_grid):
+    '''
+    Binned 2D Gaussian KDE evaluated in the nodes of the x,y grid. The
+    kernel covariance is obtained with Scott's rule, as done by
+    'scipy.stats.gaussian_kde'.
+    '''
+    # Assign each star to its closest grid node.
+    x_edges = np.concatenate([[-np.inf], (x_grid[1:] + x_grid[:-1]) / 2.,
+                              [np.inf]])
+    y_edges = np.concatenate([[-np.inf], (y_grid[1:] + y_grid[:-1]) / 2.,
+                              [np.inf]])
+    H = np.histogram2d(phot_x, phot_y, bins=[x_edges, y_edges])[0]
+
+    # Kernel covariance.
+    factor = len(phot_x) ** (-1. / 6.)
+    inv_cov = np.linalg.inv(np.cov(phot_x, phot_y) * factor ** 2)
+    # Kernel evaluated for every pair of grid nodes.
+    dx = (x_grid[:, None] - x_grid[None, :])[:, None, :, None]
+    dy = (y_grid[:, None] - y_grid[None, :])[None, :, None, :]
+    kern = np.exp(-0.5 * (inv_cov[0, 0] * dx ** 2 +
+                          2. * inv_cov[0, 1] * dx * dy +
+                          inv_cov[1, 1] * dy ** 2))
+
+    # Sum the kernels of the stars binned in each node (not normalized).
+    return np.tensordot(H, kern, axes=([0, 1], [0, 1]))
+
+
 def kde_limits(phot_x, phot_y):
     '''
     Return photometric diagram limits taken from a 2D KDE.
+
+    The KDE grid is thresholded at the lowest of 30 contour levels, and the
+    (x,y) points where the grid lines cross that level are returned. These
+    points delimit the outer contour, including any detached region (ie: a
+    RC region).
     '''
-    xmin, xmax = min(phot_x), max(phot_x)
-    ymin, ymax = min(phot_y), max(phot_y)
-    # Stack photometric data.
-    values = np.vstack([phot_x, phot_y])
-    # Obtain Gaussian KDE.
-    kernel = stats.gaussian_kde(values)
+    phot_x, phot_y = np.asarray(phot_x), np.asarray(phot_y)
     # Grid density (number of points).
     gd = 25
-    gd_c = complex(0, gd)
     # Define x,y grid.
-    x, y = np.mgrid[xmin:xmax:gd_c, ymin:ymax:gd_c]
-    positions = np.vstack([x.ravel(), y.ravel()])
-    # Evaluate kernel in grid positions.
-    k_pos = kernel(positions)
-
-    # Generate 30 contour lines.
-    cs = plt.contour(x, y, np.reshape(k_pos, x.shape), 30)
-    # Extract (x,y) points delimitating each line.
-    x_v, y_v = np.asarray([]), np.asarray([])
-    # Only use the outer curve.
-    col = cs.collections[0]
-    # If more than one region is defined by this curve (ie: the main sequence
-    # region plus a RC region or some other detached region), obtain x,y from
-    # all of them.
-    for lin in col.get_paths():
-        x_v = np.append(x_v, lin.vertices[:, 0])
-        y_v = np.append(y_v, lin.vertices[:, 1])
+    x_g = np.linspace(phot_x.min(), phot_x.max(), gd)
+    y_g = np.linspace(phot_y.min(), phot_y.max(), gd)
+    # Evaluate binned KDE in grid positions.
+    z = binned_kde(phot_x, phot_y, x_g, y_g)
+
+    # Lowest of 30 contour levels, ie: the outer curve.
+    z_min, z_max = z.min(), z.max()
+    step = nice_step(z_max - z_min, 31)
+    lvl = (np.floor(z_min / step) + 1.) * step
+    above = z >= lvl
+
+    # Linearly interpolate the crossing points along the x and the y grid
+    # lines.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        c_x = above[1:, :] != above[:-1, :]
+        t = (lvl - z[:-1, :]) / (z[1:, :] - z[:-1, :])
+        x_cx = (x_g[:-1, None] + t * np.diff(x_g)[:, None])[c_x]
+        y_cx = np.broadcast_to(y_g[None, :], c_x.shape)[c_x]
+
+        c_y = above[:, 1:] != above[:, :-1]
+        t = (lvl - z[:, :-1]) / (z[:, 1:] - z[:, :-1])
+        y_cy = (y_g[None, :-1] + t * np.diff(y_g)[None, :])[c_y]
+        x_cy = np.broadcast_to(x_g[:, None], c_y.shape)[c_y]
+
+    x_v, y_v = np.concatenate([x_cx, x_cy]), np.concatenate([y_cx, y_cy])
 
     return x_v, y_v
 
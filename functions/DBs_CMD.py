@@ -1,5 +1,6 @@
 
 import os
+from multiprocessing import Pool, cpu_count
 import functions.CMD_obs_vs_asteca as cmd
 
 
@@ -75,70 +76,141 @@ def get_lit_params(r_path, cl, db, in_params, isochs, i, j):
     return gal, db_z, db_a, db_e, db_d, lit_isoch
 
 
-def get_CMD_data(r_path, db, in_params, mc_cls, isochs):
+def get_cl_data(r_path, db, in_params, isochs, i, j, cl):
     '''
-    Obtain cross-matched OCs data, used to generate figures containing CMDs
-    of databases vs ASteCA for the clusters matched in the selected database.
+    Obtain the data used to plot the CMD of the 'cl' cluster.
     '''
+    # Find photometric file for cluster.
+    phot_data = cmd.find_phot_file(r_path, cl)
+
+    # Obtain ASteCA parameters.
+    as_z, as_z_str, as_a, as_e, as_d, as_m = cmd.get_asteca_params(cl)
+    # Obtain ASteCA isochrone.
+    asteca_isoch = cmd.get_isoch(r_path, 'AS', '', as_z_str, as_a, as_e, as_d)
+
+    if db in ['largemass', 'largemet']:
+        # For 'largemass' OCs, this list passes galaxies info instead
+        # of isochrones.
+        gal = isochs[i][j]
+        # Take the rest of the info from ASteCA values.
+        db_z, db_a, db_e, db_d, lit_isoch = as_z, as_a, as_e, as_d,\
+            asteca_isoch
+    # Literature values.
+    else:
+        gal, db_z, db_a, db_e, db_d, lit_isoch = get_lit_params(
+            r_path, cl, db, in_params, isochs, i, j)
 
-    db_cls = [[] for _ in mc_cls]
-    for i, cl_lst in enumerate(mc_cls):
-        for j, cl in enumerate(cl_lst):
-
-            # Find photometric file for cluster.
-            phot_data = cmd.find_phot_file(r_path, cl)
-
-            # Obtain ASteCA parameters.
-            as_z, as_z_str, as_a, as_e, as_d, as_m = cmd.get_asteca_params(cl)
-            # Obtain ASteCA isochrone.
-            asteca_isoch = cmd.get_isoch(r_path, 'AS', '', as_z_str, as_a,
-                                         as_e, as_d)
-
-            if db in ['largemass', 'largemet']:
-                # For 'largemass' OCs, this list passes galaxies info instead
-                # of isochrones.
-                gal = isochs[i][j]
-                # Take the rest of the info from ASteCA values.
-                db_z, db_a, db_e, db_d, lit_isoch = as_z, as_a, as_e, as_d,\
-                    asteca_isoch
-            # Literature values.
-            else:
-                gal, db_z, db_a, db_e, db_d, lit_isoch = get_lit_params(
-                    r_path, cl, db, in_params, isochs, i, j)
+    # Fetch which run holds this cluster's membership data.
+    run = cmd.get_cl_run(cl)
+    # Fetch what 'input_XX' folder in the above run contains the
+    # membership file.
+    inpt = cmd.get_input_folder(r_path, cl, run)
 
-            # Fetch which run holds this cluster's membership data.
-            run = cmd.get_cl_run(cl)
-            # Fetch what 'input_XX' folder in the above run contains the
-            # membership file.
-            inpt = cmd.get_input_folder(r_path, cl, run)
+    # Membership data for cluster.
+    cl_reg_fit, cl_reg_no_fit, synth_stars = cmd.get_memb_data(
+        r_path, run, inpt, cl)
 
-            # Membership data for cluster.
-            cl_reg_fit, cl_reg_no_fit, synth_stars = cmd.get_memb_data(
-                r_path, run, inpt, cl)
+    # Obtain CMD limits for cluster.
+    x_max_cmd, x_min_cmd, y_min_cmd, y_max_cmd = cmd.diag_limits(phot_data)
 
-            # Obtain CMD limits for cluster.
-            x_max_cmd, x_min_cmd, y_min_cmd, y_max_cmd = cmd.diag_limits(
-                phot_data)
+    print '{} {} data obtained'.format(db, cl)
 
-            db_cls[i].append([x_min_cmd, x_max_cmd, y_min_cmd, y_max_cmd, cl,
-                              db, gal, cl_reg_fit, cl_reg_no_fit, synth_stars,
-                              lit_isoch, asteca_isoch, db_z, db_a, db_e, db_d,
-                              as_z, as_a, as_e, as_d, as_m])
-            print '{} {} data obtained'.format(db, cl)
+    return [x_min_cmd, x_max_cmd, y_min_cmd, y_max_cmd, cl, db, gal,
+            cl_reg_fit, cl_reg_no_fit, synth_stars, lit_isoch, asteca_isoch,
+            db_z, db_a, db_e, db_d, as_z, as_a, as_e, as_d, as_m]
 
-    return db_cls
+
+# Arguments shared by every cluster processed in a worker. They are set once
+# per worker by 'init_worker', instead of being sent along with each task.
+shared = {}
+
+
+def init_worker(r_path, db, in_params, isochs):
+    '''
+    Store the arguments shared by all the clusters.
+    '''
+    shared.update(r_path=r_path, db=db, in_params=in_params, isochs=isochs)
+
+
+def cl_task(task):
+    '''
+    Obtain the data for a single cluster. A failure is returned along with
+    the cluster's indexes instead of being raised, so that the rest of the
+    clusters can still be processed.
+    '''
+    i, j, cl = task
+    try:
+        cl_data = get_cl_data(shared['r_path'], shared['db'],
+                              shared['in_params'], shared['isochs'], i, j, cl)
+        return i, j, cl_data, ''
+    except (Exception, SystemExit) as e:
+        return i, j, None, '{}: {}'.format(type(e).__name__, e)
 
 
-def get_DBs_ASteCA_CMD_data(r_path, db, in_params):
+def iter_CMD_data(r_path, db, in_params, mc_cls, isochs, n_jobs=1):
+    '''
+    Obtain cross-matched OCs data, used to generate figures containing CMDs
+    of databases vs ASteCA for the clusters matched in the selected database.
+
+    Clusters are distributed among 'n_jobs' processes ('None' uses all the
+    available cores). Each page of clusters (a list in 'mc_cls') is yielded,
+    in order, as soon as all its clusters are processed. Clusters that
+    failed are reported and left out of their page.
+    '''
+    tasks = [(i, j, cl) for i, cl_lst in enumerate(mc_cls) for j, cl in
+             enumerate(cl_lst)]
+    n_jobs = cpu_count() if n_jobs is None else n_jobs
+    n_jobs = min(n_jobs, len(tasks))
+
+    pool = None
+    if n_jobs > 1:
+        pool = Pool(n_jobs, init_worker, (r_path, db, in_params, isochs))
+        results = pool.imap(cl_task, tasks)
+    else:
+        init_worker(r_path, db, in_params, isochs)
+        results = (cl_task(_) for _ in tasks)
+
+    try:
+        page, i_page = [], 0
+        for i, j, cl_data, err in results:
+            # Yield the finished pages, including empty ones, so that the
+            # figures keep their numbering.
+            while i > i_page:
+                yield page
+                page, i_page = [], i_page + 1
+            if cl_data is None:
+                print '  ERROR: {} {} could not be processed ({})'.format(
+                    db, mc_cls[i][j], err)
+            else:
+                page.append(cl_data)
+        while i_page < len(mc_cls):
+            yield page
+            page, i_page = [], i_page + 1
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+
+def get_CMD_data(r_path, db, in_params, mc_cls, isochs, n_jobs=1):
+    '''
+    Obtain the cross-matched OCs data for all the pages at once.
+    '''
+    return list(iter_CMD_data(r_path, db, in_params, mc_cls, isochs, n_jobs))
+
+
+def get_DBs_ASteCA_CMD_data(r_path, db, in_params, n_jobs=1):
     """
     Gather information to plot CMDs of several OCs in databases.
+
+    Returns a generator that yields the data for each page of clusters as
+    it is obtained.
     """
     path_all_cls = r_path + 'mc-catalog/OCs_data/MC_all/'
     if os.path.isdir(path_all_cls):
         # Read OCs names and set of isochrones used.
         mc_cls, isochs = get_cross_match_OCs(db)
         # Obtain data for each OC.
-        db_cls = get_CMD_data(r_path, db, in_params, mc_cls, isochs)
+        db_cls = iter_CMD_data(r_path, db, in_params, mc_cls, isochs, n_jobs)
     else:
         print("Photometric cluster data is not available. Skipping this plot.")
         db_cls = []
@@ -1,7 +1,6 @@
 
 import numpy as np
 from kde_map import kde_2d
-from astroML.plotting import hist as h_ML
 
 
 def age_met_rel(xarr, xsigma, yarr, ysigma, grid_step):
@@ -66,6 +65,8 @@ def feh_avrg(age_gyr, bn, age_vals, met_weighted):
        The associated age value is the mid point of the age range.
     3- Propagate errors to the representative [Fe/H] value for that age range.
     """
+    # astroML (which loads matplotlib) is only needed here.
+    from astroML.plotting import hist as h_ML
 
     age_vals_int, met_weighted_int, age_rang_MCs = [[], []], [[], []], [[], []]
     for k in [0, 1]:
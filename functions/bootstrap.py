@@ -0,0 +1,173 @@
+
+import numpy as np
+from multiprocessing import Pool, cpu_count
+
+
+# Number of bootstrap replicates processed together. Bounds the size of the
+# resampled arrays (replicates x clusters) held in memory.
+chunk_size = 500
+
+# Parameters compared, and their keys in the 'in_params' dictionary.
+boot_pars = [['[Fe/H]', 'zarr'], ['log(age)', 'aarr'], ['E(B-V)', 'earr'],
+             ['dm', 'darr']]
+
+
+def batched_ccc(x, y):
+    '''
+    Concordance correlation coefficient of each row of the 'x', 'y' arrays
+    (one replicate per row). Same definition as 'ccc' in 'check_diffs.py':
+    sample covariance, population variances.
+    '''
+    n = x.shape[1]
+    mx, my = x.mean(axis=1), y.mean(axis=1)
+    dx, dy = x - mx[:, None], y - my[:, None]
+    cov = (dx * dy).sum(axis=1) / (n - 1)
+    return 2 * cov / ((dx ** 2).mean(axis=1) + (dy ** 2).mean(axis=1) +
+                      (mx - my) ** 2)
+
+
+def batched_pearson(x, y):
+    '''
+    Pearson correlation coefficient of each row of the 'x', 'y' arrays.
+    '''
+    dx, dy = x - x.mean(axis=1)[:, None], y - y.mean(axis=1)[:, None]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (dx * dy).sum(axis=1) / np.sqrt(
+            (dx ** 2).sum(axis=1) * (dy ** 2).sum(axis=1))
+
+
+def batched_ks(x_pos, y_pos, n_vals):
+    '''
+    Two sample Kolmogorov-Smirnov statistic of each replicate (row).
+
+    Since every replicate is drawn from the same values, these are passed
+    as their positions ('x_pos', 'y_pos') in the sorted array of the
+    'n_vals' unique values of both samples. The empirical distribution of
+    each replicate is then a cumulative count of positions, evaluated at
+    every unique value, which handles ties as 'ks_2samp' does.
+    '''
+    n_b = x_pos.shape[0]
+    offs = (np.arange(n_b) * n_vals)[:, None]
+    cdfs = []
+    for pos in [x_pos, y_pos]:
+        counts = np.bincount((pos + offs).ravel(), minlength=n_b * n_vals)
+        cdfs.append(np.cumsum(counts.reshape(n_b, n_vals), axis=1) /
+                    float(pos.shape[1]))
+
+    return np.abs(cdfs[0] - cdfs[1]).max(axis=1)
+
+
+def pair_stats(x, y, x_pos, y_pos, n_vals, idx):
+    '''
+    CCC, Pearson and K-S statistics of the paired samples 'x', 'y', for
+    the replicates defined by the rows of the 'idx' index matrix.
+    '''
+    xb, yb = x[idx], y[idx]
+    return {'ccc': batched_ccc(xb, yb), 'pcc': batched_pearson(xb, yb),
+            'ks': batched_ks(x_pos[idx], y_pos[idx], n_vals)}
+
+
+def positions(x, y):
+    '''
+    Positions of the 'x', 'y' values in the sorted array of the unique
+    values of both samples, and the number of unique values.
+    '''
+    vals = np.unique(np.concatenate([x, y]))
+    return np.searchsorted(vals, x), np.searchsorted(vals, y), len(vals)
+
+
+def boot_chunk(args):
+    '''
+    Statistics of 'n_b' replicates of the paired samples, drawn with their
+    own random seed so the result does not depend on the number of
+    processes used.
+    '''
+    x, y, n_b, seed = args
+    idx = np.random.RandomState(seed).randint(0, len(x), (n_b, len(x)))
+
+    return pair_stats(x, y, *(positions(x, y) + (idx,)))
+
+
+def percentile_interval(stats, alpha):
+    '''
+    Percentile interval of the bootstrap statistics with confidence level
+    '1 - alpha'. Replicates where the statistic is not defined (ie: all the
+    values resampled are equal) are ignored.
+    '''
+    stats = stats[np.isfinite(stats)]
+    if not stats.size:
+        return [np.nan, np.nan]
+    return list(np.percentile(stats, [50. * alpha, 100. - 50. * alpha]))
+
+
+def bootstrap_pair(x, y, n_boot=1000, alpha=0.05, seed=12345, pool=None):
+    '''
+    Point estimate and bootstrap percentile interval of the CCC, Pearson and
+    K-S statistics of the paired samples 'x', 'y'. The replicates are drawn
+    as index matrices of 'chunk_size' rows, processed in 'pool' (if given).
+    '''
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    if len(x) < 3:
+        return dict((_, [np.nan] * 3) for _ in ['ccc', 'pcc', 'ks'])
+
+    # Point estimates: the single "replicate" with the original order.
+    est = pair_stats(x, y, *(positions(x, y) + (np.arange(len(x))[None, :],)))
+
+    chunks = [[x, y, min(chunk_size, n_boot - _), seed + i] for i, _ in
+              enumerate(range(0, n_boot, chunk_size))]
+    if pool is not None and len(chunks) > 1:
+        results = pool.map(boot_chunk, chunks)
+    else:
+        results = [boot_chunk(_) for _ in chunks]
+
+    res = {}
+    for st in ['ccc', 'pcc', 'ks']:
+        reps = np.concatenate([_[st] for _ in results])
+        res[st] = [est[st][0]] + percentile_interval(reps, alpha)
+
+    return res
+
+
+def bootstrap_intervals(in_params, n_boot=1000, alpha=0.05, n_jobs=1,
+                        seed=12345):
+    '''
+    Bootstrap intervals of the agreement between the ASteCA and literature
+    values of each parameter, for each galaxy. Only the clusters with a
+    literature value are used.
+
+    The replicates are processed by 'n_jobs' processes ('None' uses all the
+    available cores, 1 runs sequentially).
+    '''
+    n_jobs = cpu_count() if n_jobs is None else n_jobs
+    pool = Pool(n_jobs) if n_jobs > 1 and n_boot > chunk_size else None
+    try:
+        boot = []
+        for j in [0, 1]:
+            gal_boot = {}
+            for name, par in boot_pars:
+                x, y = [np.asarray(in_params[par][j][k], dtype=float) for k in
+                        [0, 1]]
+                has_lit = np.abs(y) < 10000.
+                gal_boot[name] = bootstrap_pair(
+                    x[has_lit], y[has_lit], n_boot, alpha, seed, pool)
+            boot.append(gal_boot)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return boot
+
+
+def print_intervals(boot, n_boot, alpha):
+    '''
+    Print the bootstrap intervals of each galaxy and parameter.
+    '''
+    print '\nBootstrap {:.0f}% intervals ({} replicates)\n'.format(
+        100. * (1. - alpha), n_boot)
+    for j, gal in enumerate(['SMC', 'LMC']):
+        for name, _ in boot_pars:
+            st = boot[j][name]
+            print '{} {:<8} CCC: {:.3f} [{:.3f}, {:.3f}]  PCC: {:.3f} ' \
+                '[{:.3f}, {:.3f}]  K-S: {:.3f} [{:.3f}, {:.3f}]'.format(
+                    gal, name, *(st['ccc'] + st['pcc'] + st['ks']))
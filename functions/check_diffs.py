@@ -1,6 +1,17 @@
 
+import csv
+import json
 import numpy as np
 from scipy.stats import ks_2samp, pearsonr
+from bootstrap import bootstrap_intervals, print_intervals
+
+
+# Files where the report of the differences is stored.
+report_json = 'figures/diffs_report.json'
+report_csv = 'figures/diffs_report.csv'
+
+# Names of the parameters compared, in the order of the 'delta' statistics.
+p_name = ['[Fe/H]', 'log(age)', 'E(B-V)', 'dm']
 
 
 def ccc(l1, l2):
@@ -12,211 +23,348 @@ def ccc(l1, l2):
                                        (np.mean(l1) - np.mean(l2)) ** 2)
 
 
-def check_diffs(in_params):
+def gal_arrays(in_params, j):
+    '''
+    Arrays of the parameters of the clusters in galaxy 'j' (ASteCA values
+    first, literature values second).
     '''
-    check differences between ASteCA values and literature values for given
-    parameters.
+    arrs = {}
+    for par in ['zarr', 'zsigma', 'aarr', 'asigma', 'earr', 'darr', 'marr',
+                'rarr']:
+        arrs[par] = [np.asarray(in_params[par][j][k], dtype=float) for k in
+                     [0, 1]]
+    for par in ['ra', 'dec', 'n_memb', 'rad_pc', 'cont_ind', 'kde_prob']:
+        arrs[par] = np.asarray(in_params[par][j], dtype=float)
+
+    return arrs
+
+
+def gal_report(in_params, j):
     '''
-    gal_names, zarr, zsigma, aarr, asigma, earr, darr, dsigma, rarr, marr,\
-        ra, dec, n_memb, rad_pc, int_colors, cont_ind, phot_disp, kde_prob = \
-        [in_params[_] for _ in ['gal_names', 'zarr', 'zsigma', 'aarr',
-                                'asigma', 'earr', 'darr', 'dsigma', 'rarr',
-                                'marr', 'ra', 'dec', 'n_memb', 'rad_pc',
-                                'int_colors', 'cont_ind', 'phot_disp',
-                                'kde_prob']]
+    Statistics of the differences between ASteCA and literature values for
+    the clusters in galaxy 'j' (0 for the SMC, 1 for the LMC). Every mask is
+    obtained once, from the arrays of the parameters.
+    '''
+    gal = ['SMC', 'LMC'][j]
+    names = in_params['gal_names'][j]
+    a = gal_arrays(in_params, j)
+    z_as, z_lit = a['zarr']
+    a_as, a_lit = a['aarr']
+    rep = {'galaxy': gal, 'n_clusters': len(names)}
+
+    # Duong probability.
+    low_prob = np.flatnonzero(a['kde_prob'] < 0.25)
+    rep['kde_prob'] = {
+        'below_0.25': len(low_prob),
+        'below_0.5': int((a['kde_prob'] < 0.5).sum()),
+        'clusters': [[names[i], in_params['kde_prob'][j][i]] for i in
+                     low_prob]}
+
+    # Young and large clusters.
+    idx = np.flatnonzero((a_as < 8.5) & (a['rad_pc'] > 12.5))
+    rep['age_rad'] = [[names[i], in_params['aarr'][j][0][i],
+                       in_params['rad_pc'][j][i]] for i in idx]
+
+    # Large metallicity differences.
+    z_diff = 0.75
+    diff = z_as - z_lit
+    idx = np.flatnonzero((z_lit > -99.) & (np.abs(diff) > z_diff))
+    rep['met_outliers'] = {
+        'threshold': z_diff,
+        'clusters': [[names[i], in_params['zarr'][j][0][i],
+                      in_params['zarr'][j][1][i], diff[i]] for i in idx]}
+
+    # Large age differences. Literature minus AsteCA Log(age) difference.
+    a_diff = 0.5
+    idx = np.flatnonzero((a_lit > -99.) & (np.abs(a_as - a_lit) > a_diff))
+    rep['age_outliers'] = {
+        'threshold': a_diff,
+        'clusters': [[names[i], a['ra'][i], a['dec'][i], a_lit[i], a_as[i],
+                      a_lit[i] - a_as[i]] for i in idx]}
+
+    if j == 0:
+        # ASteCA - Maia et al. (2013) masses.
+        ma, ml = a['marr']
+        m_lim = 1500.
+        idx = np.flatnonzero(np.abs(ml) < 5000)
+        clusters = []
+        for i in idx:
+            m_a, m_l = in_params['marr'][0][0][i], in_params['marr'][0][1][i]
+            clusters.append([names[i], m_a, m_l, m_a - m_l,
+                             in_params['cont_ind'][0][i]])
+        m_d = (ma - ml)[idx]
+        m_d = m_d[np.abs(m_d) < m_lim]
+        rep['mass_diffs'] = {'limit': m_lim, 'clusters': clusters,
+                             'mean': np.mean(m_d), 'std': np.std(m_d)}
+    else:
+        # LMC clusters with large ASteCA ages and met values.
+        idx = np.flatnonzero((10 ** a_as > 3 * 10 ** 9) & (z_as > -0.5))
+        rep['old_met_rich'] = [[names[i], in_params['aarr'][j][0][i],
+                                in_params['zarr'][j][0][i]] for i in idx]
 
-    gal = ['SMC', 'LMC']
-    age_xmc_f_all = []
+    # Fractions of clusters.
+    n_as = float(len(a['zsigma'][0]))
+    err_thresh = 0.2
+    rep['frac_feh_err'] = {
+        'threshold': err_thresh,
+        'value': float((a['zsigma'][0] <= err_thresh).sum()) / n_as}
+    # Convert from [Fe/H] to z.
+    err_min, err_max = 0.0029, 0.0031
+    z = 10 ** z_as * 0.0152
+    e_z = a['zsigma'][0] * z * np.log(10.)
+    rep['frac_z_err'] = {
+        'min': err_min, 'max': err_max,
+        'value': float(((err_min <= e_z) & (e_z <= err_max)).sum()) / n_as}
+    feh = [-0.7, -0.4][j]
+    tot_feh = len(z_lit) if j == 0 else (len(z_lit) - 36)
+    n_feh = ((feh - 0.01 <= z_lit) & (z_lit <= feh + 0.01)).sum()
+    rep['frac_lit_default_feh'] = {
+        'feh': feh, 'value': float(n_feh) / tot_feh}
+    err_thresh = 0.1
+    rep['frac_age_err'] = {
+        'threshold': err_thresh,
+        'value': float((a['asigma'][0] <= err_thresh).sum()) /
+        len(a['asigma'][0])}
+
+    # Average ASteCA values.
+    rep['means'] = {
+        'ext': [np.mean(a['earr'][0]), np.std(a['earr'][0])],
+        'mass': np.mean(a['marr'][0]), 'radius': np.mean(a['rarr'][0]),
+        'density': np.mean(a['n_memb'] / (np.pi * a['rarr'][0] ** 2)),
+        'lit_e_age': np.mean(a['asigma'][1])}
+
+    # Mean only for those clusters with ASteCA age values closer than 0.5
+    # to literature values.
+    delta_a = a_as - a_lit
+    age_close = delta_a[np.abs(delta_a) <= 0.5]
+    # Filter out clusters with no metal values in the literature
+    # (.ods file)
+    has_z = np.abs(z_lit) < 10000
+    z_as_f, z_lit_f = z_as[has_z], z_lit[has_z]
+
+    # K_S test.
+    # Null hypothesis: that 2 independent samples are drawn from the same
+    # continuous distribution (sample sizes can be different)
+    #
+    # If the K-S statistic is small or the p-value is high, then we cannot
+    # reject the hypothesis that the distributions of the two samples are
+    # the same.
+    # For two identical distributions the KS value will be small and
+    # the p-value high.
+    ks_z, pval_z = ks_2samp(z_as_f, z_lit_f)
+    ks_a, pval_a = ks_2samp(a_as, a_lit)
+    rep['met'] = {
+        'asteca_mean': np.mean(z_as), 'asteca_std': np.std(z_as),
+        'lit_mean': np.mean(z_lit_f), 'lit_std': np.std(z_lit_f),
+        'mean_diff': np.mean(z_as_f - z_lit_f),
+        'median_diff': np.median(z_as_f - z_lit_f),
+        'ccc': ccc(z_as_f, z_lit_f),
+        'pcc': np.corrcoef(z_as_f, z_lit_f)[0, 1], 'ks': ks_z,
+        'ks_pval': pval_z}
+    rep['age'] = {
+        'mean_delta_close': np.mean(age_close), 'ccc': ccc(a_as, a_lit),
+        'pcc': np.corrcoef(a_as, a_lit)[0, 1], 'ks': ks_a, 'ks_pval': pval_a}
+
+    # Filter out Piatti (2011) clusters that only have ages assigned.
+    # \delta as: ASteCA - literature values.
+    not_p11 = np.abs(z_lit) < 30000.
+    par_delta = [(a[_][0] - a[_][1])[not_p11] for _ in
+                 ['zarr', 'aarr', 'earr', 'darr']]
+    rep['delta'] = dict(
+        (p_name[i], [np.mean(span), np.std(span)]) for i, span in
+        enumerate(par_delta))
+    rep['delta_corr_dm'] = dict(
+        (p_name[i], pearsonr(span, par_delta[-1])[0]) for i, span in
+        enumerate(par_delta[:-1]))
+
+    return rep, list(age_close)
+
+
+def diffs_report(in_params):
+    '''
+    Check differences between ASteCA values and literature values for given
+    parameters. Return a dictionary with the statistics of each galaxy.
+    '''
+    report, age_close_all = {'galaxies': []}, []
     # For SMC and LMC.
     for j in [0, 1]:
-        print '\n*** {} ***\n'.format(gal[j])
-
-        # print 'Contamination index'
-        # for i, name in enumerate(gal_names[j]):
-        #     print name, cont_ind[j][i]
-
-        print 'Duong probability for {}'.format(gal[j])
-        print 'Probs<0.25:', ((np.array(kde_prob[j]) < 0.25)).sum()
-        print 'Probs<0.5:', ((np.array(kde_prob[j]) < 0.5)).sum()
-        for i, name in enumerate(gal_names[j]):
-            if kde_prob[j][i] < 0.25:
-                print 'Clust {}, prob: {:0.2f}'.format(name, kde_prob[j][i])
-
-        print '\n{} clusters in age/rad range:'.format(gal[j])
-        for i, name in enumerate(gal_names[j]):
-            a, r = aarr[j][0][i], rad_pc[j][i]
-            if a < 8.5 and r > 12.5:
-                print '{}: age: {} ; rad: {} pc'.format(name, a, r)
-        print ''
+        rep, age_close = gal_report(in_params, j)
+        report['galaxies'].append(rep)
+        age_close_all += age_close
+    report['age_mean_delta_close'] = np.mean(age_close_all)
+
+    return report
+
+
+def print_report(report):
+    '''
+    Print the report of the differences to screen.
+    '''
+    for rep in report['galaxies']:
+        gal = rep['galaxy']
+        print '\n*** {} ***\n'.format(gal)
 
-        # For each cluster.
-        met_count = 0
-        for i, name in enumerate(gal_names[j]):
-            # Metallicity.
-            z_diff = 0.75
-            diff = zarr[j][0][i] - zarr[j][1][i]
-            if zarr[j][1][i] > -99.:
-                if abs(diff) > z_diff:
-                    met_count += 1
-                    # AsteCA minus Literature metallicity difference.
-                    rel_diff = zarr[j][0][i] - zarr[j][1][i]
-                    print '{} {}, {:.2f} vs {:.2f} , {:.2f}'.format(
-                        gal[j], name, zarr[j][0][i], zarr[j][1][i], rel_diff)
+        print 'Duong probability for {}'.format(gal)
+        print 'Probs<0.25:', rep['kde_prob']['below_0.25']
+        print 'Probs<0.5:', rep['kde_prob']['below_0.5']
+        for name, prob in rep['kde_prob']['clusters']:
+            print 'Clust {}, prob: {:0.2f}'.format(name, prob)
+
+        print '\n{} clusters in age/rad range:'.format(gal)
+        for name, a, r in rep['age_rad']:
+            print '{}: age: {} ; rad: {} pc'.format(name, a, r)
+        print ''
 
+        for name, z_a, z_l, diff in rep['met_outliers']['clusters']:
+            print '{} {}, {:.2f} vs {:.2f} , {:.2f}'.format(
+                gal, name, z_a, z_l, diff)
         print '{}, Clusters with \delta z>{}: {}\n'.format(
-            gal[j], z_diff, met_count)
+            gal, rep['met_outliers']['threshold'],
+            len(rep['met_outliers']['clusters']))
 
-        # For each cluster.
-        age_diff = []
         print 'Gal-Clust alpha delta log(age)_lit log(age)_ASteCA'
-        for i, name in enumerate(gal_names[j]):
-            # Age.
-            a_diff = 0.5
-            # ASteCA - literature
-            diff = aarr[j][0][i] - aarr[j][1][i]
-            if aarr[j][1][i] > -99.:
-                if abs(diff) > a_diff:
-                    age_diff.append(diff)
-                    # Literature minus AsteCA Log(age) difference.
-                    rel_diff = aarr[j][1][i] - aarr[j][0][i]
-                    print ("{}-{} & {:.5f} & {:.5f} & {:.2f} & "
-                           "{:.2f} & {:.2f}\\\\".format(
-                               gal[j][0], name, ra[j][i], dec[j][i],
-                               aarr[j][1][i], aarr[j][0][i], rel_diff))
-
+        for name, ra, dec, a_l, a_a, diff in rep['age_outliers']['clusters']:
+            print ("{}-{} & {:.5f} & {:.5f} & {:.2f} & "
+                   "{:.2f} & {:.2f}\\\\".format(
+                       gal[0], name, ra, dec, a_l, a_a, diff))
         print '{}, Clusters with \delta log(age)>{}: {}\n'.format(
-            gal[j], a_diff, len(age_diff))
+            gal, rep['age_outliers']['threshold'],
+            len(rep['age_outliers']['clusters']))
 
-        if j == 0:
-            avrg_mass = []
+        if 'mass_diffs' in rep:
+            md = rep['mass_diffs']
             print 'Masses for SMC clusters: ASteCA - Maia et al. (2013) = diff'
-            for i, (ma, ml) in enumerate(zip(*[marr[0][0], marr[0][1]])):
-                if abs(ml) < 5000:
-                    print '{}: {} - {} = {}, {}'.format(
-                        gal_names[j][i], ma, ml, ma - ml, cont_ind[0][i])
-                    m_lim = 1500.
-                    if abs(ma-ml) < m_lim:
-                        avrg_mass.append(ma-ml)
+            for name, ma, ml, diff, ci in md['clusters']:
+                print '{}: {} - {} = {}, {}'.format(name, ma, ml, diff, ci)
             print 'Mean mass diff for Delta<{}: {} +- {}'.format(
-                m_lim, np.mean(avrg_mass), np.std(avrg_mass))
+                md['limit'], md['mean'], md['std'])
 
-        if j == 1:
+        if 'old_met_rich' in rep:
             print 'LMC clusters with large ASteCA ages and met values'
-            for i, (log_a, fe_h) in enumerate(zip(*[aarr[j][0], zarr[1][0]])):
-                if 10**log_a > 3*10**9 and fe_h > -0.5:
-                    print '{}: {} ; {}'.format(gal_names[j][i], log_a, fe_h)
+            for name, log_a, fe_h in rep['old_met_rich']:
+                print '{}: {} ; {}'.format(name, log_a, fe_h)
 
         print ''
-        err_c, err_thresh = 0, 0.2
-        for ez in zsigma[j][0]:
-            if ez <= err_thresh:
-                err_c += 1
-        perc = float(err_c)/len(zsigma[j][0])
         print 'Perc of OC with [Fe/H] errors below {}: {}'.format(
-            err_thresh, perc)
-
-        err_c, err_min, err_max = 0, 0.0029, 0.0031
-        for i, e in enumerate(zsigma[j][0]):
-            # convert from [Fe/H] to z
-            z = 10**zarr[j][0][i] * 0.0152
-            e_z = e*z*np.log(10.)
-            if err_min <= e_z <= err_max:
-                err_c += 1
-        perc = float(err_c)/len(zsigma[j][0])
-        print 'Perc of OC with {}<= z <={}: {}'.format(err_min, err_max,
-                                                       perc)
-
-        default_fe_h, feh_sum = [-0.7, -0.4], 0.
-        for i, fe_h_lit in enumerate(zarr[j][1]):
-            feh = default_fe_h[j]
-            if (feh - 0.01) <= fe_h_lit <= (feh + 0.01):
-                feh_sum += 1
-        tot_feh = len(zarr[j][1]) if j == 0 else (len(zarr[j][1]) - 36)
-        perc = float(feh_sum)/tot_feh
+            rep['frac_feh_err']['threshold'], rep['frac_feh_err']['value'])
+        print 'Perc of OC with {}<= z <={}: {}'.format(
+            rep['frac_z_err']['min'], rep['frac_z_err']['max'],
+            rep['frac_z_err']['value'])
         print 'Perc of OC with lit values [Fe/H]~{}: {}'.format(
-            feh, perc)
-
-        err_c, err_thresh = 0, 0.1
-        for e in asigma[j][0]:
-            if e <= err_thresh:
-                err_c += 1
-        perc = float(err_c)/len(asigma[j][0])
-        print 'Perc of OC with age errors below {}: {}\n'.format(err_thresh,
-                                                                 perc)
+            rep['frac_lit_default_feh']['feh'],
+            rep['frac_lit_default_feh']['value'])
+        print 'Perc of OC with age errors below {}: {}\n'.format(
+            rep['frac_age_err']['threshold'], rep['frac_age_err']['value'])
 
+        means = rep['means']
         print '\nAverage ASteCA E(B-V) for the {}: {} +- {}'.format(
-            gal[j], np.mean(earr[j][0]), np.std(earr[j][0]))
-        print 'Average ASteCA mass for the {}: {}'.format(
-            gal[j], np.mean(marr[j][0]))
+            gal, means['ext'][0], means['ext'][1])
+        print 'Average ASteCA mass for the {}: {}'.format(gal, means['mass'])
         print 'Average ASteCA radius for the {}: {}'.format(
-            gal[j], np.mean(rarr[j][0]))
+            gal, means['radius'])
         print 'Average ASteCA density for the {}: {}'.format(
-            gal[j], np.mean(n_memb[j] / (np.pi*np.array(rarr[j][0])**2)))
+            gal, means['density'])
 
         print '\nMean literature e_log(age) for {}: {}\n'.format(
-            gal[j], np.mean(asigma[j][1]))
-
-        # Mean only for those clusters with ASteCA age values closer than 0.5
-        # to literature values.
-        age_xmc_f = []
-        for a in list(np.array(aarr[j][0]) - np.array(aarr[j][1])):
-            if abs(a) <= 0.5:
-                age_xmc_f.append(a)
-        age_xmc_f_all += age_xmc_f
-        print 'Age mean for Delta log(age)<0.5:', np.mean(age_xmc_f)
-        print 'Met vals mean/std, AS:', np.mean(zarr[j][0]), \
-            np.std(zarr[j][0])
-        # Filter out clusters with no metal values in the literature
-        # (.ods file)
-        z_xmc_lit_f, z_xmc_ast_f = [], []
-        for z_ast, z_lit in zip(*[zarr[j][0], zarr[j][1]]):
-            if abs(z_lit) < 10000:
-                z_xmc_lit_f.append(z_lit)
-                z_xmc_ast_f.append(z_ast)
-        print 'Met vals mean/std, Lit:', np.mean(z_xmc_lit_f), \
-            np.std(z_xmc_lit_f)
-        print 'Met vals mean diff:', np.mean(np.array(z_xmc_ast_f) -
-                                             np.array(z_xmc_lit_f))
-        print 'Met vals median diff:', np.median(np.array(z_xmc_ast_f) -
-                                                 np.array(z_xmc_lit_f)), '\n'
-
-        # K_S test.
-        # Null hypothesis: that 2 independent samples are drawn from the same
-        # continuous distribution (sample sizes can be different)
-        #
-        # If the K-S statistic is small or the p-value is high, then we cannot
-        # reject the hypothesis that the distributions of the two samples are
-        # the same.
-        # For two identical distributions the KS value will be small and
-        # the p-value high.
-        print 'Met vals CCC:', ccc(z_xmc_ast_f, z_xmc_lit_f)
-        print 'Met vals PCC:', np.corrcoef(z_xmc_ast_f, z_xmc_lit_f)[0, 1]
-        ks, pval = ks_2samp(z_xmc_ast_f, z_xmc_lit_f)
-        print 'Met vals K-S:', ks, pval
-        print 'Age vals CCC:', ccc(aarr[j][0], aarr[j][1])
-        print 'Age vals PCC:', np.corrcoef(aarr[j][0], aarr[j][1])[0, 1]
-        ks, pval = ks_2samp(aarr[j][0], aarr[j][1])
-        print 'Age vals K-S:', ks, pval, '\n'
+            gal, means['lit_e_age'])
+
+        met, age = rep['met'], rep['age']
+        print 'Age mean for Delta log(age)<0.5:', age['mean_delta_close']
+        print 'Met vals mean/std, AS:', met['asteca_mean'], met['asteca_std']
+        print 'Met vals mean/std, Lit:', met['lit_mean'], met['lit_std']
+        print 'Met vals mean diff:', met['mean_diff']
+        print 'Met vals median diff:', met['median_diff'], '\n'
+        print 'Met vals CCC:', met['ccc']
+        print 'Met vals PCC:', met['pcc']
+        print 'Met vals K-S:', met['ks'], met['ks_pval']
+        print 'Age vals CCC:', age['ccc']
+        print 'Age vals PCC:', age['pcc']
+        print 'Age vals K-S:', age['ks'], age['ks_pval'], '\n'
 
         print 'Filter out Piatti (2011) clusters that only have ages assigned'
-        par_all, par_delta = [[[], [], [], []] for _ in range(2)]
-        for i, param in enumerate([zarr, aarr, earr, darr]):
-            for k, p_lit in enumerate(param[j][1]):
-                # Filter out Piatti (2011) clusters that only have ages
-                # assigned.
-                if abs(zarr[j][1][k]) < 30000.:
-                    # \delta as: ASteCA - literature values.
-                    # par_all[i].append(param[j][0][k])
-                    par_delta[i].append(param[j][0][k] - param[j][1][k])
-        p_name = ['[Fe/H]', 'log(age)', 'E(B-V)', 'dm']
-        for i, span in enumerate(par_delta):
+        for name in p_name:
             print 'Delta {}/{} mean+-std: {:.3f} +- {:.3f}'.format(
-                gal[j], p_name[i], np.mean(span), np.std(span))
-        for i, span in enumerate(par_delta[:-1]):
-            r_pears = pearsonr(span, par_delta[-1])
+                gal, name, rep['delta'][name][0], rep['delta'][name][1])
+        for name in p_name[:-1]:
             print 'Correlation Delta {} vs dm: {:.3f}'.format(
-                p_name[i], r_pears[0])
+                name, rep['delta_corr_dm'][name])
         print ''
 
     print '\nAge mean for Delta log(age)<0.5 S/LMC:{}\n'.format(
-        np.mean(age_xmc_f_all))
+        report['age_mean_delta_close'])
+
+
+def to_builtin(obj):
+    '''
+    Convert the numpy values of the report into Python types.
+    '''
+    if isinstance(obj, dict):
+        return dict((k, to_builtin(v)) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return [to_builtin(_) for _ in obj]
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+def scalar_rows(obj, prefix=''):
+    '''
+    Flatten the scalar statistics of a galaxy report into (statistic, value)
+    rows. Lists of clusters are replaced by their length.
+    '''
+    rows = []
+    for k in sorted(obj):
+        v = obj[k]
+        key = prefix + str(k)
+        if isinstance(v, dict):
+            rows += scalar_rows(v, key + '.')
+        elif isinstance(v, list):
+            if v and not isinstance(v[0], list):
+                rows += [[key + '.' + str(i), _] for i, _ in enumerate(v)]
+            else:
+                rows.append([key + '.count', len(v)])
+        else:
+            rows.append([key, v])
+
+    return rows
+
+
+def write_report(report, json_file=report_json, csv_file=report_csv):
+    '''
+    Store the report as JSON (everything) and CSV (one row per galaxy and
+    scalar statistic).
+    '''
+    report = to_builtin(report)
+    with open(json_file, 'w') as f:
+        json.dump(report, f, indent=1, sort_keys=True)
+    with open(csv_file, 'wb') as f:
+        writer = csv.writer(f)
+        writer.writerow(['galaxy', 'statistic', 'value'])
+        for rep in report['galaxies']:
+            for key, val in scalar_rows(rep):
+                if key != 'galaxy':
+                    writer.writerow([rep['galaxy'], key, val])
+        writer.writerow(['S/LMC', 'age_mean_delta_close',
+                         report['age_mean_delta_close']])
+
+
+def check_diffs(in_params, n_boot=0, n_jobs=1):
+    '''
+    Print the differences between ASteCA values and literature values for
+    given parameters, and store them in the JSON and CSV report files.
+
+    If 'n_boot' is larger than 0, the bootstrap intervals of the CCC, PCC
+    and K-S statistics of each parameter are added to the report, obtained
+    with 'n_boot' replicates processed by 'n_jobs' processes.
+    '''
+    report = diffs_report(in_params)
+    print_report(report)
+    if n_boot > 0:
+        alpha = 0.05
+        boot = bootstrap_intervals(in_params, n_boot, alpha, n_jobs)
+        print_intervals(boot, n_boot, alpha)
+        for rep, gal_boot in zip(report['galaxies'], boot):
+            rep['bootstrap'] = gal_boot
+    write_report(report)
+
+    return report
@@ -0,0 +1,97 @@
+
+import numpy as np
+from sky_projection import c_SMC, c_LMC
+
+
+# Geometry of each Cloud: center (RA, DEC), inclination and position angle of
+# the line of nodes (degrees), and distance modulus of the center.
+# SMC: Caldwell & Coulson (1986), de Grijs & Bono (2015).
+# LMC: van der Marel & Cioni (2001), Pietrzynski et al. (2013).
+gal_geom = [[c_SMC, 70., 58., 18.96], [c_LMC, 34.7, 122.5, 18.49]]
+
+
+def sky_angles(ra, dec, ra0, dec0):
+    '''
+    Angular distance 'rho' to the (ra0, dec0) center, and position angle
+    'phi' (counterclockwise from the West), both in radians. See van der
+    Marel & Cioni (2001), Eqs (1) and (2).
+    '''
+    ra, dec = np.deg2rad(np.asarray(ra, dtype=float)), \
+        np.deg2rad(np.asarray(dec, dtype=float))
+    ra0, dec0 = np.deg2rad(ra0), np.deg2rad(dec0)
+    cos_rho = np.cos(dec) * np.cos(dec0) * np.cos(ra - ra0) + \
+        np.sin(dec) * np.sin(dec0)
+    sin_rho_cos_phi = -np.cos(dec) * np.sin(ra - ra0)
+    sin_rho_sin_phi = np.sin(dec) * np.cos(dec0) - np.cos(dec) * \
+        np.sin(dec0) * np.cos(ra - ra0)
+    rho = np.arctan2(np.hypot(sin_rho_cos_phi, sin_rho_sin_phi), cos_rho)
+    phi = np.arctan2(sin_rho_sin_phi, sin_rho_cos_phi)
+
+    return rho, phi
+
+
+def deproject(ra, dec, center, incl, pa_lon, dm):
+    '''
+    Coordinates (x, y) in the plane of a Cloud, and galactocentric radius,
+    in kpc, of the positions (ra, dec). The positions are assumed to lie in
+    the plane, with the given inclination and position angle of the line of
+    nodes (degrees), and the distance modulus 'dm' of its center. The 'x'
+    axis is the line of nodes. See van der Marel & Cioni (2001), Eq (5).
+    '''
+    rho, phi = sky_angles(ra, dec, *center)
+    # Angle of the line of nodes measured as 'phi' (from the West). Its near
+    # side is at position angle 'pa_lon - 90'.
+    incl, theta = np.deg2rad(incl), np.deg2rad(pa_lon + 90.)
+    d_0 = 10. ** (0.2 * dm + 1.) / 1000.
+
+    # Distance to each position in the plane.
+    dist = d_0 * np.cos(incl) / (np.cos(incl) * np.cos(rho) - np.sin(incl) *
+                                 np.sin(rho) * np.sin(phi - theta))
+    x = dist * np.sin(rho) * np.cos(phi - theta)
+    y = dist * (np.sin(rho) * np.cos(incl) * np.sin(phi - theta) +
+                np.cos(rho) * np.sin(incl)) - d_0 * np.sin(incl)
+
+    return x, y, np.hypot(x, y)
+
+
+def gal_radii(ra, dec):
+    '''
+    In plane coordinates and galactocentric radii of the clusters of each
+    Cloud ('ra', 'dec' hold the SMC and LMC coordinates).
+    '''
+    return [deproject(ra[j], dec[j], *gal_geom[j]) for j in [0, 1]]
+
+
+def radial_profile(rad, vals, sigmas, bin_edges):
+    '''
+    Inverse variance weighted mean of the values in each radial bin, its
+    error, and the number of values in it. Empty bins are NaN.
+    '''
+    rad, vals = np.asarray(rad, dtype=float), np.asarray(vals, dtype=float)
+    w = 1. / np.asarray(sigmas, dtype=float) ** 2
+    idx = np.digitize(rad, bin_edges) - 1
+    n_bins = len(bin_edges) - 1
+    inside = (idx >= 0) & (idx < n_bins)
+    idx, w, vals = idx[inside], w[inside], vals[inside]
+
+    s_w = np.bincount(idx, weights=w, minlength=n_bins)
+    n = np.bincount(idx, minlength=n_bins)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(idx, weights=w * vals, minlength=n_bins) / s_w
+        err = 1. / np.sqrt(s_w)
+
+    return mean, err, n
+
+
+def radial_gradient(rad, vals, sigmas):
+    '''
+    Slope (per kpc) and zero point of the inverse variance weighted linear
+    fit of the values versus radius, and their errors.
+    '''
+    rad, vals = np.asarray(rad, dtype=float), np.asarray(vals, dtype=float)
+    w = 1. / np.asarray(sigmas, dtype=float) ** 2
+    a = np.column_stack([rad, np.ones(len(rad))]) * np.sqrt(w)[:, None]
+    coef = np.linalg.lstsq(a, vals * np.sqrt(w), rcond=-1)[0]
+    e_coef = np.sqrt(np.diag(np.linalg.inv(np.dot(a.T, a))))
+
+    return coef, e_coef
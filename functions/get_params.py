@@ -1,6 +1,5 @@
 
 import numpy as np
-from functions.photom_dispersion import get_disp
 
 
 def float_str(val):
@@ -56,7 +55,7 @@ def z_to_feh(z, ez):
     return fe_h, e_fe_h
 
 
-def params(r_path, as_names, as_pars, cl_dict, names_idx):
+def params(as_names, as_pars, cl_dict, names_idx):
     '''
     Return ASteCA output and literature parameters values.
     '''
@@ -84,8 +83,7 @@ def params(r_path, as_names, as_pars, cl_dict, names_idx):
     # Initialize empty lists. The first sub-list in the parameters list
     # corresponds to clusters in the SMC and the second to those in the LMC.
     gal_names, int_colors, n_memb, cont_ind, kde_prob, ra, dec, rad_pc, \
-        erad_pc, r_core_pc, e_r_core, phot_disp = \
-        [[[], []] for _ in range(12)]
+        erad_pc, r_core_pc, e_r_core = [[[], []] for _ in range(11)]
     # First sub-list stores SMC values, the second one stores LMC values.
     # First and 2nd sub-sublist store Schlafly & Finkbeiner extinction values
     # and their errors. Third and 4th store MCEV extinction values and their
@@ -161,9 +159,6 @@ def params(r_path, as_names, as_pars, cl_dict, names_idx):
         # if r_c_pc > r_pc:
         #     print j, as_names[i], as_p[a_rad], r_core_px
 
-        # Get photometric dispersion parameter.
-        phot_disp[j].append(get_disp(r_path, as_names[i]))
-
         # Organize param values, ASteCA first, lit second.
         met = [as_p[a_zi], cl_dict[names_idx[i]][l_zi]]
         smet = [as_p[a_zei], cl_dict[names_idx[i]][l_zei]]
@@ -208,7 +203,7 @@ def params(r_path, as_names, as_pars, cl_dict, names_idx):
         'msigma': msigma, 'rarr': rarr, 'ext_sf': ext_sf, 'ext_mcev': ext_mcev,
         'rad_pc': rad_pc, 'erad_pc': erad_pc, 'int_colors': int_colors,
         'n_memb': n_memb, 'cont_ind': cont_ind, 'kde_prob': kde_prob,
-        'r_core_pc': r_core_pc, 'e_r_core': e_r_core, 'phot_disp': phot_disp
+        'r_core_pc': r_core_pc, 'e_r_core': e_r_core
     }
 
     return pars_dict
@@ -0,0 +1,201 @@
+
+import os
+import glob
+import json
+import types
+import hashlib
+import inspect
+from functions.read_photom_files import cache_ext
+from functions.stages import providers, required, stage_files, outputs
+
+
+# File where the fingerprint of every figure is stored.
+manifest_file = 'figures/.manifest.json'
+
+# Root folder of the repository. Only functions defined inside it are
+# considered part of the code version of a plot.
+repo_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+
+def load_manifest():
+    '''
+    Read the manifest written by the last run. Return an empty one if it
+    does not exist or can not be read.
+    '''
+    try:
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+    except (IOError, ValueError):
+        manifest = {}
+    manifest.setdefault('files', {})
+    manifest.setdefault('plots', {})
+
+    return manifest
+
+
+def save_manifest(manifest):
+    '''
+    Store the manifest, replacing the old one only once it is fully written.
+    '''
+    tmp_file = manifest_file + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.rename(tmp_file, manifest_file)
+
+
+def expand(paths):
+    '''
+    List every existing file in 'paths'. Folders are walked recursively, and
+    the binary caches of the photometry files are ignored.
+    '''
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                files += [os.path.join(root, _) for _ in names if not
+                          _.endswith(cache_ext)]
+        elif os.path.isfile(path):
+            files.append(path)
+
+    return sorted(set(files))
+
+
+def file_hash(path, file_cache):
+    '''
+    SHA1 of the contents of a file. The hash is only computed again if the
+    size or the modification time of the file changed since it was stored in
+    'file_cache'.
+    '''
+    st = os.stat(path)
+    cached = file_cache.get(path)
+    if cached is not None and cached[:2] == [st.st_size, st.st_mtime]:
+        return cached[2]
+
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    file_cache[path] = [st.st_size, st.st_mtime, sha.hexdigest()]
+
+    return sha.hexdigest()
+
+
+def code_names(code):
+    '''
+    Global names used by a code object, including those used by the
+    functions defined inside it.
+    '''
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= code_names(const)
+
+    return names
+
+
+def in_repo(obj):
+    '''
+    True if the function or module 'obj' is defined inside the repository.
+    '''
+    try:
+        src_file = inspect.getsourcefile(obj)
+    except TypeError:
+        return False
+    return src_file is not None and \
+        os.path.realpath(src_file).startswith(repo_path + os.sep)
+
+
+def module_file(name, func):
+    '''
+    Source file of the repository module 'name', as imported from inside
+    'func' (ie: 'ra_dec_map' or 'functions.ra_dec_map'). None if 'name' is not
+    a module of the repository. The module is not imported.
+    '''
+    func_path = os.path.dirname(os.path.realpath(inspect.getsourcefile(func)))
+    for path in [os.path.join(func_path, name.replace('.', os.sep)),
+                 os.path.join(repo_path, name.replace('.', os.sep))]:
+        if os.path.isfile(path + '.py'):
+            return path + '.py'
+    return None
+
+
+def code_hash(funcs):
+    '''
+    SHA1 of the source code of the 'funcs' functions, and of every function
+    of the repository they call (directly or not). Modules of the repository
+    used as a namespace (ie: 'cmd.get_isoch'), or imported inside a function,
+    are included entirely.
+    '''
+    sources, seen, pending = {}, set(), list(funcs)
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen or not in_repo(obj):
+            continue
+        seen.add(id(obj))
+
+        if isinstance(obj, types.ModuleType):
+            sources[obj.__name__] = inspect.getsource(obj)
+            continue
+
+        sources[obj.__module__ + '.' + obj.__name__] = inspect.getsource(obj)
+        for name in code_names(obj.__code__):
+            ref = obj.__globals__.get(name)
+            if isinstance(ref, (types.FunctionType, types.ModuleType)):
+                pending.append(ref)
+            elif ref is None:
+                mod_file = module_file(name, obj)
+                if mod_file is not None:
+                    with open(mod_file) as f:
+                        sources[os.path.relpath(mod_file, repo_path)] = \
+                            f.read()
+
+    sha = hashlib.sha1()
+    for name in sorted(sources):
+        sha.update(name + '\n' + sources[name])
+
+    return sha.hexdigest()
+
+
+def fingerprint(pl, funcs, file_cache):
+    '''
+    Fingerprint of a plot: hashes of its input files, code version of the
+    functions that make it (and those of its providers), and its
+    parameters.
+    '''
+    import matplotlib
+    funcs = list(funcs) + [providers[_][0] for _ in required([pl])]
+    finger = {
+        'inputs': dict((_, file_hash(_, file_cache)) for _ in
+                       expand(stage_files(pl))),
+        'code': code_hash(funcs),
+        'params': {'plot': pl, 'matplotlib': matplotlib.__version__}
+    }
+
+    return hashlib.sha1(json.dumps(finger, sort_keys=True)).hexdigest()
+
+
+def plot_outputs(pl):
+    '''
+    Figures currently found for plot 'pl'.
+    '''
+    return sorted(set(f for _ in outputs[pl] for f in glob.glob(_)))
+
+
+def is_stale(manifest, pl, finger):
+    '''
+    A plot must be made again if its fingerprint changed, or if any of the
+    figures it created the last time is missing.
+    '''
+    entry = manifest['plots'].get(pl)
+    if entry is None or entry['fingerprint'] != finger:
+        return True
+    return not entry['outputs'] or \
+        not all(os.path.isfile(_) for _ in entry['outputs'])
+
+
+def record(manifest, pl, finger):
+    '''
+    Store the fingerprint and figures of a plot that was just made.
+    '''
+    manifest['plots'][pl] = {'fingerprint': finger,
+                             'outputs': plot_outputs(pl)}
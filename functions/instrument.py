@@ -0,0 +1,226 @@
+
+import os
+import sys
+import json
+import time
+import socket
+import resource
+import subprocess
+import cProfile
+from contextlib import contextmanager
+try:
+    # Only available for Python 3 (or Python 2 with pytracemalloc).
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+# Set this variable to the names of the stages to profile with cProfile,
+# separated by commas, or to 'all'. A name ending with ':' matches every stage
+# starting with it (ie: 'plot:'). Ie: MC_PROFILE=params,plot:
+profile_var = 'MC_PROFILE'
+# Folder where the profile of each stage is stored.
+profile_path = 'figures/profiles/'
+# Set this variable to '0' to not trace the memory allocations.
+trace_var = 'MC_TRACEMALLOC'
+# Default run report file.
+report_file = 'figures/run_report.json'
+# Root folder of the repository.
+r_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+# One record per stage call: name, wall and CPU time (seconds), peak traced
+# memory and peak resident memory of the process (Mb), and number of items
+# processed.
+records = []
+# Peak traced memory of the stages currently running.
+mem_stack = []
+# Profiler of each stage, and name of the stage being profiled (profilers
+# can not be nested).
+profilers, profiling = {}, []
+
+
+def cpu_time():
+    '''
+    User plus system CPU time of this process.
+    '''
+    ru = resource.getrusage(resource.RUSAGE_SELF)
+    return ru.ru_utime + ru.ru_stime
+
+
+def max_rss():
+    '''
+    Peak resident memory of this process, in Mb.
+    '''
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.
+
+
+def tracing():
+    '''
+    True if the memory allocations are traced.
+    '''
+    if tracemalloc is None or os.environ.get(trace_var) == '0':
+        return False
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return True
+
+
+def reset_peak():
+    '''
+    Start measuring the peak traced memory from the current value.
+    '''
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+
+
+def profiled(name):
+    '''
+    True if the 'name' stage was selected to be profiled.
+    '''
+    sel = os.environ.get(profile_var, '')
+    for st in [_.strip() for _ in sel.split(',') if _.strip()]:
+        if st == 'all' or st == name or \
+                (st.endswith(':') and name.startswith(st)):
+            return True
+    return False
+
+
+@contextmanager
+def stage(name, items=None):
+    '''
+    Record the wall time, CPU time, peak memory and number of items of the
+    code run inside this context, as a call to the 'name' stage.
+
+    The record is returned so the number of items can be set inside the
+    context, once it is known.
+    '''
+    rec = {'name': name, 'items': items}
+    trace = tracing()
+    if trace:
+        if mem_stack:
+            mem_stack[-1] = max(mem_stack[-1],
+                                tracemalloc.get_traced_memory()[1])
+        reset_peak()
+        mem_stack.append(0)
+
+    prof = None
+    if not profiling and profiled(name):
+        prof = profilers.setdefault(name, cProfile.Profile())
+        profiling.append(name)
+        prof.enable()
+
+    s_wall, s_cpu = time.time(), cpu_time()
+    try:
+        yield rec
+    finally:
+        rec['wall'] = time.time() - s_wall
+        rec['cpu'] = cpu_time() - s_cpu
+        if prof is not None:
+            prof.disable()
+            profiling.pop()
+        if trace:
+            peak = max(mem_stack.pop(), tracemalloc.get_traced_memory()[1])
+            if mem_stack:
+                mem_stack[-1] = max(mem_stack[-1], peak)
+            reset_peak()
+            rec['mem_peak'] = peak / 1024. ** 2
+        else:
+            rec['mem_peak'] = None
+        rec['max_rss'] = max_rss()
+        records.append(rec)
+
+
+def reset():
+    '''
+    Forget the records and profilers (ie: those inherited by a worker
+    process from its parent).
+    '''
+    del records[:]
+    del mem_stack[:]
+    del profiling[:]
+    profilers.clear()
+
+
+def merge(recs):
+    '''
+    Add the records obtained by a worker process.
+    '''
+    records.extend(recs)
+
+
+def dump_profiles():
+    '''
+    Store the profile of each profiled stage, to be read with 'pstats'.
+    '''
+    if not profilers:
+        return
+    try:
+        os.makedirs(profile_path)
+    except OSError:
+        if not os.path.isdir(profile_path):
+            raise
+    for name, prof in profilers.items():
+        f_name = name.replace(':', '_').replace('/', '_') + '.prof'
+        prof.dump_stats(os.path.join(profile_path, f_name))
+
+
+def summary():
+    '''
+    Totals of the records of each stage, in the order the stages were first
+    called.
+    '''
+    stages, order = {}, []
+    for rec in records:
+        if rec['name'] not in stages:
+            order.append(rec['name'])
+            stages[rec['name']] = {
+                'name': rec['name'], 'calls': 0, 'wall': 0., 'cpu': 0.,
+                'mem_peak': None, 'max_rss': 0., 'items': None}
+        st = stages[rec['name']]
+        st['calls'] += 1
+        st['wall'] += rec['wall']
+        st['cpu'] += rec['cpu']
+        st['max_rss'] = max(st['max_rss'], rec['max_rss'])
+        if rec['mem_peak'] is not None:
+            st['mem_peak'] = max(st['mem_peak'] or 0., rec['mem_peak'])
+        if rec['items'] is not None:
+            st['items'] = (st['items'] or 0) + rec['items']
+
+    return [stages[_] for _ in order]
+
+
+def git_info():
+    '''
+    Commit checked out, and whether the tree has uncommitted changes.
+    '''
+    with open(os.devnull, 'w') as null:
+        try:
+            commit = subprocess.check_output(
+                ['git', 'rev-parse', 'HEAD'], cwd=r_path,
+                stderr=null).strip()
+            dirty = bool(subprocess.check_output(
+                ['git', 'status', '--porcelain', '--untracked-files=no'],
+                cwd=r_path, stderr=null).strip())
+        except (OSError, subprocess.CalledProcessError):
+            commit, dirty = None, None
+
+    return commit, dirty
+
+
+def write_report(path=report_file, **info):
+    '''
+    Write the JSON run report: information on the run and the commit (plus
+    any 'info' passed), the totals of each stage and every single record.
+    '''
+    commit, dirty = git_info()
+    report = {
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'commit': commit, 'dirty': dirty,
+        'argv': sys.argv, 'python': sys.version.split()[0],
+        'host': socket.gethostname(), 'tracemalloc': tracing(),
+        'profiled': sorted(profilers),
+        'stages': summary(), 'records': records}
+    report.update(info)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=1, sort_keys=True)
+    dump_profiles()
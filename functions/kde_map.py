@@ -35,26 +35,51 @@ def kde_val(point, xarr, xsigma, yarr, ysigma, dim):
     return norm_kde
 
 
-def kde_2d(xarr, xsigma, yarr, ysigma, ext, grid_dens):
+def kernels(p0, p, s):
     '''
-    Take an array of x,y data with their errors, create a grid of points in x,y
-    and return the 2D KDE density map.
+    Gaussian kernel of each point 'p' (with error 's') evaluated in each grid
+    value 'p0'. Rows are the grid values, columns the points.
     '''
+    # Replace 0 error with very small value.
+    s = np.where(np.asarray(s) < 0., 0.000001, s)
+    return (1. / s) * np.exp(
+        -0.5 * ((np.asarray(p0)[:, None] - np.asarray(p)[None, :]) / s) ** 2)
 
-    # Grid density (number of points).
-    gd_c = complex(0, grid_dens)
 
-    # Define grid of points in x,y where the KDE will be evaluated.
-    x, y = np.mgrid[ext[0]:ext[1]:gd_c, ext[2]:ext[3]:gd_c]
-    positions = np.vstack([x.ravel(), y.ravel()])
+def kde_grid_sum(xarr, xsigma, yarr, ysigma, ext, grid_dens):
+    '''
+    Sum of the 2D kernels of the x,y points, evaluated in a grid of
+    'grid_dens' x 'grid_dens' points. Element [i, j] corresponds to the i-th x
+    and the j-th y grid values. Not normalized.
+
+    Since the kernel is the product of a kernel in x and a kernel in y, the
+    sum over the points is a matrix product. Memory used is proportional to
+    the grid density times the number of points, so large arrays should be
+    passed in batches (the sums are additive).
+    '''
+    x = np.linspace(ext[0], ext[1], grid_dens)
+    y = np.linspace(ext[2], ext[3], grid_dens)
 
-    # Evaluate KDE in x,y grid.
-    kde_grid = []
-    for p in zip(*positions):
-        kde_grid.append(kde_val(p, xarr, xsigma, yarr, ysigma, '2'))
+    return np.dot(kernels(x, xarr, xsigma), kernels(y, yarr, ysigma).T)
+
+
+def kde_2d(xarr, xsigma, yarr, ysigma, ext, grid_dens, batch=10000):
+    '''
+    Take an array of x,y data with their errors, create a grid of points in x,y
+    and return the 2D KDE density map.
+
+    The points are processed in batches of 'batch' values.
+    '''
+    kde_grid = np.zeros((grid_dens, grid_dens))
+    for i in range(0, len(xarr), batch):
+        kde_grid += kde_grid_sum(
+            xarr[i:i + batch], xsigma[i:i + batch], yarr[i:i + batch],
+            ysigma[i:i + batch], ext, grid_dens)
+    # Normalize.
+    kde_grid = kde_grid / (2 * np.pi * len(xarr))
 
     # Re-shape values for plotting.
-    z = np.rot90(np.reshape(np.array(kde_grid).T, x.shape))
+    z = np.rot90(kde_grid)
 
     return z
 
@@ -7,8 +7,8 @@ import matplotlib.offsetbox as offsetbox
 from matplotlib.ticker import MultipleLocator
 from matplotlib.colors import Normalize
 from scipy import stats
-from ra_dec_map import ra_dec_plots
 from kde_map import kde_2d, kde_1d
+from plot_series import get_series
 
 
 class MidpointNormalize(Normalize):
@@ -117,17 +117,12 @@ def as_vs_lit_plots(pl_params):
         cbar.set_label(z_lab, fontsize=xy_font_s, labelpad=7)
 
 
-def make_as_vs_lit_plot(in_params):
+def as_vs_lit_series(zarr, zsigma, aarr, asigma, earr, esigma, darr,
+                     dsigma):
     '''
-    Prepare parameters and call function to generate ASteca vs literature
-    SMC and LMC plots.
+    ASteCA minus literature differences, and their mean and standard
+    deviation, for the ASteca vs literature plots.
     '''
-
-    zarr, zsigma, aarr, asigma, earr, esigma, darr, dsigma, rarr =\
-        [in_params[_] for _ in
-         ['zarr', 'zsigma', 'aarr', 'asigma', 'earr', 'esigma', 'darr',
-          'dsigma', 'rarr']]
-
     z_all, age_all, ext_all, dm_all = [], [], [], []
     z_delta, age_delta, ext_delta, dm_delta = [], [], [], []
     z_delta_e, age_delta_e, ext_delta_e, dm_delta_e = [], [], [], []
@@ -174,6 +169,33 @@ def make_as_vs_lit_plot(in_params):
         else:
             par_mean_std.append([0., 0.])
 
+    return {'zarr': zarr, 'zsigma': zsigma, 'aarr': aarr, 'asigma': asigma,
+            'earr': earr, 'esigma': esigma, 'darr': darr, 'dsigma': dsigma,
+            'z_all': z_all, 'age_all': age_all, 'ext_all': ext_all,
+            'dm_all': dm_all, 'z_delta': z_delta, 'age_delta': age_delta,
+            'ext_delta': ext_delta, 'dm_delta': dm_delta,
+            'z_delta_e': z_delta_e, 'age_delta_e': age_delta_e,
+            'ext_delta_e': ext_delta_e, 'dm_delta_e': dm_delta_e,
+            'par_mean_std': par_mean_std}
+
+
+def make_as_vs_lit_plot(in_params):
+    '''
+    Prepare parameters and call function to generate ASteca vs literature
+    SMC and LMC plots.
+    '''
+    series = get_series('as_vs_lit', as_vs_lit_series, [
+        in_params[_] for _ in ['zarr', 'zsigma', 'aarr', 'asigma', 'earr',
+                               'esigma', 'darr', 'dsigma']])
+    zarr, zsigma, aarr, asigma, earr, esigma, darr, dsigma, z_all, age_all,\
+        ext_all, dm_all, z_delta, age_delta, ext_delta, dm_delta,\
+        z_delta_e, age_delta_e, ext_delta_e, dm_delta_e, par_mean_std = [
+            series[_] for _ in [
+                'zarr', 'zsigma', 'aarr', 'asigma', 'earr', 'esigma', 'darr',
+                'dsigma', 'z_all', 'age_all', 'ext_all', 'dm_all', 'z_delta',
+                'age_delta', 'ext_delta', 'dm_delta', 'z_delta_e',
+                'age_delta_e', 'ext_delta_e', 'dm_delta_e', 'par_mean_std']]
+
     # Generate ASteca vs literature plots.
     fig = plt.figure(figsize=(21, 31.25))  # create the top-level container
     # gs = gridspec.GridSpec(2, 4, width_ratios=[1, 0.35, 1, 0.35])
@@ -347,10 +369,9 @@ def make_as_vs_lit_mass_plot(in_params):
     SMC and LMC plots.
     '''
 
-    aarr, marr, msigma, zarr, int_colors, cont_ind, phot_disp = [
+    aarr, marr, msigma, zarr, int_colors, cont_ind = [
         in_params[_] for _ in [
-            'aarr', 'marr', 'msigma', 'zarr', 'int_colors', 'cont_ind',
-            'phot_disp']]
+            'aarr', 'marr', 'msigma', 'zarr', 'int_colors', 'cont_ind']]
 
     # SMC/LMC
     ci_all, ma_all, ma_delta, ma_delta_err = [], [], [], []
@@ -641,6 +662,9 @@ def make_ra_dec_plots(in_params, bica_coords):
     Prepare parameters and call function to generate RA vs DEC positional
     plots for the SMC and LMC.
     '''
+    # The curvilinear axes helpers are only needed for this plot.
+    from ra_dec_map import ra_dec_plots, curvelinear_grid, bica_mode
+    from sky_projection import project, catalog_projection, density_grid
 
     ra, dec, zarr, aarr, earr, darr, marr, rad_pc = [
         in_params[_] for _ in ['ra', 'dec', 'zarr', 'aarr', 'earr', 'darr',
@@ -670,30 +694,32 @@ def make_ra_dec_plots(in_params, bica_coords):
         map(list, zip(*sorted(zip(rad_pc, ra, dec, zarr, aarr, earr, darr,
                                   marr), reverse=True)))
 
-    # Bica coords.
-    bb_ra, bb_dec = zip(*bica_coords)
+    # Projected coordinates of the clusters, and of the Bica catalog (stored
+    # next to it, as its density grid).
+    ra_dec_tr = project(ra, dec)
+    bb_file = 'databases/bb_cat.dat'
+    bb_ra_dec_tr = catalog_projection(bica_coords, bb_file)
+    bb_dens = density_grid(bb_ra_dec_tr, bb_file) if bica_mode == 'density' \
+        else None
+    # Grid shared by all the panels.
+    grid_helper = curvelinear_grid()
 
     fig = plt.figure(figsize=(15, 20))
     fig.clf()
 
     ra_dec_pl_lst = [
-        [fig, 321, ra, dec, bb_ra, bb_dec, zarr, -2.1, 0., rad_pc, '$[Fe/H]$'],
-        [fig, 322, ra, dec, bb_ra, bb_dec, aarr, 6.6, 10., rad_pc,
-         '$log(age/yr)$'],
-        [fig, 323, ra, dec, bb_ra, bb_dec, earr, 0., 0.3, rad_pc,
-         '$E_{(B-V)}$'],
-        [fig, 324, ra, dec, bb_ra, bb_dec, darr, 18.4, 18.6, rad_pc,
-         '$(m-M)_{\circ}$'],
-        [fig, 325, ra, dec, bb_ra, bb_dec, darr, 18.82, 19.08, rad_pc,
-         '$(m-M)_{\circ}$'],
-        [fig, 326, ra, dec, bb_ra, bb_dec, marr, 100, 30000, rad_pc,
-         '$M\,[M_{\odot}]$']
-        # [fig, 326, ra, dec, bb_ra, bb_dec, rad_pc, rad_pc,
-        # '$r_{clust}\,[pc]$']
+        [321, zarr, -2.1, 0., '$[Fe/H]$'],
+        [322, aarr, 6.6, 10., '$log(age/yr)$'],
+        [323, earr, 0., 0.3, '$E_{(B-V)}$'],
+        [324, darr, 18.4, 18.6, '$(m-M)_{\circ}$'],
+        [325, darr, 18.82, 19.08, '$(m-M)_{\circ}$'],
+        [326, marr, 100, 30000, '$M\,[M_{\odot}]$']
+        # [326, rad_pc, '$r_{clust}\,[pc]$']
     ]
 
-    for pl_params in ra_dec_pl_lst:
-        ra_dec_plots(pl_params)
+    for gs, data_arr, v_min, v_max, z_lab in ra_dec_pl_lst:
+        ra_dec_plots([fig, gs, ra_dec_tr, bb_ra_dec_tr, bb_dens, data_arr,
+                      v_min, v_max, rad_pc, z_lab, grid_helper])
 
     # Output png file.
     fig.tight_layout()
@@ -703,6 +729,171 @@ def make_ra_dec_plots(in_params, bica_coords):
     plt.close()
 
 
+def param_map_plot(pl_params):
+    '''
+    Generate a smoothed parameter map of a Cloud.
+    '''
+    fig, gs, i, gal, maps, arr, v_min, v_max, z_lab = pl_params
+
+    ax = plt.subplot(gs[i])
+    cm = plt.cm.get_cmap('RdYlBu_r')
+    ax.set_title(gal, fontsize=12)
+    ax.set_xlabel(r'$\xi\,(^{\circ})$', fontsize=12)
+    ax.set_ylabel(r'$\eta\,(^{\circ})$', fontsize=12)
+    # Masked cells (too few clusters around them) are left blank.
+    im = ax.imshow(np.ma.masked_invalid(arr.T), origin='lower',
+                   extent=maps['extent'], cmap=cm, vmin=v_min, vmax=v_max,
+                   interpolation='nearest')
+    # Clusters positions.
+    ax.scatter(maps['x'], maps['y'], marker='.', s=3, c='k', lw=0.,
+               zorder=3)
+    ax.set_xlim(maps['extent'][:2])
+    ax.set_ylim(maps['extent'][2:])
+    # East to the left.
+    ax.invert_xaxis()
+    cbar = plt.colorbar(im, ax=ax, shrink=0.8, pad=0.02)
+    cbar.ax.tick_params(labelsize=8)
+    cbar.set_label(z_lab, fontsize=10)
+
+
+def make_param_maps_plot(in_params):
+    '''
+    Smoothed, error weighted maps of the ASteCA parameters around each
+    Cloud (see 'param_maps.py'): number of clusters and mean value of each
+    parameter, and the uncertainty of the means.
+    '''
+    # Only needed for this plot.
+    from param_maps import param_maps, map_pars
+
+    vals = [[in_params[p[1]][j][0] for p in map_pars] for j in [0, 1]]
+    sigmas = [[in_params[p[2]][j][0] for p in map_pars] for j in [0, 1]]
+    maps = get_series('param_maps', param_maps, [
+        in_params['ra'], in_params['dec'], vals, sigmas])
+
+    gal_names = ['SMC', 'LMC']
+    # Color ranges of each parameter, as in the RA vs DEC maps.
+    v_rang = {'[Fe/H]': [[-2.1, 0.], [-2.1, 0.]],
+              'log(age)': [[6.6, 10.], [6.6, 10.]],
+              'E(B-V)': [[0., 0.3], [0., 0.3]],
+              'dm': [[18.82, 19.08], [18.4, 18.6]]}
+    z_lab = {'[Fe/H]': '$[Fe/H]$', 'log(age)': '$log(age/yr)$',
+             'E(B-V)': '$E_{(B-V)}$', 'dm': '$(m-M)_{\circ}$'}
+
+    # Mean values, and number of clusters.
+    fig = plt.figure(figsize=(30, 11))
+    gs = gridspec.GridSpec(2, 5)
+    for j in [0, 1]:
+        param_map_plot([fig, gs, 5 * j, gal_names[j], maps[j],
+                        maps[j]['count'], None, None, '$N_{cl}$'])
+        for i, p in enumerate(map_pars):
+            param_map_plot([fig, gs, 5 * j + i + 1, gal_names[j], maps[j],
+                            maps[j][p[0]]['mean'], v_rang[p[0]][j][0],
+                            v_rang[p[0]][j][1], z_lab[p[0]]])
+    fig.tight_layout()
+    plt.savefig('figures/as_param_maps.png', dpi=150, bbox_inches='tight')
+    plt.clf()
+    plt.close()
+
+    # Uncertainty of the means.
+    fig = plt.figure(figsize=(24, 11))
+    gs = gridspec.GridSpec(2, 4)
+    for j in [0, 1]:
+        for i, p in enumerate(map_pars):
+            param_map_plot([fig, gs, 4 * j + i, gal_names[j], maps[j],
+                            maps[j][p[0]]['err'], None, None,
+                            r'$\sigma$' + z_lab[p[0]]])
+    fig.tight_layout()
+    plt.savefig('figures/as_param_maps_err.png', dpi=150,
+                bbox_inches='tight')
+    # Close to release memory.
+    plt.clf()
+    plt.close()
+
+
+def radial_series(ra, dec, vals, sigmas, sig_min, bin_edges):
+    '''
+    Galactocentric radius of the clusters of each Cloud, and the radial
+    profile and gradient of each parameter.
+    '''
+    from deproject import gal_radii, radial_profile, radial_gradient
+
+    series = []
+    for j, (x, y, rad) in enumerate(gal_radii(ra, dec)):
+        gal = {'x': x, 'y': y, 'rad': rad, 'profile': [], 'gradient': []}
+        for v, s, s_min in zip(vals[j], sigmas[j], sig_min):
+            s = np.maximum(s, s_min)
+            gal['profile'].append(list(radial_profile(rad, v, s,
+                                                      bin_edges[j])))
+            gal['gradient'].append(list(radial_gradient(rad, v, s)))
+        series.append(gal)
+
+    return series
+
+
+def radial_plot(pl_params):
+    '''
+    Generate a parameter versus galactocentric radius plot.
+    '''
+    gs, i, gal, rad, vals, sigmas, edges, prof, grad, y_lab, y_rang = \
+        pl_params
+
+    ax = plt.subplot(gs[i])
+    ax.set_title(gal, fontsize=14)
+    ax.set_xlabel('$R_{gc}\,(kpc)$', fontsize=14)
+    ax.set_ylabel(y_lab, fontsize=14)
+    ax.set_ylim(y_rang)
+    ax.grid(b=True, which='major', color='gray', linestyle='--', lw=0.5)
+    ax.errorbar(rad, vals, yerr=sigmas, fmt='none', ecolor='gray', lw=0.3,
+                zorder=1)
+    ax.scatter(rad, vals, marker='o', s=12, c='k', lw=0., zorder=2)
+    # Weighted mean of each radial bin.
+    r_mid = 0.5 * (np.asarray(edges[1:]) + np.asarray(edges[:-1]))
+    ax.errorbar(r_mid, prof[0], yerr=prof[1], fmt='s', color='r', ms=6,
+                zorder=3, label='Weighted mean')
+    # Linear gradient.
+    (slope, zp), (e_slope, e_zp) = grad
+    r_lim = np.asarray(edges)[[0, -1]]
+    ax.plot(r_lim, zp + slope * r_lim, c='b', lw=1.5, zorder=4,
+            label='{:.3f}$\pm${:.3f} dex/kpc'.format(slope, e_slope))
+    ax.legend(loc='upper right', numpoints=1, fontsize=10)
+
+
+def make_radial_plot(in_params):
+    '''
+    Plot the ASteCA [Fe/H] and ages versus the deprojected galactocentric
+    radius of the clusters in each Cloud (see 'deproject.py').
+    '''
+    ra, dec, zarr, zsigma, aarr, asigma = [
+        in_params[_] for _ in ['ra', 'dec', 'zarr', 'zsigma', 'aarr',
+                               'asigma']]
+    vals = [[zarr[j][0], aarr[j][0]] for j in [0, 1]]
+    sigmas = [[zsigma[j][0], asigma[j][0]] for j in [0, 1]]
+    # Radial bins (kpc) of each Cloud, and minimum errors.
+    bin_edges = [np.linspace(0., 8., 9), np.linspace(0., 10., 11)]
+    sig_min = [0.05, 0.05]
+    series = get_series('radial_gradients', radial_series, [
+        ra, dec, vals, sigmas, sig_min, bin_edges])
+
+    y_lab = ['$[Fe/H]_{\mathtt{ASteCA}}$', '$log(age/yr)_{\mathtt{ASteCA}}$']
+    y_rang = [[-2.5, 0.5], [6., 10.5]]
+
+    fig = plt.figure(figsize=(16, 12))
+    gs = gridspec.GridSpec(2, 2)
+    for j, gal in enumerate(['SMC', 'LMC']):
+        for k in [0, 1]:
+            radial_plot([gs, 2 * k + j, gal, series[j]['rad'], vals[j][k],
+                         sigmas[j][k], bin_edges[j], series[j]['profile'][k],
+                         series[j]['gradient'][k], y_lab[k], y_rang[k]])
+
+    # Output png file.
+    fig.tight_layout()
+    plt.savefig('figures/as_radial_gradients.png', dpi=150,
+                bbox_inches='tight')
+    # Close to release memory.
+    plt.clf()
+    plt.close()
+
+
 def lit_ext_plots(pl_params):
     '''
     Generate ASteCA vs literature values plots.
@@ -1564,18 +1755,15 @@ def cross_match_if_plot(pl_params):
     ax.set_aspect('auto')
 
 
-def make_cross_match_if(cross_match, in_params):
+def cross_match_if_series(cross_match, aarr, earr):
     '''
-    Plot the differences between extinction and age for ASteCA values versus
-    Washington values (ie: Piatti et al. values) and ASteCA values versus
-    the databases where the isochrone fitting method was used.
+    Age and extinction differences for ASteCA values versus literature
+    values and versus the databases where the isochrone fitting method was
+    used, and their KDEs.
     '''
     # unpack databases.
     p99, p00, h03, r05, c06, g10, p12 = cross_match
 
-    aarr, asigma, earr, esigma = \
-        [in_params[_] for _ in ['aarr', 'asigma', 'earr', 'esigma']]
-
     # Define lists of ASteCA minus literature values.
     # SMC ASteCA minus literature diffs.
     diffs_lit_ages_smc = np.array(aarr[0][0]) - np.array(aarr[0][1])
@@ -1607,13 +1795,10 @@ def make_cross_match_if(cross_match, in_params):
     diffs_db_ages_g10 = np.array(g10[4]) - np.array(g10[2])
     diffs_db_exts_g10 = np.array(g10[15]) - np.array(g10[14])
 
-    # Calculate std, means and medians for the age differences.
-    txt = ['SMC', 'LMC', 'P99', 'P00', 'C06', 'G10']
+    # Calculate std and means for the age differences.
     dbs = [diffs_lit_ages_smc, diffs_lit_ages_lmc, diffs_db_ages_p99,
            diffs_db_ages_p00, diffs_db_ages_c06, diffs_db_ages_g10]
-    for i, db in enumerate(dbs):
-        print "{}, diff ages = {:.3f} +- {:.3f}".format(
-                txt[i], np.mean(db), np.std(db))
+    age_diffs = [[np.mean(db), np.std(db)] for db in dbs]
 
     # Obtain a Gaussian KDE for each plot.
     # Define x,y grid.
@@ -1650,6 +1835,29 @@ def make_cross_match_if(cross_match, in_params):
                        [c06[4], c06[5], c06[2], c06[3]],
                        [g10[4], g10[5], g10[2], g10[3]]]
 
+    return {'lit_data': lit_data, 'db_data': db_data,
+            'age_ast_DB_data': age_ast_DB_data, 'kde_cont': kde_cont,
+            'age_diffs': age_diffs}
+
+
+def make_cross_match_if(cross_match, in_params):
+    '''
+    Plot the differences between extinction and age for ASteCA values versus
+    Washington values (ie: Piatti et al. values) and ASteCA values versus
+    the databases where the isochrone fitting method was used.
+    '''
+    series = get_series('cross_match_if', cross_match_if_series, [
+        cross_match, in_params['aarr'], in_params['earr']])
+    lit_data, db_data, age_ast_DB_data, kde_cont = [
+        series[_] for _ in ['lit_data', 'db_data', 'age_ast_DB_data',
+                            'kde_cont']]
+
+    # Means and stds of the age differences, stored with the series so they
+    # are also shown when these are read from their file.
+    txt = ['SMC', 'LMC', 'P99', 'P00', 'C06', 'G10']
+    for i, (m, s) in enumerate(series['age_diffs']):
+        print "{}, diff ages = {:.3f} +- {:.3f}".format(txt[i], m, s)
+
     labels = [['P99', 'P00', 'C06', 'G10'], ['SMC', 'LMC']]
     mark = [['>', '^', 'v', '<'], ['*', '*']]
     cols = [['chocolate', 'r', 'c', 'g'], ['m', 'b']]
@@ -1816,8 +2024,14 @@ def pl_DBs_ASteCA_CMDs(pl_params):
 
 def make_DB_ASteCA_CMDs(db, db_cls):
     '''
+    Plot the CMDs for each page of clusters in 'db_cls'. Pages can be
+    passed as a generator, so each one is plotted as soon as its data is
+    obtained.
     '''
     for k, cl_lst in enumerate(db_cls):
+        # Skip pages where no cluster could be processed.
+        if not cl_lst:
+            continue
 
         fig = plt.figure(figsize=(30, 25))
         gs = gridspec.GridSpec(5, 6)
@@ -2598,10 +2812,10 @@ def massclean_z_plots(pl_params):
         cbar.set_label(z_lab, fontsize=xy_font_s, labelpad=7)
 
 
-def make_massclean_z_plot(massclean_data_pars):
+def massclean_z_series(massclean_data_pars):
     """
-    Plot MASSCLEAN true metallicities versus the metallicity estimates obtained
-    by ASteCA, and its relation with the masses.
+    ASteCA minus MASSCLEAN metallicities and ages for each mass value, with
+    the MASSCLEAN metallicities jittered.
     """
     mc_data, mc_pars = massclean_data_pars
 
@@ -2674,11 +2888,35 @@ def make_massclean_z_plot(massclean_data_pars):
 
     mean_std = []
     for d in [dat_05, dat_1, dat_5, dat_10, dat_25, dat_50, dat_100, dat_250]:
-        m, s = np.mean(zip(*d)[1]), np.std(zip(*d)[1])
+        mean_std.append([np.mean(zip(*d)[1]), np.std(zip(*d)[1])])
+    best_match = [np.mean(best_matchs), np.std(best_matchs)]
+
+    # Jittered z_MASSCLEAN, Delta z and Delta log(age) for each mass.
+    dat_m = [[rand_jitter(zip(*d)[0], 0.02), zip(*d)[1], zip(*d)[2]] for d
+             in [dat_05, dat_1, dat_5, dat_10, dat_25, dat_50, dat_100,
+                 dat_250]]
+
+    return {'dat_m': dat_m, 'mean_std': mean_std, 'best_match': best_match,
+            'n_best': len(best_matchs)}
+
+
+def make_massclean_z_plot(massclean_data_pars):
+    """
+    Plot MASSCLEAN true metallicities versus the metallicity estimates obtained
+    by ASteCA, and its relation with the masses.
+    """
+    series = get_series('massclean_z', massclean_z_series,
+                        [massclean_data_pars])
+    dat_05, dat_1, dat_5, dat_10, dat_25, dat_50, dat_100, dat_250 = \
+        series['dat_m']
+    mean_std = series['mean_std']
+
+    # Stored with the series, so they are also shown when these are read
+    # from their file.
+    for m, s in mean_std:
         print 'Delta z mean +- std:', m, s
-        mean_std.append([m, s])
     print '|Delta log(age)|<0.5, Delta z mean +- std:',\
-        np.mean(best_matchs), np.std(best_matchs), len(best_matchs)
+        series['best_match'][0], series['best_match'][1], series['n_best']
 
     # Generate plot.
     fig = plt.figure(figsize=(25.7, 12.6))
@@ -2688,36 +2926,24 @@ def make_massclean_z_plot(massclean_data_pars):
 
     as_lit_pl_lst = [
         [gs, 0, xylims[0], '', r'$\Delta z\,(\mathtt{ASteCA}-MASSCLEAN)$',
-         '', rand_jitter(zip(*dat_05)[0], 0.02),
-         zip(*dat_05)[1], zip(*dat_05)[2], r'$M=500\,M_{\odot}$',
-         mean_std],
-        [gs, 1, xylims[0], '', '', '', rand_jitter(zip(*dat_1)[0], 0.02),
-         zip(*dat_1)[1], zip(*dat_1)[2], r'$M=1000\,M_{\odot}$',
-         mean_std],
-        [gs, 2, xylims[0], '', '', '', rand_jitter(zip(*dat_5)[0], 0.02),
-         zip(*dat_5)[1], zip(*dat_5)[2], r'$M=5000\,M_{\odot}$',
-         mean_std],
-        [gs, 3, xylims[0], '', '', r'$\Delta \log(age/yr)$',
-         rand_jitter(zip(*dat_10)[0], 0.02),
-         zip(*dat_10)[1], zip(*dat_10)[2], r'$M=10000\,M_{\odot}$',
+         '', dat_05[0], dat_05[1], dat_05[2], r'$M=500\,M_{\odot}$',
          mean_std],
+        [gs, 1, xylims[0], '', '', '', dat_1[0], dat_1[1], dat_1[2],
+         r'$M=1000\,M_{\odot}$', mean_std],
+        [gs, 2, xylims[0], '', '', '', dat_5[0], dat_5[1], dat_5[2],
+         r'$M=5000\,M_{\odot}$', mean_std],
+        [gs, 3, xylims[0], '', '', r'$\Delta \log(age/yr)$', dat_10[0],
+         dat_10[1], dat_10[2], r'$M=10000\,M_{\odot}$', mean_std],
         [gs, 4, xylims[1], r'$z_{MASSCLEAN}$',
-         r'$\Delta z\,(\mathtt{ASteCA}-MASSCLEAN)$',
-         '', rand_jitter(zip(*dat_25)[0], 0.02),
-         zip(*dat_25)[1], zip(*dat_25)[2], r'$M=25000\,M_{\odot}$',
-         mean_std],
-        [gs, 5, xylims[1], r'$z_{MASSCLEAN}$', '', '',
-         rand_jitter(zip(*dat_50)[0], 0.02),
-         zip(*dat_50)[1], zip(*dat_50)[2], r'$M=50000\,M_{\odot}$',
-         mean_std],
-        [gs, 6, xylims[1], r'$z_{MASSCLEAN}$', '', '',
-         rand_jitter(zip(*dat_100)[0], 0.02),
-         zip(*dat_100)[1], zip(*dat_100)[2], r'$M=100000\,M_{\odot}$',
-         mean_std],
+         r'$\Delta z\,(\mathtt{ASteCA}-MASSCLEAN)$', '', dat_25[0],
+         dat_25[1], dat_25[2], r'$M=25000\,M_{\odot}$', mean_std],
+        [gs, 5, xylims[1], r'$z_{MASSCLEAN}$', '', '', dat_50[0],
+         dat_50[1], dat_50[2], r'$M=50000\,M_{\odot}$', mean_std],
+        [gs, 6, xylims[1], r'$z_{MASSCLEAN}$', '', '', dat_100[0],
+         dat_100[1], dat_100[2], r'$M=100000\,M_{\odot}$', mean_std],
         [gs, 7, xylims[1], r'$z_{MASSCLEAN}$', '',
-         r'$\Delta \log(age/yr)$', rand_jitter(zip(*dat_250)[0], 0.02),
-         zip(*dat_250)[1], zip(*dat_250)[2], r'$M=250000\,M_{\odot}$',
-         mean_std]
+         r'$\Delta \log(age/yr)$', dat_250[0], dat_250[1], dat_250[2],
+         r'$M=250000\,M_{\odot}$', mean_std]
     ]
 
     for pl_params in as_lit_pl_lst:
@@ -2789,12 +3015,12 @@ def age_mass_corr_plot(pl_params):
     ax.set_aspect('auto')
 
 
-def make_age_mass_corr(cross_match, cross_match_h03_p12):
+def age_mass_corr_series(h03, p12, cross_match_h03_p12):
     '''
-    Plot the differences between mass and age for ASteCA values versus
-    the H03 and P12 databases.
+    Age and mass differences for ASteCA values versus the H03 and P12
+    databases, and for P12 versus H03, in several mass ranges. Also their
+    KDEs.
     '''
-    h03, p12 = cross_match[2], cross_match[6]
     a_h03, a_p12, m_h03, m_p12 = cross_match_h03_p12
 
     # Define lists of difference between ages and masses.
@@ -2894,6 +3120,23 @@ def make_age_mass_corr(cross_match, cross_match_h03_p12):
         kde = np.reshape(k_pos.T, x.shape)
         kde_cont.append([x, y, kde])
 
+    return {'p12_h03_data': p12_h03_data, 'as_dbs_data': as_dbs_data,
+            'kde_cont': kde_cont}
+
+
+def make_age_mass_corr(cross_match, cross_match_h03_p12):
+    '''
+    Plot the differences between mass and age for ASteCA values versus
+    the H03 and P12 databases.
+    '''
+    series = get_series('age_mass_corr', age_mass_corr_series, [
+        cross_match[2], cross_match[6], cross_match_h03_p12])
+    p12_h03_data, as_dbs_data, kde_cont = [
+        series[_] for _ in ['p12_h03_data', 'as_dbs_data', 'kde_cont']]
+
+    xmm = [-1.95, 1.95]
+    ymm = [-1.95, 1.95]
+
     # Define names of arrays being plotted.
     x_lab = ['$\Delta \log(age/yr)_{\mathtt{ASteCA}-DBs}$',
              '$\Delta \log(age/yr)_{P12-H03}$']
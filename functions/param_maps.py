@@ -0,0 +1,102 @@
+
+import numpy as np
+from scipy.signal import fftconvolve
+from sky_projection import gnomonic, c_SMC, c_LMC
+
+
+# Parameters mapped: name, keys of their values and errors in 'in_params',
+# and minimum error assigned (so values with a null or very small error do
+# not dominate the weighted means).
+map_pars = [['[Fe/H]', 'zarr', 'zsigma', 0.05],
+            ['log(age)', 'aarr', 'asigma', 0.05],
+            ['E(B-V)', 'earr', 'esigma', 0.01],
+            ['dm', 'darr', 'dsigma', 0.02]]
+
+# Center of each Cloud, half width of the region mapped around it, and
+# bandwidth of the Gaussian smoothing (all in degrees).
+map_center = [c_SMC, c_LMC]
+map_half = [4., 8.]
+map_bw = [0.4, 0.6]
+# Size of the grid cells (degrees).
+map_step = 0.05
+# Cells with a smaller (kernel weighted) number of clusters are masked.
+min_count = 1.
+
+
+def gauss_kernel(bw, step):
+    '''
+    Gaussian kernel of bandwidth 'bw' sampled on the grid, truncated at 4
+    bandwidths. Its peak is 1, so convolving the number of clusters per
+    cell gives the (kernel weighted) number of clusters around each cell.
+    '''
+    n = int(np.ceil(4. * bw / step))
+    d = np.arange(-n, n + 1) * step
+    k_1d = np.exp(-0.5 * (d / bw) ** 2)
+
+    return np.outer(k_1d, k_1d)
+
+
+def smooth_sums(x, y, weights, half, step, kern):
+    '''
+    Bin the positions on the grid, adding the 'weights' of each cluster in
+    its cell, and convolve (FFT) each binned array with the kernel. Rows of
+    the results are the 'x' cells.
+    '''
+    n_cells = int(round(2. * half / step))
+    sums = []
+    for w in weights:
+        binned = np.histogram2d(x, y, bins=n_cells, range=[
+            [-half, half], [-half, half]], weights=w)[0]
+        sums.append(fftconvolve(binned, kern, mode='same'))
+
+    return sums
+
+
+def cloud_maps(ra, dec, vals, sigmas, j):
+    '''
+    Smoothed maps of the parameters of the clusters in Cloud 'j'.
+
+    The value in each cell is the mean of the clusters around it, weighted
+    by the kernel and by their inverse variance (w = 1 / sigma^2). Its error
+    is the propagated error of the weighted mean, and 'std' is the weighted
+    dispersion of the values around it. 'count' is the kernel weighted
+    number of clusters, and cells below 'min_count' are masked (NaN). This
+    also masks the round-off noise of the FFT in the empty regions.
+    '''
+    half, bw = map_half[j], map_bw[j]
+    x, y = gnomonic(ra, dec, *map_center[j])
+    kern = gauss_kernel(bw, map_step)
+
+    count = smooth_sums(x, y, [None], half, map_step, kern)[0]
+    mask = count < min_count
+    maps = {'x': x, 'y': y, 'extent': [-half, half, -half, half],
+            'count': np.where(mask, np.nan, count)}
+
+    kern2 = kern ** 2
+    for (name, _, _, sig_min), v, s in zip(map_pars, vals, sigmas):
+        v, s = np.asarray(v, dtype=float), np.asarray(s, dtype=float)
+        w = 1. / np.maximum(s, sig_min) ** 2
+        # Values relative to their weighted mean, so the dispersion does not
+        # lose precision for large values (ie: dm).
+        v0 = np.average(v, weights=w) if len(v) else 0.
+        v = v - v0
+        s_w, s_wv, s_wv2 = smooth_sums(x, y, [w, w * v, w * v ** 2], half,
+                                       map_step, kern)
+        s_k2w = smooth_sums(x, y, [w], half, map_step, kern2)[0]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = s_wv / s_w
+            err = np.sqrt(np.clip(s_k2w, 0., None)) / s_w
+            std = np.sqrt(np.clip(s_wv2 / s_w - mean ** 2, 0., None))
+        maps[name] = dict((k, np.where(mask, np.nan, a)) for k, a in
+                          [['mean', mean + v0], ['err', err], ['std', std]])
+
+    return maps
+
+
+def param_maps(ra, dec, vals, sigmas):
+    '''
+    Smoothed maps of the ASteCA parameters for both Clouds. 'vals' and
+    'sigmas' hold, for each Cloud, the values and errors of each parameter
+    in 'map_pars'.
+    '''
+    return [cloud_maps(ra[j], dec[j], vals[j], sigmas[j], j) for j in [0, 1]]
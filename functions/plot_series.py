@@ -0,0 +1,121 @@
+
+import os
+import json
+import zipfile
+import pickle
+import hashlib
+import numbers
+import numpy as np
+from functions.incremental import code_hash
+
+
+# Folder where the plot-ready series of each figure are stored.
+series_path = 'figures/series/'
+
+
+def flatten(obj, arrays):
+    '''
+    Describe the nested lists/tuples/dicts in 'obj' as a JSON-able tree.
+    Numpy arrays, and lists or tuples of numbers, are appended to 'arrays'
+    and replaced in the tree by their index.
+    '''
+    if isinstance(obj, np.ndarray):
+        arrays.append(obj)
+        return {'array': len(arrays) - 1, 'type': 'ndarray'}
+    if isinstance(obj, (list, tuple)):
+        tp = 'tuple' if isinstance(obj, tuple) else 'list'
+        if obj and all(isinstance(_, numbers.Number) for _ in obj):
+            arrays.append(np.array(obj))
+            return {'array': len(arrays) - 1, 'type': tp}
+        return {'items': [flatten(_, arrays) for _ in obj], 'type': tp}
+    if isinstance(obj, dict):
+        return {'dict': dict((k, flatten(v, arrays)) for k, v in
+                             obj.items())}
+    if isinstance(obj, np.generic):
+        return {'value': obj.item()}
+    return {'value': obj}
+
+
+def unflatten(tree, arrays):
+    '''
+    Inverse of 'flatten'.
+    '''
+    if 'array' in tree:
+        arr = arrays[tree['array']]
+        if tree['type'] == 'list':
+            return arr.tolist()
+        elif tree['type'] == 'tuple':
+            return tuple(arr.tolist())
+        return arr
+    if 'items' in tree:
+        items = [unflatten(_, arrays) for _ in tree['items']]
+        return tuple(items) if tree['type'] == 'tuple' else items
+    if 'dict' in tree:
+        return dict((str(k), unflatten(v, arrays)) for k, v in
+                    tree['dict'].items())
+    return tree['value']
+
+
+def series_key(compute, args):
+    '''
+    Key of the series obtained by calling 'compute' with 'args': depends
+    on the values of the arguments, and on the source code of the function.
+    '''
+    sha = hashlib.sha1(pickle.dumps(args, 2))
+    sha.update(code_hash([compute]))
+    return sha.hexdigest()
+
+
+def save_series(name, series, key=''):
+    '''
+    Store the 'series' dictionary in a compact .npz file.
+    '''
+    try:
+        os.makedirs(series_path)
+    except OSError:
+        if not os.path.isdir(series_path):
+            raise
+
+    arrays = []
+    tree = flatten(series, arrays)
+    arr_dict = dict(('a' + str(i), _) for i, _ in enumerate(arrays))
+    # Written under a temporary name and then renamed, so an interrupted (or
+    # concurrent) write never leaves a truncated file.
+    tmp_file = '{}{}.{}.tmp'.format(series_path, name, os.getpid())
+    with open(tmp_file, 'wb') as f:
+        np.savez(f, tree=json.dumps(tree), key=key, **arr_dict)
+    os.rename(tmp_file, series_path + name + '.npz')
+
+
+def load_series(name, key=None):
+    '''
+    Read the series stored for the 'name' figure. If a 'key' is given, and
+    the stored series was not obtained for it, return None. Same if there
+    is no stored series.
+    '''
+    try:
+        with np.load(series_path + name + '.npz') as npz:
+            if key is not None and str(npz['key']) != key:
+                return None
+            tree = json.loads(str(npz['tree']))
+            arrays = [npz['a' + str(i)] for i in
+                      range(len(npz.files) - 2)]
+    except (IOError, OSError, KeyError, ValueError, zipfile.BadZipfile):
+        return None
+
+    return unflatten(tree, arrays)
+
+
+def get_series(name, compute, args):
+    '''
+    Return the plot-ready series for the 'name' figure. These are read from
+    their file if they were already obtained for the same arguments and
+    code, else 'compute' is called with 'args' and its results stored.
+    '''
+    key = series_key(compute, args)
+    series = load_series(name, key)
+    if series is None:
+        series = compute(*args)
+        save_series(name, series, key)
+
+    return series
@@ -6,14 +6,25 @@ from matplotlib.projections import PolarAxes
 from matplotlib.transforms import Affine2D
 from mpl_toolkits.axisartist import SubplotHost
 from mpl_toolkits.axisartist import GridHelperCurveLinear
+from sky_projection import project, c_SMC, c_LMC, map_extent
 
 
-def curvelinear_test2(fig, rect=111):
+# How the Bica et al. (2008) catalog is drawn in the background of the last
+# panel: 'scatter' (one marker per cluster) or 'density' (number of clusters
+# per pixel, drawn as a single image). The density image is cheaper to
+# render and store for large catalogs.
+bica_mode = 'scatter'
+
+
+def curvelinear_grid():
     """
-    Polar projection, but in a rectangular box.
+    Grid of the polar projection. Built once and shared by all the panels,
+    since they show the same region.
     """
 
     # see demo_curvelinear_grid.py for details
+    # The data is projected with 'sky_projection.project', which is the same
+    # transform.
     tr = Affine2D().translate(0, 90) + Affine2D().scale(np.pi / 180., 1.) + \
         PolarAxes.PolarTransform()
 
@@ -37,6 +48,14 @@ def curvelinear_test2(fig, rect=111):
                                         tick_formatter2=tick_formatter2
                                         )
 
+    return grid_helper
+
+
+def curvelinear_test2(fig, rect, grid_helper):
+    """
+    Polar projection, but in a rectangular box.
+    """
+
     ax1 = SubplotHost(fig, rect, grid_helper=grid_helper)
 
     # make ticklabels of right and top axis visible.
@@ -50,8 +69,6 @@ def curvelinear_test2(fig, rect=111):
     #
     fig.add_subplot(ax1)
 
-    grid_helper = ax1.get_grid_helper()
-
     # You may or may not need these - they set the view window explicitly
     # rather than using the default as determined by matplotlib with extreme
     # finder.
@@ -65,7 +82,7 @@ def curvelinear_test2(fig, rect=111):
     # ax1.grid(linestyle='--', which='x') # either keyword applies to both
     # ax1.grid(linestyle=':', which='y')  # sets of gridlines
 
-    return ax1, tr
+    return ax1
 
 
 def ra_dec_plots(pl_params):
@@ -73,24 +90,29 @@ def ra_dec_plots(pl_params):
     Generate RA vs DEC plots.
     '''
 
-    fig, gs, ra, dec, bb_ra, bb_dec, data_arr, v_min, v_max, rad_pc, z_lab =\
-        pl_params
+    fig, gs, ra_dec_tr, bb_ra_dec_tr, bb_dens, data_arr, v_min, v_max, \
+        rad_pc, z_lab, grid_helper = pl_params
 
-    # tr.transform_point((x, 0)) is always (0,0)
-    ax1, tr = curvelinear_test2(fig, gs)
+    ax1 = curvelinear_test2(fig, gs, grid_helper)
 
     # Define colormap.
     cm = plt.cm.get_cmap('RdYlBu_r')
 
-    # Plot literature clusters.
-    # Get transformed data.
-    ra_dec_tr = tr.transform(zip(ra, dec))
+    # Plot literature clusters (coordinates already projected).
     # Size relative to the clusters actual size in pc.
     if gs == 326:
         # Plot Bica database.
-        bb_ra_dec_tr = tr.transform(zip(bb_ra, bb_dec))
-        plt.scatter(bb_ra_dec_tr[:, 0], bb_ra_dec_tr[:, 1], marker='.', s=8,
-                    c='k', lw=0.5, zorder=1)
+        if bb_dens is not None:
+            # Pixels with no clusters are left blank. Saturate the densest
+            # pixels so isolated clusters are still visible.
+            v_max_d = np.percentile(bb_dens[bb_dens > 0.], 99) if \
+                bb_dens.any() else 1.
+            ax1.imshow(np.ma.masked_equal(bb_dens.T, 0.), origin='lower',
+                       extent=map_extent, cmap='Greys', vmin=0.,
+                       vmax=v_max_d, interpolation='nearest', zorder=1)
+        else:
+            plt.scatter(bb_ra_dec_tr[:, 0], bb_ra_dec_tr[:, 1], marker='.',
+                        s=8, c='k', lw=0.5, zorder=1)
         SC = ax1.scatter(ra_dec_tr[:, 0], ra_dec_tr[:, 1], marker='o', s=20,
                          c='r', lw=0.1, zorder=9)
     else:
@@ -104,10 +126,7 @@ def ra_dec_plots(pl_params):
         # cbar.set_clim(0., 0.4)
         cbar.set_label(z_lab, fontsize=12)
 
-    # Plot clouds center. Central coords stored in degrees.
-    c_SMC = [13.1875, -72.82861111]
-    c_LMC = [80.2375, -69.47805556]
-    # Get transformed data.
-    clouds_cent = tr.transform([c_SMC, c_LMC])
+    # Plot clouds center.
+    clouds_cent = project(*zip(c_SMC, c_LMC))
     plt.scatter(clouds_cent[:, 0], clouds_cent[:, 1], marker='v', s=65,
                 c='b', edgecolor='w', lw=0.8, zorder=10)
@@ -2,9 +2,33 @@
 @author: gabriel
 """
 
+import os
+import zipfile
 import numpy as np
 
 
+# Extension appended to the name of a photometry file to store its binary
+# cache. Ie: 'NGC419.OUT' --> 'NGC419.OUT.npz'
+cache_ext = '.npz'
+
+
+def float_col(col, fill=99.999):
+    '''
+    Convert a column of strings into floats. If any string can not be
+    converted (for example 'INDEF') it is replaced by the 'fill' value.
+    '''
+    try:
+        return col.astype(float)
+    except ValueError:
+        out = np.empty(len(col))
+        for i, v in enumerate(col):
+            try:
+                out[i] = float(v)
+            except ValueError:
+                out[i] = fill
+        return out
+
+
 def rem_bad_stars(id_star, x_data, y_data, mag_data, e_mag, col1_data,
                   e_col1):
     '''
@@ -14,60 +38,106 @@ def rem_bad_stars(id_star, x_data, y_data, mag_data, e_mag, col1_data,
     # Set photometric range for accepted stars.
     min_lim, max_lim = -50., 50.
 
-    # Store indexes of stars that should be removed.
-    lists_arr = zip(mag_data, e_mag, col1_data, e_col1)
-    del_indexes = [i for i, t in enumerate(lists_arr) if
-                   any(e > max_lim for e in t) or any(e < min_lim for e in t)]
+    # Mask of stars with all their photometric values inside the range.
+    phot = np.array([mag_data, e_mag, col1_data, e_col1])
+    mask = ~np.any((phot > max_lim) | (phot < min_lim), axis=0)
 
-    # Remove stars from id list first since this are strings.
-    id_clean = np.delete(np.array(id_star), del_indexes)
-    # Remove stars from the rest of the lists simultaneously.
-    clean_array = np.delete(np.array([x_data, y_data, mag_data, e_mag,
-                            col1_data, e_col1]), del_indexes, axis=1)
+    id_clean = np.asarray(id_star)[mask]
+    clean_array = np.array([x_data, y_data, mag_data, e_mag, col1_data,
+                            e_col1])[:, mask]
 
     return id_clean, clean_array
 
 
-def get_data(data_file):
+def read_text(data_file):
     '''
-    Get spatial and photometric data from the cluster's data file.
+    Read IDs and numeric columns from the photometry file in a single pass.
     '''
-
     # Read indexes from input params.
     id_inx, x_inx, y_inx, m_inx, em_inx, c_inx, ec_inx = 0, 1, 2, 3, 4, 5, 6
 
-    # Loads the data in 'data_file' as a list of N lists where N is the number
-    # of columns. Each of the N lists contains all the data for the column.
-    # If any string is found (for example 'INDEF') it is converted to 99.999.
+    # Read every column as a string, so numeric IDs are not converted into
+    # floats (ie: 190 --> 190.0). The rest of the columns are converted
+    # below.
     try:
-        data = np.genfromtxt(data_file, dtype=float, filling_values=99.999,
-                             unpack=True)
+        data = np.genfromtxt(data_file, dtype=str, unpack=True)
     except ValueError:
         print ("\n  ERROR: the number of columns is likely unequal\n"
                "  among rows. Check the input data file.")
         raise ValueError("ERROR: Data input file is badly formatted.")
 
     try:
-        # Read data columns, except IDs.
-        x_data, y_data, mag_data, e_mag, col1_data, e_col1 = \
-            data[x_inx], data[y_inx], data[m_inx], data[em_inx], data[c_inx],\
-            data[ec_inx]
-
-        # Now read IDs as strings. Do this separately so numeric IDs are not
-        # converted into floats by np.genfromtxt. I.e.: 190 --> 190.0
-        data = np.genfromtxt(data_file, dtype=str, unpack=True)
         id_star = data[id_inx]
-        # n_old = len(id_star)
+        x_data, y_data, mag_data, e_mag, col1_data, e_col1 = [
+            float_col(data[_]) for _ in
+            [x_inx, y_inx, m_inx, em_inx, c_inx, ec_inx]]
     except IndexError:
         print ("\n  ERROR: data input file contains fewer columns than\n"
                "  those given in 'params_input.dat'.")
         raise IndexError("ERROR: Data input file is badly formatted.")
 
+    return id_star, x_data, y_data, mag_data, e_mag, col1_data, e_col1
+
+
+def read_cache(data_file):
+    '''
+    Load the binary cache for this photometry file, if it exists and it is
+    newer than the file itself. Return None otherwise.
+    '''
+    cache_file = data_file + cache_ext
+    try:
+        if os.path.getmtime(cache_file) < os.path.getmtime(data_file):
+            return None
+        with np.load(cache_file) as npz:
+            id_star, phot = npz['ids'], npz['phot']
+    except (OSError, IOError, KeyError, ValueError, zipfile.BadZipfile):
+        return None
+
+    return id_star, phot
+
+
+def write_cache(data_file, id_star, phot):
+    '''
+    Store the cleaned data as a compact binary file next to the photometry
+    file. Failing to write it (ie: read-only folder) is not an error.
+
+    The file is written under a temporary name (one per process) and then
+    renamed, so an interrupted write never leaves a truncated cache.
+    '''
+    tmp_file = '{}.{}.tmp{}'.format(data_file, os.getpid(), cache_ext)
+    try:
+        with open(tmp_file, 'wb') as f:
+            np.savez(f, ids=id_star, phot=phot)
+        os.rename(tmp_file, data_file + cache_ext)
+    except (OSError, IOError):
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+
+
+def get_data(data_file, use_cache=True):
+    '''
+    Get spatial and photometric data from the cluster's data file.
+
+    The cleaned data is stored in a binary cache file the first time the
+    file is read. Following calls load the cache instead of parsing the
+    text file again, unless the photometry file was modified.
+    '''
+    cache = read_cache(data_file) if use_cache else None
+    if cache is not None:
+        id_star, [x_data, y_data, mag_data, e_mag, col1_data, e_col1] = cache
+        return id_star, x_data, y_data, mag_data, e_mag, col1_data, e_col1
+
+    id_star, x_data, y_data, mag_data, e_mag, col1_data, e_col1 = \
+        read_text(data_file)
+    # n_old = len(id_star)
+
     # If any mag or color value (or their errors) is too large, discard
     # that star.
-    id_star, [x_data, y_data, mag_data, e_mag, col1_data, e_col1] = \
-        rem_bad_stars(id_star, x_data, y_data, mag_data, e_mag, col1_data,
-                      e_col1)
+    id_star, phot = rem_bad_stars(id_star, x_data, y_data, mag_data, e_mag,
+                                  col1_data, e_col1)
+    x_data, y_data, mag_data, e_mag, col1_data, e_col1 = phot
 
     data_names = ['x_coords', 'y_coords', 'magnitudes', 'color']
     try:
@@ -80,7 +150,7 @@ def get_data(data_file):
                 raise ValueError()
             # Check if the range of any photometric column, excluding errors,
             # is none.
-            if min(dat_lst) == max(dat_lst):
+            if dat_lst.min() == dat_lst.max():
                 print ("\n  ERROR: the range defined for the '{}' column\n"
                        "  is zero. Check the input data format."
                        ).format(data_names[i])
@@ -95,4 +165,7 @@ def get_data(data_file):
     #     print ("  WARNING: {:.0f}% of stars in file were"
     #            " rejected.".format(100. * frac_reject))
 
+    if use_cache:
+        write_cache(data_file, id_star, phot)
+
     return id_star, x_data, y_data, mag_data, e_mag, col1_data, e_col1
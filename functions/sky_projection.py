@@ -0,0 +1,112 @@
+
+import os
+import numpy as np
+
+
+# Extension appended to the name of a catalog to store its projected
+# coordinates, and its density grid. Ie: 'bb_cat.dat' --> 'bb_cat.dat_xy.npz'
+proj_ext = '_xy.npz'
+dens_ext = '_dens.npz'
+
+# Region shown by the RA vs DEC maps, in projected coordinates (degrees).
+map_extent = [-4., 25., -2.5, 30.]
+# Bins of the density grid: ~0.1 deg per pixel.
+dens_bins = [290, 325]
+
+# Clouds center (RA, DEC) in degrees.
+c_SMC = [13.1875, -72.82861111]
+c_LMC = [80.2375, -69.47805556]
+
+
+def project(ra, dec):
+    '''
+    Projection used by the RA vs DEC maps: polar coordinates where the angle
+    is the RA and the radius is the distance to the south celestial pole,
+    in degrees. Same as the transform of 'ra_dec_map.curvelinear_grid'.
+    '''
+    ra_rad = np.deg2rad(np.asarray(ra, dtype=float))
+    rad = np.asarray(dec, dtype=float) + 90.
+    return np.column_stack([rad * np.cos(ra_rad), rad * np.sin(ra_rad)])
+
+
+def read_stored(cat_file, ext):
+    '''
+    Arrays stored for the catalog in its file with extension 'ext', if it
+    was written after the catalog was last modified. Return None otherwise.
+    '''
+    stored_file = cat_file + ext
+    try:
+        if os.path.getmtime(stored_file) < os.path.getmtime(cat_file):
+            return None
+        with np.load(stored_file) as npz:
+            return dict((k, npz[k]) for k in npz.files)
+    except (OSError, IOError, ValueError):
+        return None
+
+
+def store(cat_file, ext, **arrays):
+    '''
+    Store the arrays next to the catalog. Failing to write them (ie:
+    read-only folder) is not an error.
+    '''
+    try:
+        with open(cat_file + ext, 'wb') as f:
+            np.savez(f, **arrays)
+    except (OSError, IOError):
+        pass
+
+
+def catalog_projection(coords, cat_file):
+    '''
+    Projected coordinates of the (RA, DEC) positions 'coords' read from
+    'cat_file'. They are stored next to the catalog the first time, and
+    loaded from there while the catalog does not change.
+    '''
+    stored = read_stored(cat_file, proj_ext)
+    if stored is not None and len(stored.get('xy', [])) == len(coords):
+        return stored['xy']
+
+    coords = np.asarray(coords, dtype=float)
+    xy = project(coords[:, 0], coords[:, 1])
+    store(cat_file, proj_ext, xy=xy)
+
+    return xy
+
+
+def density_grid(xy, cat_file, bins=dens_bins, extent=map_extent):
+    '''
+    Number of objects of the catalog in each pixel of the region shown by
+    the maps, from their projected coordinates 'xy'. Rows of the grid are
+    the 'x' bins. Stored next to the catalog, so it is only computed again
+    if the catalog (or the grid) changes.
+    '''
+    stored = read_stored(cat_file, dens_ext)
+    if stored is not None and 'dens' in stored and \
+            stored['n'] == len(xy) and list(stored['bins']) == list(bins) \
+            and np.allclose(stored['extent'], extent):
+        return stored['dens']
+
+    dens = np.histogram2d(xy[:, 0], xy[:, 1], bins=bins,
+                          range=[extent[:2], extent[2:]])[0]
+    store(cat_file, dens_ext, dens=dens, n=len(xy), bins=bins,
+          extent=extent)
+
+    return dens
+
+
+def gnomonic(ra, dec, ra0, dec0):
+    '''
+    Gnomonic (tangent plane) projection of the (RA, DEC) coordinates around
+    the (ra0, dec0) center, in degrees. 'x' grows towards the East (larger
+    RA) and 'y' towards the North.
+    '''
+    ra, dec = np.deg2rad(np.asarray(ra, dtype=float)), \
+        np.deg2rad(np.asarray(dec, dtype=float))
+    ra0, dec0 = np.deg2rad(ra0), np.deg2rad(dec0)
+    cos_c = np.sin(dec0) * np.sin(dec) + np.cos(dec0) * np.cos(dec) * \
+        np.cos(ra - ra0)
+    x = np.cos(dec) * np.sin(ra - ra0) / cos_c
+    y = (np.cos(dec0) * np.sin(dec) - np.sin(dec0) * np.cos(dec) *
+         np.cos(ra - ra0)) / cos_c
+
+    return np.rad2deg(x), np.rad2deg(y)
@@ -0,0 +1,241 @@
+
+from multiprocessing import Pool, cpu_count
+from functions.get_data import get_asteca_data, get_liter_data, \
+    get_bica_database, get_cross_match_asteca, get_cross_match_h03_p12,\
+    get_amr_lit, get_massclean_data
+from functions.amr_kde import get_amr_asteca
+from functions.get_params import params
+from functions.match_clusters import match_clusters
+from functions.marigo_parsec_isochs import mar_par_data
+from functions.instrument import stage, reset, records, merge, \
+    dump_profiles
+
+
+def get_in_params(asteca, cl_list):
+    '''
+    Match clusters repeated in both the ASteCA and the literature datasets.
+    Arrange all parameters in a dictionary.
+    '''
+    as_names, as_pars = asteca
+
+    # Match clusters.
+    with stage('match_clusters', len(as_names)):
+        names_idx = match_clusters(as_names, cl_list)
+    print 'Cluster parameters matched.'
+
+    # Get data parameters arrays.
+    with stage('params', len(as_names)):
+        in_params = params(as_names, as_pars, cl_list, names_idx)
+    print 'Dictionary of parameters obtained.'
+
+    # # Added to print Vizier table data.
+    # # j = 0 for SMC clusters and 1 for LMC.
+    # for j, gal in enumerate(in_params['gal_names']):
+    #     # ASteCA values (k=0) and literature values (k=1)
+    #     for k, cl in enumerate(gal):
+    #         print(cl,
+    #               in_params['rad_pc'][j][k], in_params['erad_pc'][j][k],
+    #               in_params['zarr'][j][0][k], in_params['zsigma'][j][0][k],
+    #               in_params['aarr'][j][0][k], in_params['asigma'][j][0][k],
+    #               in_params['earr'][j][0][k], in_params['esigma'][j][0][k],
+    #               in_params['darr'][j][0][k], in_params['dsigma'][j][0][k],
+    #               in_params['marr'][j][0][k], in_params['msigma'][j][0][k])
+
+    return in_params
+
+
+# Data providers. Each one is defined by the function that obtains its data,
+# the names of the arguments passed to it ('r_path' or other providers), and
+# the message printed once the data is obtained.
+providers = {
+    'asteca': [get_asteca_data, [],
+               'ASteCA data read from .dat output file.'],
+    'lit': [get_liter_data, [], 'Literature data read from .ods file.'],
+    'in_params': [get_in_params, ['asteca', 'lit'],
+                  'ASteCA and literature parameters obtained.'],
+    'bica_coords': [get_bica_database, [], 'Bica et al. (2008) data read.'],
+    'cross_match': [get_cross_match_asteca, ['r_path'],
+                    'Cross-matched ASteCA data read.'],
+    'cross_match_h03_p12': [get_cross_match_h03_p12, ['r_path'],
+                            'Cross-matched H03,P12 data read.'],
+    'amr_lit': [get_amr_lit, [], 'AMR data from literature read.'],
+    'amr_asteca': [get_amr_asteca, ['in_params'],
+                   'ASteCA AMR for both MCs obtained.'],
+    'massclean_data_pars': [get_massclean_data, [], 'MASSCLEAN data read.'],
+    'mar_par': [mar_par_data, [], 'Marigo and PARSEC isochrones read.']
+}
+
+# Providers used by each stage: the 'diffs' text output and every plot.
+stages = {
+    'diffs': ['in_params'],
+    '0': ['in_params', 'bica_coords'],
+    '1': ['in_params'],
+    '2': ['in_params'],
+    '3': ['in_params'],
+    '4': ['in_params'],
+    '5': [],
+    '6': ['in_params', 'cross_match'],
+    '7': ['cross_match'],
+    '8': ['cross_match_h03_p12'],
+    '9': ['cross_match', 'cross_match_h03_p12'],
+    '10': [],
+    '11': ['in_params'],
+    '12': ['in_params', 'amr_lit', 'amr_asteca'],
+    '13': ['massclean_data_pars'],
+    '14': ['mar_par'],
+    '15': ['in_params'],
+    '16': ['in_params'],
+    '17': ['in_params'],
+    '18': ['in_params'],
+    '19': ['in_params'],
+    '20': [],
+    '21': ['in_params'],
+    '22': ['in_params']
+}
+
+# Files read by each provider. A folder stands for every file inside it.
+inputs = {
+    'asteca': ['asteca_output_final.dat'],
+    'lit': ['lit_OCs_data.ods'],
+    'bica_coords': ['databases/bb_cat.dat'],
+    'cross_match': ['databases/matched_clusters.dat'],
+    'cross_match_h03_p12': ['databases/matched_H03_P12.dat'],
+    'amr_lit': ['AMRs/'],
+    'massclean_data_pars': ['OCs_data/asteca_output_massclean_smc.dat',
+                            'OCs_data/asteca_output_massclean_lmc.dat'],
+    'mar_par': ['functions/mar2008_ubvrijhk/', 'functions/parsec11_ubvrijhk/']
+}
+
+# Files read directly by the CMD plots, which obtain their own data.
+cmd_inputs = ['asteca_output_final.dat', 'databases/matched_clusters.dat',
+              'OCs_data/MC_all/', 'OCs_data/parsec11_washington/', 'runs/',
+              'functions/0.004_girardi.dat', 'functions/0.004_marigo.dat',
+              'functions/0.008_girardi.dat', 'functions/0.008_marigo.dat']
+stage_inputs = {'4': cmd_inputs, '5': cmd_inputs, '10': cmd_inputs,
+                '20': cmd_inputs}
+
+# Figures created by each plot (glob patterns).
+outputs = {
+    '0': ['figures/as_RA_DEC.png'],
+    '1': ['figures/errors_asteca.png'],
+    '2': ['figures/as_vs_lit_S-LMC.png'],
+    '3': ['figures/as_vs_lit_mass.png'],
+    '4': ['figures/outliers_VS_asteca_*.png'],
+    '5': ['figures/DB_fit/*_VS_asteca_*.png'],
+    '6': ['figures/cross_match_if.png'],
+    '7': ['figures/cross_match_ip_ages.png',
+          'figures/cross_match_ip_mass.png'],
+    '8': ['figures/H03_P12_mass.png'],
+    '9': ['figures/age_mass_corr.png'],
+    '10': ['figures/largemass_VS_asteca_*.png'],
+    '11': ['figures/as_kde_maps0.png', 'figures/as_kde_maps1.png'],
+    '12': ['figures/AMR_*.png'],
+    '13': ['figures/massclean_z.png', 'figures/massclean_mass.png'],
+    '14': ['figures/mar_vs_par_isochs.png'],
+    '15': ['figures/as_rad_vs_params_*.png'],
+    '16': ['figures/as_vs_lit_extin.png'],
+    '17': ['figures/as_integ_colors.png'],
+    '18': ['figures/concent_param.png'],
+    '19': ['figures/as_prob_vs_CI.png'],
+    '20': ['figures/largemet_VS_asteca_*.png'],
+    '21': ['figures/as_param_maps.png', 'figures/as_param_maps_err.png'],
+    '22': ['figures/as_radial_gradients.png']
+}
+
+# Every stage, in the order they are run by default.
+all_stages = ['diffs'] + sorted([_ for _ in stages if _ != 'diffs'], key=int)
+
+
+def deps(prov):
+    '''
+    Providers that 'prov' takes as arguments.
+    '''
+    return [_ for _ in providers[prov][1] if _ != 'r_path']
+
+
+def required(sel_stages):
+    '''
+    Providers needed by the selected stages, including the providers these
+    depend on.
+    '''
+    req, pending = set(), [p for st in sel_stages for p in stages[st]]
+    while pending:
+        prov = pending.pop()
+        if prov not in req:
+            req.add(prov)
+            pending += deps(prov)
+
+    return req
+
+
+def stage_files(st):
+    '''
+    Input files of a stage: those read by the providers it needs, and by the
+    stage itself.
+    '''
+    files = set(stage_inputs.get(st, []))
+    for prov in required([st]):
+        files.update(inputs.get(prov, []))
+
+    return sorted(files)
+
+
+def run_provider(prov, args):
+    '''
+    Obtain the data for a single provider.
+    '''
+    with stage('provider:' + prov) as rec:
+        data = providers[prov][0](*args)
+        rec['items'] = len(data) if hasattr(data, '__len__') else None
+    print providers[prov][2]
+    return data
+
+
+def provider_task(prov, args):
+    '''
+    Obtain the data for a single provider in a worker process. Return also
+    the records of its stages.
+    '''
+    reset()
+    data = run_provider(prov, args)
+    dump_profiles()
+    return data, list(records)
+
+
+def load_data(r_path, req, n_jobs=1, data=None):
+    '''
+    Obtain the data for all the 'req' providers that are not already stored
+    in 'data'.
+
+    Providers are run in levels: all the providers whose dependencies are
+    already obtained are run together, with a pool of 'n_jobs' processes if
+    'n_jobs' is larger than 1 ('None' uses all the available cores).
+    '''
+    data = {} if data is None else data
+    data['r_path'] = r_path
+    n_jobs = cpu_count() if n_jobs is None else n_jobs
+
+    pending = set(req) - set(data)
+    pool = Pool(n_jobs) if n_jobs > 1 and len(pending) > 1 else None
+    try:
+        while pending:
+            ready = sorted([_ for _ in pending if
+                            all(d in data for d in deps(_))])
+            args = [[data[a] for a in providers[_][1]] for _ in ready]
+            if pool is not None and len(ready) > 1:
+                results = [pool.apply_async(provider_task, _) for _ in
+                           zip(ready, args)]
+                results = [_.get() for _ in results]
+                for res in results:
+                    merge(res[1])
+                results = [_[0] for _ in results]
+            else:
+                results = [run_provider(*_) for _ in zip(ready, args)]
+            for prov, res in zip(ready, results):
+                data[prov] = res
+            pending -= set(ready)
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    return data
@@ -0,0 +1,441 @@
+
+import numpy as np
+import pyexcel_ods as pe
+from functions.get_data import skip_comments
+from functions.get_params import z_to_feh
+from functions.kde_map import kde_grid_sum
+
+
+# Default number of rows per batch.
+batch_size = 10000
+
+# Value given to the entries that can not be converted into a float, as done
+# by 'float_str'.
+bad_val = -9999999999.9
+
+
+def float_rows(rows):
+    '''
+    Convert a batch of rows of strings into a 2D float array. Values that can
+    not be converted are replaced by 'bad_val'.
+    '''
+    try:
+        return np.array(rows, dtype=float)
+    except ValueError:
+        out = np.empty((len(rows), len(rows[0])))
+        for i, row in enumerate(rows):
+            for j, v in enumerate(row):
+                try:
+                    out[i, j] = float(v)
+                except ValueError:
+                    out[i, j] = bad_val
+        return out
+
+
+def read_batches(in_file, n_str=0, size=batch_size):
+    '''
+    Read a whitespace separated data file in batches of 'size' rows. For each
+    batch yield the first 'n_str' columns as an array of strings, and the
+    rest as an array of floats. Only one batch is held in memory.
+    '''
+    with open(in_file) as f:
+        strs, rows = [], []
+        for line in skip_comments(f):
+            lin = line.split()
+            if not lin:
+                continue
+            strs.append(lin[:n_str])
+            rows.append(lin[n_str:])
+            if len(rows) == size:
+                yield np.array(strs, dtype=str), float_rows(rows)
+                strs, rows = [], []
+        if rows:
+            yield np.array(strs, dtype=str), float_rows(rows)
+
+
+def asteca_batches(size=batch_size):
+    '''
+    ASteCA output in batches: names and parameters (same columns as the
+    'as_pars' lists of 'get_asteca_data').
+    '''
+    for names, pars in read_batches('asteca_output_final.dat', 1, size):
+        yield names[:, 0], pars
+
+
+def bica_batches(size=batch_size):
+    '''
+    RA, DEC of the Bica et al. (2008) catalog in batches.
+    '''
+    for _, coords in read_batches('databases/bb_cat.dat', 0, size):
+        yield coords
+
+
+def cross_match_batches(r_path, size=batch_size):
+    '''
+    Clusters cross-matched between ASteCA and the databases, in batches:
+    database, galaxy and name of each cluster, and the rest of the columns
+    of 'matched_clusters.dat' as floats.
+    '''
+    in_file = r_path + 'mc-catalog/databases/matched_clusters.dat'
+    for strs, vals in read_batches(in_file, 3, size):
+        yield strs[:, 0], strs[:, 1], strs[:, 2], vals
+
+
+def massclean_batches(size=batch_size):
+    '''
+    ASteCA output for the MASSCLEAN clusters in batches, for the SMC (k=0)
+    and the LMC (k=1) files: real metallicity, age and mass of each cluster
+    (decoded from its name, as in 'get_massclean_data') and its ASteCA
+    parameters.
+    '''
+    mc_files = ['OCs_data/asteca_output_massclean_smc.dat',
+                'OCs_data/asteca_output_massclean_lmc.dat']
+    for k, mc_f in enumerate(mc_files):
+        for names, pars in read_batches(mc_f, 1, size):
+            mc_data = []
+            for name in names[:, 0]:
+                mma = name.replace('/', '_').split('_')
+                mass = float(mma[0]) * 1000. if mma[0] != '0005' else 500.
+                mc_data.append([float('0.' + mma[2][1:]),
+                                float(mma[3]) * 0.01, mass])
+            yield k, np.array(mc_data), pars
+
+
+def lit_index():
+    '''
+    Literature values needed for each cluster, indexed by name: galaxy
+    (0 for the SMC, 1 for the LMC), [Fe/H], log(age), E(B-V), distance
+    modulus and mass. The literature table is small compared to the catalog
+    it describes, so it is read entirely.
+    '''
+    cl_dict = pe.get_data('lit_OCs_data.ods')["S-LMC"]
+    idx = [cl_dict[0].index(_) for _ in [
+        u'Name', u'Galaxia', u'[Fe/H] (dex)', u'log(age)', u'E(B-V) (lit)',
+        u'(m-M)o (mag)', u'Mass']]
+    lit = {}
+    for cl in cl_dict[1:]:
+        if cl:
+            vals = []
+            for i in idx[2:]:
+                try:
+                    vals.append(float(cl[i]))
+                except (ValueError, TypeError):
+                    vals.append(bad_val)
+            lit[str(cl[idx[0]])] = [0 if cl[idx[1]] == 'SMC' else 1] + vals
+
+    return lit
+
+
+def new_moments():
+    '''
+    Accumulator of the number of values, mean and sum of squared deviations
+    from the mean.
+    '''
+    return {'n': 0, 'mean': 0., 'm2': 0.}
+
+
+def add_moments(acc, x):
+    '''
+    Add a batch of values to a moments accumulator, combining the batch
+    statistics with those accumulated (Chan et al. 1979), which is stable
+    for any number of values.
+    '''
+    x = np.asarray(x, dtype=float)
+    if not x.size:
+        return
+    n_b, mean_b = x.size, x.mean()
+    m2_b = ((x - mean_b) ** 2).sum()
+    n = acc['n'] + n_b
+    delta = mean_b - acc['mean']
+    acc['mean'] += delta * n_b / n
+    acc['m2'] += m2_b + delta ** 2 * acc['n'] * n_b / n
+    acc['n'] = n
+
+
+def moments(acc):
+    '''
+    Number of values, mean and standard deviation (as 'np.std') of a moments
+    accumulator.
+    '''
+    if not acc['n']:
+        return 0, np.nan, np.nan
+    return acc['n'], acc['mean'], np.sqrt(acc['m2'] / acc['n'])
+
+
+def new_ccc():
+    '''
+    Accumulator of the means, sums of squared deviations and sum of
+    co-deviations of two paired samples.
+    '''
+    return {'n': 0, 'mx': 0., 'my': 0., 'sxx': 0., 'syy': 0., 'sxy': 0.}
+
+
+def add_ccc(acc, x, y):
+    '''
+    Add a batch of paired values to a CCC accumulator.
+    '''
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    if not x.size:
+        return
+    n_b, mx_b, my_b = x.size, x.mean(), y.mean()
+    n = acc['n'] + n_b
+    dx, dy = mx_b - acc['mx'], my_b - acc['my']
+    f = float(acc['n']) * n_b / n
+    acc['sxx'] += ((x - mx_b) ** 2).sum() + dx ** 2 * f
+    acc['syy'] += ((y - my_b) ** 2).sum() + dy ** 2 * f
+    acc['sxy'] += ((x - mx_b) * (y - my_b)).sum() + dx * dy * f
+    acc['mx'] += dx * n_b / n
+    acc['my'] += dy * n_b / n
+    acc['n'] = n
+
+
+def ccc_value(acc):
+    '''
+    Concordance correlation coefficient of a CCC accumulator, with the same
+    definition used by 'ccc' in 'check_diffs.py' (sample covariance,
+    population variances).
+    '''
+    n = acc['n']
+    if n < 2:
+        return np.nan
+    return 2 * (acc['sxy'] / (n - 1)) / (
+        acc['sxx'] / n + acc['syy'] / n + (acc['mx'] - acc['my']) ** 2)
+
+
+def pearson_value(acc):
+    '''
+    Pearson correlation coefficient of a CCC accumulator.
+    '''
+    if acc['n'] < 2:
+        return np.nan
+    return acc['sxy'] / np.sqrt(acc['sxx'] * acc['syy'])
+
+
+def new_hist(edges):
+    '''
+    Accumulator of the counts of a histogram with fixed bin 'edges'.
+    '''
+    return {'edges': np.asarray(edges, dtype=float),
+            'counts': np.zeros(len(edges) - 1, dtype=int)}
+
+
+def add_hist(acc, x):
+    '''
+    Add a batch of values to a histogram accumulator. Values out of the
+    edges are not counted.
+    '''
+    acc['counts'] += np.histogram(x, acc['edges'])[0]
+
+
+def new_hist2d(x_edges, y_edges):
+    '''
+    Accumulator of the counts of a 2D histogram with fixed bin edges.
+    '''
+    return {'edges': [np.asarray(x_edges, dtype=float),
+                      np.asarray(y_edges, dtype=float)],
+            'counts': np.zeros((len(x_edges) - 1, len(y_edges) - 1),
+                               dtype=int)}
+
+
+def add_hist2d(acc, x, y):
+    '''
+    Add a batch of x,y values to a 2D histogram accumulator.
+    '''
+    acc['counts'] += np.histogram2d(x, y, acc['edges'])[0].astype(int)
+
+
+def new_kde(ext, grid_dens):
+    '''
+    Accumulator of the 2D KDE in the grid defined by 'ext' and 'grid_dens',
+    as in 'kde_2d'.
+    '''
+    return {'ext': ext, 'grid_dens': grid_dens, 'n': 0,
+            'sum': np.zeros((grid_dens, grid_dens))}
+
+
+def add_kde(acc, xarr, xsigma, yarr, ysigma):
+    '''
+    Add the kernels of a batch of x,y points to a KDE accumulator.
+    '''
+    acc['sum'] += kde_grid_sum(xarr, xsigma, yarr, ysigma, acc['ext'],
+                               acc['grid_dens'])
+    acc['n'] += len(xarr)
+
+
+def kde_map(acc):
+    '''
+    2D KDE of a KDE accumulator, normalized and oriented as by 'kde_2d'.
+    '''
+    return np.rot90(acc['sum'] / (2 * np.pi * max(acc['n'], 1)))
+
+
+def stream_params(size=batch_size):
+    '''
+    Summary statistics of the ASteCA parameters of each galaxy, and of their
+    differences with the literature values, accumulated reading the ASteCA
+    output in batches of 'size' clusters. Peak memory depends on 'size', not
+    on the number of clusters in the catalog.
+
+    Returns, for the SMC and the LMC: the moments of the ASteCA [Fe/H],
+    log(age), E(B-V), distance modulus and mass, and of the ASteCA minus
+    literature differences; the CCC accumulators of [Fe/H] and log(age);
+    histograms of the ASteCA [Fe/H] and log(age); and the age-metallicity
+    KDE map.
+    '''
+    # Indexes of columns in ASteCA output file (as in 'params').
+    a_zi, a_zei, a_ai, a_aei, a_ei, a_di, a_mi = 19, 20, 21, 22, 23, 25, 27
+    p_names = ['feh', 'age', 'ext', 'dm', 'mass']
+    lit = lit_index()
+
+    gal_sums = []
+    for j in [0, 1]:
+        gal_sums.append({
+            'n_cls': 0,
+            'asteca': dict((_, new_moments()) for _ in p_names),
+            'delta': dict((_, new_moments()) for _ in p_names),
+            'ccc': {'feh': new_ccc(), 'age': new_ccc()},
+            'hist': {'feh': new_hist(np.arange(-2.5, 0.51, 0.1)),
+                     'age': new_hist(np.arange(6., 10.31, 0.1))},
+            'kde': new_kde([6., 10.3, -2.5, 0.5], 50)})
+
+    for names, pars in asteca_batches(size):
+        # Literature values of each cluster in this batch.
+        lit_b = [lit.get(_) for _ in names]
+        found = np.array([_ is not None for _ in lit_b])
+        if not found.all():
+            print 'WARNING: {} clusters not found in ods file.'.format(
+                (~found).sum())
+        pars = pars[found]
+        lit_b = np.array([_ for _ in lit_b if _ is not None]).reshape(-1, 6)
+
+        # Per-cluster derived quantities: z to [Fe/H].
+        fe_h, e_fe_h = np.array(
+            [z_to_feh(z, ez) for z, ez in pars[:, [a_zi, a_zei]]]).reshape(
+                -1, 2).T
+        as_vals = [fe_h, pars[:, a_ai], pars[:, a_ei], pars[:, a_di],
+                   pars[:, a_mi]]
+
+        for j in [0, 1]:
+            msk = lit_b[:, 0] == j
+            gs = gal_sums[j]
+            gs['n_cls'] += msk.sum()
+            # Same sample as the differences of 'check_diffs': Piatti (2011)
+            # clusters, which only have ages assigned, are filtered out.
+            not_p11 = np.abs(lit_b[msk, 1]) < 30000.
+            for k, p in enumerate(p_names):
+                add_moments(gs['asteca'][p], as_vals[k][msk])
+                l_v = lit_b[msk, k + 1]
+                # Mass differences, only for clusters with a literature mass.
+                has_lit = np.abs(l_v) < 10000. if p == 'mass' else not_p11
+                add_moments(gs['delta'][p],
+                            as_vals[k][msk][has_lit] - l_v[has_lit])
+            l_z = lit_b[msk, 1]
+            has_z = np.abs(l_z) < 10000.
+            add_ccc(gs['ccc']['feh'], fe_h[msk][has_z], l_z[has_z])
+            add_ccc(gs['ccc']['age'], pars[msk, a_ai], lit_b[msk, 2])
+            add_hist(gs['hist']['feh'], fe_h[msk])
+            add_hist(gs['hist']['age'], pars[msk, a_ai])
+            add_kde(gs['kde'], pars[msk, a_ai], pars[msk, a_aei], fe_h[msk],
+                    e_fe_h[msk])
+
+    return gal_sums
+
+
+def stream_cross_match(r_path, size=batch_size):
+    '''
+    CCC and moments of the differences between the ages of each database
+    and the ASteCA ages, for the clusters in 'matched_clusters.dat', read in
+    batches.
+    '''
+    db_sums = {}
+    for dbs, gals, names, vals in cross_match_batches(r_path, size):
+        for db in np.unique(dbs):
+            msk = dbs == db
+            ds = db_sums.setdefault(db, {'ccc': new_ccc(),
+                                         'delta': new_moments()})
+            # Columns: log(age)_DB and log(age)_asteca.
+            add_ccc(ds['ccc'], vals[msk, 0], vals[msk, 2])
+            add_moments(ds['delta'], vals[msk, 2] - vals[msk, 0])
+
+    return db_sums
+
+
+def stream_bica(size=batch_size):
+    '''
+    Number of clusters of the Bica et al. (2008) catalog in each 1x1 degree
+    (RA, DEC) cell, read in batches.
+    '''
+    acc = new_hist2d(np.arange(0., 361., 1.), np.arange(-90., 91., 1.))
+    for coords in bica_batches(size):
+        add_hist2d(acc, coords[:, 0], coords[:, 1])
+
+    return acc
+
+
+def stream_massclean(size=batch_size):
+    '''
+    Moments of the ASteCA minus real values of the metallicity (z) and
+    log(age) of the MASSCLEAN clusters, for each galaxy, read in batches.
+    '''
+    mc_sums = [{'z': new_moments(), 'age': new_moments()} for _ in [0, 1]]
+    for k, mc_data, pars in massclean_batches(size):
+        add_moments(mc_sums[k]['z'], pars[:, 19] - mc_data[:, 0])
+        add_moments(mc_sums[k]['age'], pars[:, 21] - mc_data[:, 1])
+
+    return mc_sums
+
+
+def print_stream_params(gal_sums):
+    '''
+    Print the statistics accumulated by 'stream_params'.
+    '''
+    p_names = [['feh', '[Fe/H]'], ['age', 'log(age)'], ['ext', 'E(B-V)'],
+               ['dm', 'dm'], ['mass', 'Mass']]
+    for j, gal in enumerate(['SMC', 'LMC']):
+        gs = gal_sums[j]
+        print '\n*** {} ({} clusters) ***\n'.format(gal, gs['n_cls'])
+        for p, name in p_names:
+            n, mean, std = moments(gs['asteca'][p])
+            print 'ASteCA {} mean+-std: {:.3f} +- {:.3f}'.format(
+                name, mean, std)
+            n, mean, std = moments(gs['delta'][p])
+            print 'Delta {}/{} mean+-std: {:.3f} +- {:.3f} ({} clusters)'.\
+                format(gal, name, mean, std, n)
+        for p, name in p_names[:2]:
+            print '{} vals CCC: {:.3f}, PCC: {:.3f}'.format(
+                name, ccc_value(gs['ccc'][p]), pearson_value(gs['ccc'][p]))
+        for p, name in p_names[:2]:
+            h = gs['hist'][p]
+            print '{} histogram peak: {:.2f}'.format(
+                name, h['edges'][np.argmax(h['counts'])])
+        z = kde_map(gs['kde'])
+        # Row 0 of the rotated map is the largest [Fe/H] of the grid.
+        i, k = np.unravel_index(np.argmax(z), z.shape)
+        ext, gd = gs['kde']['ext'], gs['kde']['grid_dens']
+        print 'Age-metallicity KDE peak: log(age)={:.2f}, [Fe/H]={:.2f}'.\
+            format(np.linspace(ext[0], ext[1], gd)[k],
+                   np.linspace(ext[2], ext[3], gd)[::-1][i])
+
+
+def print_stream_dbs(db_sums, mc_sums, bica):
+    '''
+    Print the statistics accumulated by 'stream_cross_match',
+    'stream_massclean' and 'stream_bica'.
+    '''
+    i, k = np.unravel_index(np.argmax(bica['counts']), bica['counts'].shape)
+    print '\nBica et al. (2008): {} clusters, densest cell RA={:.0f}, ' \
+        'DEC={:.0f} ({} clusters)'.format(
+            bica['counts'].sum(), bica['edges'][0][i], bica['edges'][1][k],
+            bica['counts'][i, k])
+    print '\n*** Databases ***\n'
+    for db in sorted(db_sums):
+        n, mean, std = moments(db_sums[db]['delta'])
+        print '{}: {} clusters, age CCC: {:.3f}, Delta log(age) mean+-std: ' \
+            '{:.3f} +- {:.3f}'.format(db, n, ccc_value(db_sums[db]['ccc']),
+                                      mean, std)
+    print '\n*** MASSCLEAN ***\n'
+    for k, gal in enumerate(['SMC', 'LMC']):
+        for p, name in [['z', 'z'], ['age', 'log(age)']]:
+            n, mean, std = moments(mc_sums[k][p])
+            print '{} Delta {} mean+-std: {:.4f} +- {:.4f} ({} clusters)'.\
+                format(gal, name, mean, std, n)
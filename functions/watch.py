@@ -0,0 +1,111 @@
+
+import os
+import time
+from functions.stages import providers, inputs, stage_files, deps
+from functions.incremental import expand
+
+
+def snapshot(files):
+    '''
+    Size and modification time of each file. Missing files are stored as
+    None.
+    '''
+    snap = {}
+    for path in files:
+        try:
+            st = os.stat(path)
+            snap[path] = (st.st_size, st.st_mtime)
+        except OSError:
+            snap[path] = None
+
+    return snap
+
+
+def changed_files(old, new):
+    '''
+    Files that were modified, created or removed between two snapshots.
+    '''
+    return sorted(_ for _ in set(old) | set(new) if old.get(_) != new.get(_))
+
+
+def reads(entries, changed):
+    '''
+    True if any of the 'changed' files is one of the 'entries', or is inside
+    one of the folders (entries ending in '/'). The paths are compared
+    as given, so files that were removed are also matched.
+    '''
+    for path in changed:
+        for entry in entries:
+            if path == entry or (entry.endswith('/') and
+                                 path.startswith(entry)):
+                return True
+    return False
+
+
+def affected_providers(changed):
+    '''
+    Providers that read any of the 'changed' files, and the providers that
+    depend on them.
+    '''
+    affected = set(p for p in inputs if reads(inputs[p], changed))
+    added = True
+    while added:
+        added = set(p for p in providers if p not in affected and
+                    affected & set(deps(p)))
+        affected |= added
+
+    return affected
+
+
+def affected_stages(sel_stages, changed):
+    '''
+    Stages in 'sel_stages' that read any of the 'changed' files, directly or
+    through their providers.
+    '''
+    return [_ for _ in sel_stages if reads(stage_files(_), changed)]
+
+
+def watch(sel_stages, data, run, interval=1.):
+    '''
+    Poll the input files of the selected stages every 'interval' seconds.
+    When any of them changes, drop from 'data' the providers affected, and
+    call 'run' with the stages downstream of the changed files. The rest of
+    the data is kept in memory.
+
+    Changes to the code are not followed: restart the script for those.
+    Stop with Ctrl+C.
+    '''
+    files = sorted(set(f for st in sel_stages for f in stage_files(st)))
+    # Folders can gain or lose files, so they are expanded on each poll.
+    old = snapshot(expand(files))
+    print '\nWatching {} files for changes (Ctrl+C to stop).'.format(len(old))
+
+    try:
+        while True:
+            time.sleep(interval)
+            new = snapshot(expand(files))
+            changed = changed_files(old, new)
+            if not changed:
+                continue
+
+            # Wait until the files are no longer being written.
+            while True:
+                time.sleep(interval)
+                last = snapshot(expand(files))
+                if last == new:
+                    break
+                new = last
+            changed = changed_files(old, new)
+            old = new
+
+            print '\nChanged: {}'.format(', '.join(changed))
+            for prov in affected_providers(changed):
+                data.pop(prov, None)
+            run_st = affected_stages(sel_stages, changed)
+            if run_st:
+                print 'Running stages: {}'.format(', '.join(run_st))
+                s = time.time()
+                run(run_st)
+                print 'Done in {:.1f} s'.format(time.time() - s)
+    except KeyboardInterrupt:
+        print '\nStopped watching.'
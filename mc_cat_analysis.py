@@ -1,22 +1,17 @@
 
 import os
-from functions.get_data import get_asteca_data, get_liter_data, \
-    get_bica_database, get_cross_match_asteca, get_cross_match_h03_p12,\
-    get_amr_lit, get_massclean_data
-from functions.amr_kde import get_amr_asteca
-from functions.get_params import params
-from functions.match_clusters import match_clusters
+import time
+import resource
+import argparse
+from multiprocessing import Pool, cpu_count
+from functions.stages import stages, all_stages, required, load_data
+from functions.incremental import load_manifest, save_manifest, \
+    fingerprint, is_stale, record
+from functions.watch import watch
+from functions.instrument import stage, reset, records, merge, \
+    dump_profiles, write_report
 from functions.check_diffs import check_diffs
 from functions.DBs_CMD import get_DBs_ASteCA_CMD_data
-from functions.marigo_parsec_isochs import mar_par_data
-from functions.make_all_plots import make_as_vs_lit_plot,\
-    make_as_vs_lit_mass_plot, make_kde_plots, \
-    make_ra_dec_plots, make_lit_ext_plot, make_int_cols_plot, \
-    make_concent_plot, make_radius_plot, make_probs_CI_plot, \
-    make_cross_match_ip_age, make_cross_match_ip_mass, make_cross_match_if, \
-    make_DB_ASteCA_CMDs, make_errors_plots, make_amr_plot,\
-    make_cross_match_h03_p12, make_age_mass_corr, make_massclean_z_plot,\
-    make_massclean_mass_plot, mar_par_plot
 
 
 def rpath_fig_folder():
@@ -45,233 +40,400 @@ def rpath_fig_folder():
     return r_path
 
 
-def get_in_params(r_path):
-    """
-    Obtain data from ASteCA's output and from the literature.
-    Match clusters repeated in both datasets.
-    Arrange all parameters in a dictionary.
-    """
-    # Read data from ASteca output file.
-    as_names, as_pars = get_asteca_data()
-    print 'ASteCA data read from .dat output file.'
-
-    # Read literature data.
-    cl_list = get_liter_data()
-    print 'Literature data read from .ods file.'
-
-    # Match clusters.
-    names_idx = match_clusters(as_names, cl_list)
-    print 'Cluster parameters matched.'
-
-    # Get data parameters arrays.
-    in_params = params(r_path, as_names, as_pars, cl_list, names_idx)
-    print 'Dictionary of parameters obtained.'
-
-    # # Added to print Vizier table data.
-    # # j = 0 for SMC clusters and 1 for LMC.
-    # for j, gal in enumerate(in_params['gal_names']):
-    #     # ASteCA values (k=0) and literature values (k=1)
-    #     for k, cl in enumerate(gal):
-    #         print(cl,
-    #               in_params['rad_pc'][j][k], in_params['erad_pc'][j][k],
-    #               in_params['zarr'][j][0][k], in_params['zsigma'][j][0][k],
-    #               in_params['aarr'][j][0][k], in_params['asigma'][j][0][k],
-    #               in_params['earr'][j][0][k], in_params['esigma'][j][0][k],
-    #               in_params['darr'][j][0][k], in_params['dsigma'][j][0][k],
-    #               in_params['marr'][j][0][k], in_params['msigma'][j][0][k])
-
-    return in_params
-
-
-def CMD_DBs_vs_asteca(r_path):
+def CMD_DBs_vs_asteca(r_path, n_jobs=1):
     """
     CMDs of clusters matched between these two databases and
     the values given  by ASteCA.
+
+    The data for each cluster is obtained with 'n_jobs' processes ('None'
+    uses all the available cores), same for the functions below.
     """
+    from functions.make_all_plots import make_DB_ASteCA_CMDs
     print 'Generating CMDs of DBs for matched clusters with ASteCA.'
     for db in ['P99', 'P00', 'C06', 'G10']:
-        db_cls = get_DBs_ASteCA_CMD_data(r_path, db, [])
+        db_cls = get_DBs_ASteCA_CMD_data(r_path, db, [], n_jobs)
         if db_cls:
             make_DB_ASteCA_CMDs(db, db_cls)
 
 
-def CMD_outliers(r_path, in_params):
+def CMD_outliers(r_path, in_params, n_jobs=1):
     """
     CMDs of outlier clusters, ie: those with large age differences between
     literature values and the values given  by ASteCA.
     """
+    from functions.make_all_plots import make_DB_ASteCA_CMDs
     print 'Generating CMDs of outliers.'
-    db_cls = get_DBs_ASteCA_CMD_data(r_path, 'outliers', in_params)
+    db_cls = get_DBs_ASteCA_CMD_data(r_path, 'outliers', in_params,
+                                     n_jobs)
     if db_cls:
         make_DB_ASteCA_CMDs('outliers', db_cls)
 
 
-def CMD_large_mass(r_path, in_params):
+def CMD_large_mass(r_path, in_params, n_jobs=1):
     """
     CMDs of clusters with large masses in DBs that are not found by ASteCA.
     """
+    from functions.make_all_plots import make_DB_ASteCA_CMDs
     print 'Generating CMDs of large-mass OCs.'
-    db_cls = get_DBs_ASteCA_CMD_data(r_path, 'largemass', in_params)
+    db_cls = get_DBs_ASteCA_CMD_data(r_path, 'largemass', in_params,
+                                     n_jobs)
     if db_cls:
         make_DB_ASteCA_CMDs('largemass', db_cls)
 
 
-def CMD_LMC_large_met(r_path, in_params):
+def CMD_LMC_large_met(r_path, in_params, n_jobs=1):
     """
     CMDs of clusters with large metallicities and ages in the LMC.
     """
+    from functions.make_all_plots import make_DB_ASteCA_CMDs
     print 'Generating CMDs of large [Fe/H] and age for the LMC.'
-    db_cls = get_DBs_ASteCA_CMD_data(r_path, 'largemet', in_params)
+    db_cls = get_DBs_ASteCA_CMD_data(r_path, 'largemet', in_params,
+                                     n_jobs)
     if db_cls:
         make_DB_ASteCA_CMDs('largemet', db_cls)
 
 
-def make_plots(r_path, plots, in_params, bica_coords, cross_match,
-               cross_match_h03_p12, amr_lit, amr_asteca, massclean_data_pars,
-               mar_data, par_data):
+def make_plot(r_path, pl, data, n_jobs=1):
     '''
-    Make each plot sequentially.
+    Make a single plot. 'data' is a dictionary with all the data read for
+    the selected plots.
     '''
-
-    if '0' in plots:
+    # The plotting functions (and matplotlib, scipy, astroML) are only
+    # imported once a plot is made.
+    from functions.make_all_plots import make_as_vs_lit_plot,\
+        make_as_vs_lit_mass_plot, make_kde_plots, \
+        make_ra_dec_plots, make_lit_ext_plot, make_int_cols_plot, \
+        make_concent_plot, make_radius_plot, make_probs_CI_plot, \
+        make_cross_match_ip_age, make_cross_match_ip_mass, \
+        make_cross_match_if, make_errors_plots, make_amr_plot,\
+        make_cross_match_h03_p12, make_age_mass_corr, make_massclean_z_plot,\
+        make_massclean_mass_plot, mar_par_plot, make_param_maps_plot, \
+        make_radial_plot
+
+    in_params, bica_coords, cross_match, cross_match_h03_p12, amr_lit,\
+        amr_asteca, massclean_data_pars = [
+            data.get(_, []) for _ in [
+                'in_params', 'bica_coords', 'cross_match',
+                'cross_match_h03_p12', 'amr_lit', 'amr_asteca',
+                'massclean_data_pars']]
+    mar_data, par_data = data.get('mar_par', [[], []])
+
+    if pl == '0':
         print 'RA vs DEC plots.'
         make_ra_dec_plots(in_params, bica_coords)
-
-    if '1' in plots:
+    elif pl == '1':
         print '\nErrors plots.'
         make_errors_plots(in_params)
-
-    if '2' in plots:
+    elif pl == '2':
         print '\nASteCA vs literature plots.'
         make_as_vs_lit_plot(in_params)
-
-    if '3' in plots:
+    elif pl == '3':
         print '\nASteCA vs literature mass plot.'
         make_as_vs_lit_mass_plot(in_params)
-
-    if '4' in plots:
+    elif pl == '4':
         print "\nCMDs for outlier clusters."
-        CMD_outliers(r_path, in_params)
-
-    if '5' in plots:
+        CMD_outliers(r_path, in_params, n_jobs)
+    elif pl == '5':
         print "\nCMDs for matched clusters between DBs and ASteCA clusters."
-        CMD_DBs_vs_asteca(r_path)
-
-    if '6' in plots:
+        CMD_DBs_vs_asteca(r_path, n_jobs)
+    elif pl == '6':
         print '\nCross-matched isochrone fitting clusters.'
         make_cross_match_if(cross_match, in_params)
-
-    if '7' in plots:
+    elif pl == '7':
         print '\nCross-matched integrated photometry clusters, ages.'
         make_cross_match_ip_age(cross_match)
         print '\nCross-matched integrated photometry clusters, masses.'
         make_cross_match_ip_mass(cross_match)
-
-    if '8' in plots:
+    elif pl == '8':
         print "\nCross match BA plot for H03 vs P12."
         make_cross_match_h03_p12(cross_match_h03_p12)
-
-    if '9' in plots:
+    elif pl == '9':
         print "\nAge vs mass delta plots for ASteCA, P12, H03."
         make_age_mass_corr(cross_match, cross_match_h03_p12)
-
-    if '10' in plots:
+    elif pl == '10':
         print "\nCMDs for large mass clusters."
-        CMD_large_mass(r_path, in_params)
-
-    if '11' in plots:
+        CMD_large_mass(r_path, in_params, n_jobs)
+    elif pl == '11':
         print '\nKDE maps.'
         make_kde_plots(in_params)
-
-    if '12' in plots:
+    elif pl == '12':
         print '\nAMR maps.'
         make_amr_plot(in_params, amr_lit, amr_asteca)
-
-    if '13' in plots:
+    elif pl == '13':
         print '\nMASSCLEAN z plot.'
         make_massclean_z_plot(massclean_data_pars)
         print '\nMASSCLEAN mass plot.'
         make_massclean_mass_plot(massclean_data_pars)
-
-    if '14' in plots:
+    elif pl == '14':
         print '\nMarigo vs PARSEC plot.'
         mar_par_plot(mar_data, par_data)
-
-    if '15' in plots:
+    elif pl == '15':
         print '\nASteCA radius (pc) vs parameters plot.'
         make_radius_plot(in_params)
-
-    if '16' in plots:
+    elif pl == '16':
         print '\nASteCA vs MCEV vs SandF extinction plot.'
         make_lit_ext_plot(in_params)
-
-    if '17' in plots:
+    elif pl == '17':
         print '\nIntegrated colors plot.'
         make_int_cols_plot(in_params)
-
-    if '18' in plots:
+    elif pl == '18':
         print '\nConcentration parameter plot.'
         make_concent_plot(in_params)
-
-    if '19' in plots:
+    elif pl == '19':
         print '\nASteCA probabilities versus CI.'
         make_probs_CI_plot(in_params)
-
-    if '20' in plots:
+    elif pl == '20':
         print "\nCMDs for large [Fe/H] LMC clusters."
-        CMD_LMC_large_met(r_path, in_params)
+        CMD_LMC_large_met(r_path, in_params, n_jobs)
+    elif pl == '21':
+        print '\nSmoothed parameter maps.'
+        make_param_maps_plot(in_params)
+    elif pl == '22':
+        print '\nParameters versus galactocentric radius.'
+        make_radial_plot(in_params)
+
+
+# Functions that make each plot. Their source code, and that of the
+# functions they call, is part of the fingerprint of the plot. Those not
+# defined in this script are in 'make_all_plots'.
+plot_funcs = {
+    '0': ['make_ra_dec_plots'], '1': ['make_errors_plots'],
+    '2': ['make_as_vs_lit_plot'], '3': ['make_as_vs_lit_mass_plot'],
+    '4': ['CMD_outliers'], '5': ['CMD_DBs_vs_asteca'],
+    '6': ['make_cross_match_if'],
+    '7': ['make_cross_match_ip_age', 'make_cross_match_ip_mass'],
+    '8': ['make_cross_match_h03_p12'], '9': ['make_age_mass_corr'],
+    '10': ['CMD_large_mass'], '11': ['make_kde_plots'],
+    '12': ['make_amr_plot'],
+    '13': ['make_massclean_z_plot', 'make_massclean_mass_plot'],
+    '14': ['mar_par_plot'], '15': ['make_radius_plot'],
+    '16': ['make_lit_ext_plot'], '17': ['make_int_cols_plot'],
+    '18': ['make_concent_plot'], '19': ['make_probs_CI_plot'],
+    '20': ['CMD_LMC_large_met'], '21': ['make_param_maps_plot'],
+    '22': ['make_radial_plot']
+}
+
+
+def get_plot_funcs(pl):
+    '''
+    Functions that make plot 'pl'.
+    '''
+    import functions.make_all_plots as mp
+    return [globals()[_] if _ in globals() else getattr(mp, _) for _ in
+            plot_funcs[pl]]
+
+
+# Plots that generate CMDs. Their data is obtained with a pool of processes
+# of their own, so they are run from the main process.
+cmd_plots = ['4', '5', '10', '20']
+
+# Arguments shared by all the plots rendered in parallel. They are set before
+# the pool of processes is created, so each process inherits them (via fork,
+# copy-on-write) instead of receiving a pickled copy with each plot.
+shared = {}
+
+
+def peak_rss():
+    '''
+    Peak resident memory of this process, in Mb.
+    '''
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.
+
+
+def render_task(pl):
+    '''
+    Render a single plot in a worker process, using the Agg backend.
+    Return the wall time, the peak memory added, and the stage records.
+    '''
+    import matplotlib.pyplot as plt
+    plt.switch_backend('Agg')
+    # Drop the records inherited from the main process.
+    reset()
+    # The peak memory of a forked process starts at that of the main one.
+    s, err, mem0 = time.time(), '', peak_rss()
+    try:
+        with stage('plot:' + pl):
+            make_plot(shared['r_path'], pl, shared['data'])
+    except Exception as e:
+        err = '{}: {}'.format(type(e).__name__, e)
+    dump_profiles()
+    return pl, time.time() - s, peak_rss() - mem0, err, list(records)
+
+
+def make_plots(r_path, plots, data, n_jobs=1):
+    '''
+    Make each plot. If 'n_jobs' is larger than 1 ('None' uses all the
+    available cores) each plot is rendered in its own process, else they are
+    made sequentially.
+
+    The wall time of each plot, and how much it raised the peak memory of
+    the process that made it, are printed at the end and returned. Zero
+    means the plot did not use more memory than the process already had at
+    some point before it started.
+    '''
+    n_jobs = cpu_count() if n_jobs is None else n_jobs
+    s_all, report = time.time(), []
+
+    pool_plots = [_ for _ in plots if _ not in cmd_plots]
+    if n_jobs > 1 and pool_plots:
+        shared.update(r_path=r_path, data=data)
+        # A new process for each plot.
+        pool = Pool(min(n_jobs, len(pool_plots)), maxtasksperchild=1)
+        results = pool.imap_unordered(render_task, pool_plots)
+        pool.close()
+        main_plots = [_ for _ in plots if _ in cmd_plots]
+    else:
+        results, main_plots = [], plots
+
+    for res in results:
+        report.append(list(res[:4]))
+        merge(res[4])
+        if res[3]:
+            print '\n  ERROR: plot {} failed ({})'.format(res[0], res[3])
+    if results:
+        pool.join()
+
+    # Plots made by the main process. The CMD plots start their own
+    # 'n_jobs' processes, so they are made once the pool is done.
+    for pl in main_plots:
+        s, mem0 = time.time(), peak_rss()
+        with stage('plot:' + pl):
+            make_plot(r_path, pl, data, n_jobs)
+        report.append([pl, time.time() - s, peak_rss() - mem0, ''])
+
+    print '\nPlot   Time (s) Added peak (Mb)'
+    for pl, t, mem, err in sorted(report, key=lambda x: int(x[0])):
+        print '{:<6} {:>8.1f} {:>15.0f}{}'.format(
+            pl, t, mem, '   failed' if err else '')
+    print 'Total time: {:.1f} s'.format(time.time() - s_all)
+
+    return report
+
+
+def parse_args():
+    '''
+    Stages to run, and number of processes to use.
+    '''
+    parser = argparse.ArgumentParser(
+        description="Analysis of the ASteCA catalog of MC clusters. Only "
+        "the data needed by the selected stages is obtained.")
+    parser.add_argument(
+        'stages', nargs='*', default=all_stages,
+        help="Stages to run: 'diffs' (ASteCA vs literature differences) "
+        "and/or plot numbers (0-{}). Default: all.".format(
+            len(all_stages) - 2))
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=None,
+        help="Number of processes used to obtain the data and render the "
+        "plots. Default: all the available cores, 1 runs sequentially.")
+    parser.add_argument(
+        '-f', '--force', action='store_true',
+        help="Make the selected plots even if their inputs, code and "
+        "parameters did not change since they were last made.")
+    parser.add_argument(
+        '-w', '--watch', action='store_true',
+        help="Keep running, and run again the stages affected by any "
+        "change in their input files. The data is kept in memory.")
+    parser.add_argument(
+        '-b', '--bootstrap', type=int, default=0, metavar='B',
+        help="Add the bootstrap intervals of the CCC, PCC and K-S statistics "
+        "to the 'diffs' stage, obtained with B replicates. Default: 0 (no "
+        "intervals).")
+    parser.add_argument(
+        '-s', '--stream', type=int, metavar='BATCH',
+        help="Do not run the stages. Print the summary statistics of the "
+        "catalog and databases, reading them in batches of BATCH clusters so "
+        "the memory used does not depend on their size.")
+    args = parser.parse_args()
+
+    for st in args.stages:
+        if st not in stages:
+            parser.error("unknown stage '{}'".format(st))
+
+    return args
+
+
+def run_stages(r_path, sel_stages, data, manifest, n_jobs=1, force=False,
+               n_boot=0):
+    '''
+    Run the selected stages, skipping the plots whose fingerprint did not
+    change since they were last made (unless 'force' is True). Only the
+    data needed, and not already stored in 'data', is obtained. 'n_boot'
+    is the number of bootstrap replicates of the 'diffs' stage.
+    '''
+    # Only keep the records of this run.
+    reset()
+    s = time.time()
+
+    plots = [_ for _ in sel_stages if _ != 'diffs']
+    with stage('fingerprints', len(plots)):
+        fingers = dict((pl, fingerprint(pl, get_plot_funcs(pl),
+                                        manifest['files'])) for pl in plots)
+    if not force:
+        skip = [pl for pl in plots if not is_stale(manifest, pl, fingers[pl])]
+        if skip:
+            print 'Up to date plots (skipped): {}'.format(', '.join(skip))
+        plots = [_ for _ in plots if _ not in skip]
+
+    # Only obtain the data needed by the selected stages.
+    run_st = plots + (['diffs'] if 'diffs' in sel_stages else [])
+    load_data(r_path, required(run_st), n_jobs, data)
+
+    if 'diffs' in sel_stages:
+        # Check for differences in ASteCA vs Lit values.
+        n_cls = sum(len(_) for _ in data['in_params']['gal_names'])
+        with stage('check_diffs', n_cls):
+            check_diffs(data['in_params'], n_boot, n_jobs)
+
+    if plots:
+        # Make final plots.
+        print '\n\nPlotting...\n'
+        report = make_plots(r_path, plots, data, n_jobs)
+
+        # Store the fingerprint of the plots made.
+        for pl, t, mem, err in report:
+            if not err:
+                record(manifest, pl, fingers[pl])
+    save_manifest(manifest)
+
+    # Timing and memory of each stage.
+    write_report(selected=sel_stages, run=run_st, n_jobs=n_jobs,
+                 wall=time.time() - s)
 
 
 def main():
     '''
     Call each function.
     '''
+    args = parse_args()
+
     # Root path.
     r_path = rpath_fig_folder()
 
-    # Obtain data from ASteCA's output and from the literature.
-    in_params = get_in_params(r_path)
-
-    # Check for differences in ASteCA vs Lit values.
-    check_diffs(in_params)
-
-    # Define which plots to produce.
-    plots = ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9', '10', '11',
-             '12', '13', '14', '15', '16', '17', '18', '19', '20']
-
-    bica_coords, cross_match, cross_match_h03_p12, amr_lit, amr_asteca, \
-        massclean_data_pars, mar_data, par_data = [], [], [], [], [], [], [],\
-        []
-    # Only obtain data if the plot is being generated.
-    if '0' in plots:
-        # Read Bica et al. (2008) database.
-        bica_coords = get_bica_database()
-        print 'Bica et al. (2008) data read.'
-    if any(i in ['6', '7', '9'] for i in plots):
-        # Read cross-matched ASteCA clusters.
-        cross_match = get_cross_match_asteca(r_path)
-        print 'Cross-matched ASteCA data read.'
-    if any(i in ['8', '9'] for i in plots):
-        # Read cross-matched H03,P12 clusters.
-        cross_match_h03_p12 = get_cross_match_h03_p12(r_path)
-        print 'Cross-matched H03,P12 data read.'
-    if '12' in plots:
-        # Read AMR data from other articles.
-        amr_lit = get_amr_lit()
-        print 'AMR data from literature read.'
-        amr_asteca = get_amr_asteca(in_params)
-        print 'ASteCA AMR for both MCs obtained.'
-    if '13' in plots:
-        massclean_data_pars = get_massclean_data()
-        print 'MASSCLEAN data read.'
-    if '14' in plots:
-        mar_data, par_data = mar_par_data()
-
-    # Make final plots.
-    print '\n\nPlotting...\n'
-    make_plots(r_path, plots, in_params, bica_coords, cross_match,
-               cross_match_h03_p12, amr_lit, amr_asteca, massclean_data_pars,
-               mar_data, par_data)
+    # Number of processes used to obtain the data, render the plots, and
+    # obtain the data for the CMD plots ('4', '5', '10', '20'). 'None' uses
+    # all the available cores, 1 runs sequentially.
+    n_jobs = args.jobs
+
+    if args.stream:
+        from functions.stream import stream_params, stream_cross_match, \
+            stream_massclean, stream_bica, print_stream_params, \
+            print_stream_dbs
+        print_stream_params(stream_params(args.stream))
+        print_stream_dbs(stream_cross_match(r_path, args.stream),
+                         stream_massclean(args.stream),
+                         stream_bica(args.stream))
+        print '\nEnd.'
+        return
+
+    # Data obtained for the stages run, kept for the watch mode.
+    data, manifest = {}, load_manifest()
+    run_stages(r_path, args.stages, data, manifest, n_jobs, args.force,
+               args.bootstrap)
+
+    if args.watch:
+        watch(args.stages, data, lambda sel_stages: run_stages(
+            r_path, sel_stages, data, manifest, n_jobs, n_boot=args.bootstrap))
 
     print '\nEnd.'
 